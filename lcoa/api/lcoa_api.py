@@ -7,7 +7,7 @@ from flask import jsonify
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from app import Lcoa, db
+from app import Lcoa, LcoaArchive, db
 
 def get_max_lcoa_id():
     """
@@ -24,16 +24,21 @@ def get_max_lcoa_id():
         print(f"获取LCOA最大ID时出错: {e}")
         return 0
 
-def get_all_lcoa_data():
+def get_all_lcoa_data(include_archive=False):
     """
     获取LCOA表中的所有数据
     
+    Args:
+        include_archive (bool): 是否同时返回归档表（lcoa_archive）中的记录
+    
     Returns:
         list: 包含所有LCOA记录的列表
     """
     try:
         # 查询所有记录
         lcoa_records = Lcoa.query.all()
+        if include_archive:
+            lcoa_records += LcoaArchive.query.all()
         
         # 将记录转换为字典列表
         result = []
@@ -35,3 +35,15 @@ def get_all_sys_club_data():
     except Exception as e:
         print(f"获取SysClub数据时出错: {e}")
         return []
+
+
+def get_latest_club_date():
+    """
+    获取SysClub表中最新的日期（由数据库按 extracted_on 索引取最大值，还没有回填 extracted_on 的记录按 extracted_date 计算）
+
+    Returns:
+        str: 月日格式的日期，例如 "10月05日"，表中没有日期时返回空字符串
+    """
+    from services.typed_columns import format_month_day, latest_extracted_date
+    latest_date, _ = latest_extracted_date(db, SysClub)
+    return format_month_day(latest_date) if latest_date else ''
@@ -7,18 +7,23 @@ from flask import jsonify
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from app import SysNodeal, db
+from app import SysNodeal, SysNodealArchive, db
 
-def get_all_sys_nodeal_data():
+def get_all_sys_nodeal_data(include_archive=False):
     """
     获取SysNodeal表中的所有数据，按ID倒序排列
     
+    Args:
+        include_archive (bool): 是否同时返回归档表（sys_nodeal_archive）中的记录（排在原表的记录之后）
+    
     Returns:
         list: 包含所有SysNodeal记录的列表，按ID倒序排列
     """
     try:
         # 查询所有记录，按ID倒序排列
         sys_nodeal_records = SysNodeal.query.order_by(SysNodeal.id.desc()).all()
+        if include_archive:
+            sys_nodeal_records += SysNodealArchive.query.order_by(SysNodealArchive.id.desc()).all()
         
         # 将记录转换为字典列表
         result = []
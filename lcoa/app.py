@@ -23,18 +23,19 @@ DB_PASSWORD = os.environ.get('DB_PASSWORD', 'zjj520111314')
 DB_HOST = os.environ.get('DB_HOST', 'localhost')
 DB_PORT = os.environ.get('DB_PORT', '3306')
 DB_NAME = os.environ.get('DB_NAME', 'lcoa')
+# 完整的数据库连接串，设置后优先于上面的各项（例如基准测试使用 sqlite:///... 或单独的MySQL库）
+DB_URI = os.environ.get('DB_URI')
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_recycle': 3600,
-    'pool_pre_ping': True
-}
+app.config['SQLALCHEMY_DATABASE_URI'] = DB_URI or f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+# 连接池按进程角色（LCOA_PROCESS_ROLE：web、ingest、import）配置，见 services/db_pool.py
+from services.db_pool import PROCESS_ROLE, engine_options, pool_metrics, pool_settings
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = os.urandom(24)
 app.config['JWT_EXPIRATION_DELTA'] = 3600  # 1小时有效期
 
 # 导入本地模块
-from models import db, User, Lcoa, SysNodeal, SysDeal, SysPersonal, SysXiangxi, SysClub, SysProject, SysProjectMilestone, SysProjectMilestoneImpactHistory, ModificationLog
+from models import db, User, Lcoa, SysNodeal, LcoaArchive, SysNodealArchive, SysDeal, SysPersonal, SysXiangxi, SysClub, SysProject, SysProjectMilestone, SysProjectMilestoneImpactHistory, ModificationLog, IngestManifest, IngestCheckpoint
 from services.data_service import (
     save_to_lcoa_table,
     save_to_sys_nodeal_table_with_comparison,
@@ -42,7 +43,9 @@ from services.data_service import (
     save_to_sys_club_table,
     save_to_sys_club_table_with_comparison,
     save_to_sys_nodeal_table_with_comparison,
-    save_to_sys_xiangxi_table_with_comparison
+    save_to_sys_xiangxi_table_with_comparison,
+    save_snapshot_table,
+    compute_changeset
 )
 from utils import generate_token, verify_token
 
@@ -226,13 +229,19 @@ def get_current_user():
             'message': f'获取用户信息失败: {str(e)}'
         }), 500
 
+def include_archive_requested():
+    """请求参数 include_archive=1 时，lcoa、sys_nodeal 的查询接口同时返回归档表中的记录（见 archive_aged_rows.py）"""
+    return request.args.get('include_archive', '').lower() in ('1', 'true', 'yes')
+
 # API路由
 @app.route('/api/lcoa', methods=['GET'])
 def api_get_lcoa_data():
-    """获取LCOA表所有数据的API接口"""
+    """获取LCOA表所有数据的API接口（默认不包含归档记录，include_archive=1 时包含）"""
     try:
         # 查询所有记录
         lcoa_records = Lcoa.query.all()
+        if include_archive_requested():
+            lcoa_records += LcoaArchive.query.all()
         
         # 将记录转换为字典列表
         result = []
@@ -275,10 +284,12 @@ def api_get_lcoa_data():
 
 @app.route('/api/lcoa/count', methods=['GET'])
 def api_get_lcoa_count():
-    """获取LCOA表数据总条数的API接口"""
+    """获取LCOA表数据总条数的API接口（默认不包含归档记录，include_archive=1 时包含）"""
     try:
         # 查询总条数
         count = Lcoa.query.count()
+        if include_archive_requested():
+            count += LcoaArchive.query.count()
         
         return jsonify({
             'code': 200,
@@ -324,10 +335,12 @@ def api_get_lcoa_max_id():
 
 @app.route('/api/sys_nodeal', methods=['GET'])
 def api_get_sys_nodeal_data():
-    """获取SysNodeal表所有数据的API接口，按ID倒序排列"""
+    """获取SysNodeal表所有数据的API接口，按ID倒序排列（默认不包含归档记录，include_archive=1 时包含）"""
     try:
-        # 查询所有记录，按ID倒序排列
+        # 查询所有记录，按ID倒序排列（归档记录比原表中的记录旧，排在后面）
         sys_nodeal_records = SysNodeal.query.order_by(SysNodeal.id.desc()).all()
+        if include_archive_requested():
+            sys_nodeal_records += SysNodealArchive.query.order_by(SysNodealArchive.id.desc()).all()
         
         # 将记录转换为字典列表
         result = []
@@ -365,10 +378,12 @@ def api_get_sys_nodeal_data():
 
 @app.route('/api/sys_nodeal/count', methods=['GET'])
 def api_get_sys_nodeal_count():
-    """获取SysNodeal表数据总条数的API接口"""
+    """获取SysNodeal表数据总条数的API接口（默认不包含归档记录，include_archive=1 时包含）"""
     try:
         # 查询总条数
         count = SysNodeal.query.count()
+        if include_archive_requested():
+            count += SysNodealArchive.query.count()
         
         return jsonify({
             'code': 200,
@@ -525,30 +540,19 @@ def api_get_sys_club_latest():
     """获取SysClub表最新数据的API接口"""
     try:
         # 获取最新日期的记录
-        # 先获取所有不同的日期
-        distinct_dates = db.session.query(SysClub.extracted_date).distinct().all()
-        if not distinct_dates:
-            return jsonify({
-                'code': 200,
-                'message': '查询成功',
-                'data': []
-            })
-        
-        # 将日期列表转换为普通列表并排序
-        dates = [date[0] for date in distinct_dates if date[0] is not None]
-        if not dates:
+        # 最新日期由数据库按 extracted_on 索引取最大值，不再取出所有日期在Python中排序；
+        # 还没有回填 extracted_on 的记录按 extracted_date 计算（见 services/typed_columns.py）
+        from services.typed_columns import latest_extracted_date
+        latest_date, latest_condition = latest_extracted_date(db, SysClub)
+        if latest_date is None:
             return jsonify({
                 'code': 200,
                 'message': '查询成功',
                 'data': []
             })
         
-        # 排序并获取最新的日期
-        dates.sort(reverse=True)
-        latest_date = dates[0]
-        
         # 获取指定日期的所有记录
-        latest_records = SysClub.query.filter_by(extracted_date=latest_date).all()
+        latest_records = SysClub.query.filter(latest_condition).all()
         
         # 将记录转换为字典列表
         result = []
@@ -578,30 +582,19 @@ def api_get_sys_xiangxi_latest():
     """获取SysXiangxi表最新数据的API接口"""
     try:
         # 获取最新日期的记录
-        # 先获取所有不同的日期
-        distinct_dates = db.session.query(SysXiangxi.extracted_date).distinct().all()
-        if not distinct_dates:
-            return jsonify({
-                'code': 200,
-                'message': '查询成功',
-                'data': []
-            })
-        
-        # 将日期列表转换为普通列表并排序
-        dates = [date[0] for date in distinct_dates if date[0] is not None]
-        if not dates:
+        # 最新日期由数据库按 extracted_on 索引取最大值，不再取出所有日期在Python中排序；
+        # 还没有回填 extracted_on 的记录按 extracted_date 计算（见 services/typed_columns.py）
+        from services.typed_columns import latest_extracted_date
+        latest_date, latest_condition = latest_extracted_date(db, SysXiangxi)
+        if latest_date is None:
             return jsonify({
                 'code': 200,
                 'message': '查询成功',
                 'data': []
             })
         
-        # 排序并获取最新的日期
-        dates.sort(reverse=True)
-        latest_date = dates[0]
-        
         # 获取指定日期的所有记录
-        latest_records = SysXiangxi.query.filter_by(extracted_date=latest_date).all()
+        latest_records = SysXiangxi.query.filter(latest_condition).all()
         
         # 将记录转换为字典列表
         result = []
@@ -632,28 +625,16 @@ def api_get_sys_personal_latest():
     """获取SysPersonal表最新数据的API接口"""
     try:
         # 获取最新日期的记录
-        # 先获取所有不同的日期
-        distinct_dates = db.session.query(SysPersonal.extracted_date).distinct().all()
-        if not distinct_dates:
+        # 最新日期由数据库按 extracted_date 索引取最大值（与原先按字符串倒序排序取第一个相同）
+        from sqlalchemy import func
+        latest_date = db.session.query(func.max(SysPersonal.extracted_date)).scalar()
+        if latest_date is None:
             return jsonify({
                 'code': 200,
                 'message': '查询成功',
                 'data': []
             })
         
-        # 将日期列表转换为普通列表并排序
-        dates = [date[0] for date in distinct_dates if date[0] is not None]
-        if not dates:
-            return jsonify({
-                'code': 200,
-                'message': '查询成功',
-                'data': []
-            })
-        
-        # 排序并获取最新的日期
-        dates.sort(reverse=True)
-        latest_date = dates[0]
-        
         # 获取指定日期的所有记录
         latest_records = SysPersonal.query.filter_by(extracted_date=latest_date).all()
         
@@ -710,39 +691,12 @@ def api_get_sys_club_latest_date():
 def api_get_sys_xiangxi_latest_date():
     """获取SysXiangxi表最接近当前时间的日期（月日格式）的API接口"""
     try:
-        # 获取所有不同的日期
-        distinct_dates = db.session.query(SysXiangxi.extracted_date).distinct().all()
-        if not distinct_dates:
-            return jsonify({
-                'code': 200,
-                'message': '查询成功',
-                'data': {
-                    'latest_date': ''
-                }
-            })
-        
-        # 将日期列表转换为普通列表并排序
-        dates = [date[0] for date in distinct_dates if date[0] is not None]
-        if not dates:
-            return jsonify({
-                'code': 200,
-                'message': '查询成功',
-                'data': {
-                    'latest_date': ''
-                }
-            })
-        
-        # 排序并获取最新的日期
-        dates.sort(reverse=True)
-        latest_date = dates[0]
+        # 最新日期由数据库按 extracted_on 索引取最大值（还没有回填 extracted_on 的记录按 extracted_date 计算）
+        from services.typed_columns import format_month_day, latest_extracted_date
+        latest_date, _ = latest_extracted_date(db, SysXiangxi)
         
         # 格式化为月日格式
-        from datetime import datetime
-        try:
-            date_obj = datetime.strptime(latest_date, '%Y-%m-%d')
-            formatted_date = date_obj.strftime('%m月%d日')
-        except ValueError:
-            formatted_date = latest_date  # 如果解析失败，使用原始日期
+        formatted_date = format_month_day(latest_date) if latest_date else ''
         
         return jsonify({
             'code': 200,
@@ -866,23 +820,134 @@ def api_update_user_role(user_id):
             'message': f'更新失败: {str(e)}'
         }), 500
 
+# 数据导入进程的统计文件（路径和环境变量与 datedeal/ingest_telemetry.py 的 METRICS_FILE 相同）
+INGEST_METRICS_FILE = os.environ.get(
+    'LCOA_METRICS_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'ingest_metrics.jsonl')
+)
+
+
+def load_last_ingest_pool(path=None):
+    """
+    读取最近一次带连接池统计的导入记录
+    （Web服务从 lcoa 目录启动，不能导入 lcoa.datedeal 包，这里按路径直接读取导入统计文件的JSON行）
+
+    Args:
+        path (str): 导入统计文件，默认 INGEST_METRICS_FILE
+
+    Returns:
+        dict: 导入统计记录，没有记录时返回None
+    """
+    import json
+
+    path = path or INGEST_METRICS_FILE
+    if not os.path.exists(path):
+        return None
+
+    last_record = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and 'pool' in record:
+                last_record = record
+    return last_record
+
+@app.route('/api/admin/metrics', methods=['GET'])
+def api_get_admin_metrics():
+    """获取连接池统计的API接口（仅管理员）：本进程连接池的配置、获取连接耗时、占满次数和连接新建/关闭次数，
+    以及最近一次数据导入进程的连接池统计；reset=1 时返回后清空本进程的统计"""
+    try:
+        # 检查用户权限
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return jsonify({
+                'code': 401,
+                'message': '未提供认证信息'
+            }), 401
+        
+        token = auth_header.replace('Bearer ', '') if auth_header.startswith('Bearer ') else auth_header
+        payload = verify_token(app.config['SECRET_KEY'], token)
+        
+        if not payload or payload.get('role') != 'admin':
+            return jsonify({
+                'code': 403,
+                'message': '权限不足'
+            }), 403
+        
+        pool = pool_metrics.snapshot(db.engine)
+        pool['settings'] = pool_settings(PROCESS_ROLE)
+        
+        # 导入在单独的进程中运行，它的连接池统计记录在导入统计文件中
+        last_ingest = load_last_ingest_pool()
+        
+        if request.args.get('reset', '').lower() in ('1', 'true', 'yes'):
+            pool_metrics.reset()
+        
+        return jsonify({
+            'code': 200,
+            'message': '查询成功',
+            'data': {
+                'pool': pool,
+                'ingest_pool': {
+                    'started_at': last_ingest['started_at'],
+                    'mode': last_ingest['mode'],
+                    'pool': last_ingest['pool']
+                } if last_ingest else None
+            }
+        })
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'message': f'查询失败: {str(e)}',
+            'data': {}
+        }), 500
+
 @app.route('/api/sys_xiangxi/daily_stats', methods=['GET'])
 def api_get_sys_xiangxi_daily_stats():
     """获取SysXiangxi表每日数据统计的API接口"""
     try:
-        # 查询所有记录并按日期分组统计
+        # 按日期分组统计最近7天的记录数和数量合计（在数据库中计算）
         from sqlalchemy import func, desc
+        from services.typed_columns import parse_count, parse_date
         daily_stats = db.session.query(
+            SysXiangxi.extracted_on,
+            func.count(SysXiangxi.id).label('count'),
+            func.sum(SysXiangxi.quantity_num).label('total_quantity')
+        ).filter(SysXiangxi.extracted_on.isnot(None)) \
+            .group_by(SysXiangxi.extracted_on).order_by(desc(SysXiangxi.extracted_on)).limit(7).all()
+        stats = {
+            stat.extracted_on.strftime('%Y-%m-%d'): {'count': stat.count, 'total_quantity': int(stat.total_quantity or 0)}
+            for stat in daily_stats
+        }
+        
+        # 还没有回填 extracted_on 的记录按 extracted_date 和 quantity 原值统计（回填后没有这样的记录）
+        pending_stats = db.session.query(
             SysXiangxi.extracted_date,
+            SysXiangxi.quantity,
             func.count(SysXiangxi.id).label('count')
-        ).group_by(SysXiangxi.extracted_date).order_by(desc(SysXiangxi.extracted_date)).limit(7).all()
-        
-        # 将结果转换为字典列表
+        ).filter(SysXiangxi.extracted_on.is_(None)).group_by(SysXiangxi.extracted_date, SysXiangxi.quantity).all()
+        for stat in pending_stats:
+            if not (stat.extracted_date or '').strip():
+                continue
+            parsed = parse_date(stat.extracted_date)
+            day = stats.setdefault(parsed.isoformat() if parsed else stat.extracted_date,
+                                   {'count': 0, 'total_quantity': 0})
+            day['count'] += stat.count
+            day['total_quantity'] += (parse_count(stat.quantity) or 0) * stat.count
+        
+        # 将结果转换为字典列表（最近7天）
         result = []
-        for stat in daily_stats:
+        for stat_date in sorted(stats, reverse=True)[:7]:
             result.append({
-                'date': stat.extracted_date,
-                'count': stat.count
+                'date': stat_date,
+                'count': stats[stat_date]['count'],
+                'total_quantity': stats[stat_date]['total_quantity']
             })
         
         return jsonify({
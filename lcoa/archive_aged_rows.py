@@ -0,0 +1,146 @@
+"""
+历史记录归档脚本
+把 lcoa、sys_nodeal 表中超过保留期限的记录移到 lcoa_archive、sys_nodeal_archive 表，
+接口默认只查询原表（加上 include_archive=1 参数时同时返回归档记录），原表的大小和查询耗时不随历史数据增长
+
+- 按提取日期（extracted_date，默认）或最后处理时间（last_process_time）判断记录是否超过保留期限，
+  比较的是类型化影子列 extracted_on / last_process_at（已有数据库先运行 migrate_typed_columns.py，影子列为空的记录不归档）
+- 按id分批移动：每批在一个事务中写入归档表并从原表删除，遇到临时错误时回滚并重试该批，中断后重新运行会继续处理剩下的记录
+- 同一个键已经归档过（归档后又被导入、再次过期）时，用新的记录替换之前归档的记录
+
+定时执行，例如每天凌晨:
+    python lcoa/archive_aged_rows.py [--retention-days 180] [--by extracted_date|last_process_time]
+                                     [--batch-size 5000] [--tables lcoa,sys_nodeal] [--dry-run]
+"""
+import argparse
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, func, insert, literal, select, tuple_
+
+# 添加项目根目录和lcoa目录到Python路径（app.py 按 from models import ... 导入）
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (project_root, os.path.join(project_root, 'lcoa')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# 保留期限（天），超过期限的记录移到归档表
+ARCHIVE_RETENTION_DAYS = int(os.environ.get('LCOA_ARCHIVE_RETENTION_DAYS', '180'))
+# 判断记录是否过期的字段：extracted_date 或 last_process_time
+ARCHIVE_AGE_FIELD = os.environ.get('LCOA_ARCHIVE_BY', 'extracted_date')
+# 每批移动的记录数（每批一个事务）
+ARCHIVE_BATCH_SIZE = int(os.environ.get('LCOA_ARCHIVE_BATCH_SIZE', '5000'))
+
+# 判断字段 -> 比较的类型化影子列
+AGE_COLUMNS = {
+    'extracted_date': 'extracted_on',
+    'last_process_time': 'last_process_at',
+}
+
+
+def archive_cutoff(age_field, retention_days, today=None):
+    """保留期限的起点：影子列小于该值的记录已过期（extracted_on 按日期比较，last_process_at 按时间比较）"""
+    cutoff = (today or date.today()) - timedelta(days=retention_days)
+    if AGE_COLUMNS[age_field] == 'last_process_at':
+        return datetime(cutoff.year, cutoff.month, cutoff.day)
+    return cutoff
+
+
+def aged_ids(db, Model, age_column, cutoff):
+    """原表中已过期的记录id（按id顺序流式读取）"""
+    table = Model.__table__
+    query = select(table.c.id).where(table.c[age_column] < cutoff).order_by(table.c.id)
+    return [row[0] for row in db.session.execute(query.execution_options(yield_per=10000))]
+
+
+def archive_aged_rows(db, Model, ArchiveModel, age_column, cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    把原表中 age_column 小于 cutoff 的记录分批移到归档表
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 原表模型类
+        ArchiveModel: 归档表模型类（字段与原表相同，另有 archive_id 主键和 archived_at）
+        age_column (str): 判断是否过期的影子列
+        cutoff (date|datetime): 小于该值的记录已过期
+        batch_size (int): 每批移动的记录数
+
+    Returns:
+        dict: {'archived': 移动的记录数, 'replaced': 被替换的已归档记录数, 'chunks': 提交的批数, 'retries': 重试次数}
+    """
+    from services.data_service import write_in_chunks
+
+    table = Model.__table__
+    archive = ArchiveModel.__table__
+    columns = [column.name for column in table.columns]
+    key_columns = [column.name for column in next(
+        constraint for constraint in archive.constraints if constraint.name and constraint.name.startswith('uq_')
+    ).columns]
+
+    def move_chunk(ids):
+        # 先删除同一个键之前归档的记录，再整批复制到归档表，最后从原表删除
+        replaced = db.session.execute(
+            delete(archive).where(tuple_(*[archive.c[column] for column in key_columns]).in_(
+                select(*[table.c[column] for column in key_columns]).where(table.c.id.in_(ids))
+            ))
+        ).rowcount
+        db.session.execute(insert(archive).from_select(
+            columns + ['archived_at'],
+            select(*[table.c[column] for column in columns], literal(datetime.utcnow(), archive.c.archived_at.type))
+            .where(table.c.id.in_(ids))
+        ))
+        archived = db.session.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+        return {'inserted': archived, 'updated': replaced, 'preload_seconds': 0.0, 'write_seconds': 0.0}
+
+    result = write_in_chunks(db, Model.__tablename__, aged_ids(db, Model, age_column, cutoff), move_chunk, batch_size)
+    return {'archived': result['inserted'], 'replaced': result['updated'],
+            'chunks': result['chunks'], 'retries': result['retries']}
+
+
+def run_archive(retention_days=ARCHIVE_RETENTION_DAYS, age_field=ARCHIVE_AGE_FIELD, batch_size=ARCHIVE_BATCH_SIZE,
+                tables=None, dry_run=False):
+    """按保留期限归档 lcoa、sys_nodeal 表的历史记录"""
+    from lcoa.app import app, db, Lcoa, SysNodeal, LcoaArchive, SysNodealArchive
+
+    if age_field not in AGE_COLUMNS:
+        raise ValueError(f"不支持按 {age_field} 归档，可选: {', '.join(AGE_COLUMNS)}")
+    age_column = AGE_COLUMNS[age_field]
+    cutoff = archive_cutoff(age_field, retention_days)
+
+    with app.app_context():
+        for Model, ArchiveModel in ((Lcoa, LcoaArchive), (SysNodeal, SysNodealArchive)):
+            table_name = Model.__tablename__
+            if tables and table_name not in tables:
+                continue
+            try:
+                if dry_run:
+                    count = db.session.execute(
+                        select(func.count()).select_from(Model.__table__)
+                        .where(Model.__table__.c[age_column] < cutoff)
+                    ).scalar()
+                    print(f"{table_name} 表将归档 {count} 条 {age_field} 早于 {cutoff} 的记录")
+                    continue
+
+                ArchiveModel.__table__.create(db.engine, checkfirst=True)
+                result = archive_aged_rows(db, Model, ArchiveModel, age_column, cutoff, batch_size)
+                print(f"{table_name} 表已归档 {result['archived']} 条 {age_field} 早于 {cutoff} 的记录"
+                      f"（替换已归档的记录 {result['replaced']} 条，{result['chunks']} 批，重试 {result['retries']} 次）")
+            except Exception as e:
+                db.session.rollback()
+                print(f"归档 {table_name} 表时出错: {e}")
+                raise
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='把 lcoa、sys_nodeal 表中超过保留期限的记录移到归档表')
+    parser.add_argument('--retention-days', type=int, default=ARCHIVE_RETENTION_DAYS,
+                        help='保留期限（天），默认 LCOA_ARCHIVE_RETENTION_DAYS')
+    parser.add_argument('--by', choices=sorted(AGE_COLUMNS), default=ARCHIVE_AGE_FIELD,
+                        help='按哪个字段判断记录是否过期，默认 LCOA_ARCHIVE_BY')
+    parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='每批移动并提交的记录数')
+    parser.add_argument('--tables', default=None, help='只归档这些表（逗号分隔），默认 lcoa,sys_nodeal')
+    parser.add_argument('--dry-run', action='store_true', help='只统计将要归档的记录，不修改数据库')
+    args = parser.parse_args()
+    run_archive(args.retention_days, args.by, args.batch_size,
+                args.tables.split(',') if args.tables else None, args.dry_run)
@@ -0,0 +1,30 @@
+"""
+pytest 的公共配置
+整个测试会话使用同一个临时目录中的SQLite数据库、导入统计和导入锁，不影响配置的数据库。
+lcoa.app 在导入时读取数据库配置，一个进程中只能配置一次（见 datedeal/bench_ingest.py 的 configure_environment），
+所以在收集测试模块（导入 app）之前配置，各测试通过 work_dir 夹具使用该目录
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# 添加项目根目录和lcoa目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (project_root, os.path.join(project_root, 'lcoa')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from lcoa.datedeal.bench_ingest import configure_environment
+
+TEST_WORK_DIR = tempfile.mkdtemp(prefix='lcoa_test_')
+configure_environment(TEST_WORK_DIR)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def work_dir():
+    """测试会话的临时目录（SQLite数据库、导入统计、导入锁），会话结束后删除"""
+    yield TEST_WORK_DIR
+    shutil.rmtree(TEST_WORK_DIR, ignore_errors=True)
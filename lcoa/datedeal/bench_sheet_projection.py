@@ -0,0 +1,130 @@
+"""
+工作表列裁剪基准
+对每个工作簿的每个目标工作表，比较完整解析（所有列、完整类型推断）与按工作表结构解析
+（usecols 只取需要的列）的耗时，并校验两者转换出的数据行逐字节一致
+
+用法:
+    python lcoa/datedeal/bench_sheet_projection.py [目录] [--rows 20000] [--extra-columns 30] [--repeat 3]
+    不指定目录时生成一个合成工作簿进行测试
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from lcoa.datedeal.workbook_reader import (
+    SHEET_ROUTES,
+    list_export_workbooks,
+    parse_sheet_projected,
+    sheet_to_rows
+)
+from lcoa.datedeal.bench_row_conversion import build_synthetic_sheet, time_call
+
+
+def build_synthetic_workbook(file_path, row_count, extra_columns, seed=0):
+    """
+    生成包含5个工作表的合成工作簿，每个工作表在需要的列之外再添加 extra_columns 个不需要的列
+
+    Args:
+        file_path (str): 输出文件路径
+        row_count (int): 每个工作表的行数
+        extra_columns (int): 额外添加的不需要的列数
+        seed (int): 随机数种子
+    """
+    rng = np.random.default_rng(seed)
+    df = build_synthetic_sheet(row_count, seed)
+    for i in range(extra_columns):
+        df[f'扩展字段{i}'] = rng.random(row_count)
+
+    # 第四个表和第五个表的结构与流程表不同
+    xiangxi = pd.DataFrame({
+        '节点操作者': df['节点操作者'],
+        '所属部门': df['所属部门'],
+        '节点操作类型': df['节点操作类型'],
+        '数量': rng.integers(0, 100, row_count),
+    })
+    club = pd.DataFrame({
+        '部门': df['所属部门'],
+        '人数': rng.integers(1, 50, row_count),
+        '超时数': rng.integers(0, 20, row_count),
+    })
+    for i in range(extra_columns):
+        xiangxi[f'扩展字段{i}'] = rng.random(row_count)
+        club[f'扩展字段{i}'] = rng.random(row_count)
+
+    with pd.ExcelWriter(file_path) as writer:
+        df.to_excel(writer, sheet_name='流程', index=False)
+        df.to_excel(writer, sheet_name='节点', index=False)
+        club.to_excel(writer, sheet_name='汇总', index=False)
+        xiangxi.to_excel(writer, sheet_name='详细', index=False)
+        club.to_excel(writer, sheet_name='部门', index=False)
+
+
+def benchmark_workbook(file_path, repeat=3):
+    """
+    对一个工作簿的每个目标工作表比较两种解析方式（各取最快一次的耗时）
+
+    Args:
+        file_path (str): Excel文件路径
+        repeat (int): 每种解析方式的重复次数
+
+    Returns:
+        list: [(目标表名, 完整解析秒数, 裁剪解析秒数)]
+    """
+    results = []
+    with pd.ExcelFile(file_path) as excel_file:
+        for table_name, sheet_index in SHEET_ROUTES.items():
+            if sheet_index >= len(excel_file.sheet_names):
+                continue
+
+            full_time, full_df = time_call(lambda: excel_file.parse(sheet_name=sheet_index), repeat)
+            projected_time, projected_df = time_call(
+                lambda: parse_sheet_projected(excel_file, sheet_index, table_name), repeat
+            )
+
+            if sheet_to_rows(table_name, full_df, '') != sheet_to_rows(table_name, projected_df, ''):
+                raise AssertionError(f"{os.path.basename(file_path)} {table_name}: 裁剪解析的输出与完整解析不一致")
+
+            results.append((table_name, full_time, projected_time))
+            print(f"  {table_name}（第 {sheet_index + 1} 个工作表, {len(full_df.columns)} -> "
+                  f"{len(projected_df.columns)} 列）: 完整解析 {full_time:.2f} 秒, "
+                  f"裁剪解析 {projected_time:.2f} 秒, 减少 {(1 - projected_time / full_time) * 100:.1f}%")
+    return results
+
+
+def run_benchmark(directory_path=None, row_count=20_000, extra_columns=30, repeat=3):
+    """
+    运行基准并打印每个工作表的解析耗时
+
+    Returns:
+        dict: 文件名 -> 每个工作表的结果列表
+    """
+    if directory_path is None:
+        directory_path = tempfile.mkdtemp(prefix='lcoa_bench_')
+        file_path = os.path.join(directory_path, '导出-2025-10-01.xlsx')
+        print(f"生成合成工作簿: {row_count} 行, 额外 {extra_columns} 列")
+        build_synthetic_workbook(file_path, row_count, extra_columns)
+
+    all_results = {}
+    for filename in list_export_workbooks(directory_path):
+        print(f"{filename}:")
+        all_results[filename] = benchmark_workbook(os.path.join(directory_path, filename), repeat)
+    return all_results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='比较完整解析与按结构裁剪解析工作表的耗时')
+    parser.add_argument('directory', nargs='?', default=None, help='导出文件所在目录，默认生成合成工作簿')
+    parser.add_argument('--rows', type=int, default=20_000, help='合成工作表的行数')
+    parser.add_argument('--extra-columns', type=int, default=30, help='合成工作表中不需要的列数')
+    parser.add_argument('--repeat', type=int, default=3, help='每种解析方式的重复次数')
+    args = parser.parse_args()
+    run_benchmark(args.directory, args.rows, args.extra_columns, args.repeat)
@@ -0,0 +1,180 @@
+"""
+合成导出文件生成器
+按真实导出文件的结构生成包含5个工作表的工作簿：
+第1、2个表为流程表（PROCESS_COLUMN_NAMES），第3个表导入时不读取，第4个表为详细表（XIANGXI_COLUMN_NAMES），
+第5个表的前3列为部门、人数、超时数；文件名轮流使用 导出-2025-10-01.xlsx 和 导出2025年10月01日.xlsx 两种日期格式
+
+相邻两天的文件之间有一部分相同的 (流程节点id, 流程id)，导入后一天的文件时这部分记录是更新，其余是新增，
+与实际每天导出的数据相似
+
+用法:
+    python lcoa/datedeal/bench_workbook_generator.py 输出目录 [--files 4] [--rows 10000] [--overlap 0.2]
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from lcoa.datedeal.workbook_reader import PROCESS_COLUMN_NAMES, XIANGXI_COLUMN_NAMES
+
+# 文件名中的日期格式（与 extract_date_from_filename 支持的格式一致）
+FILENAME_FORMATS = [
+    lambda d: f'导出-{d.year:04d}-{d.month:02d}-{d.day:02d}.xlsx',
+    lambda d: f'导出{d.year:04d}年{d.month:02d}月{d.day:02d}日.xlsx',
+]
+
+# 部门和操作者的个数（详细表、部门表的行数由它们决定）
+DEPARTMENT_COUNT = 40
+OPERATOR_COUNT = 300
+
+
+def export_filename(file_date, index):
+    """第 index 个文件的文件名，两种日期格式轮流使用"""
+    return FILENAME_FORMATS[index % len(FILENAME_FORMATS)](file_date)
+
+
+def build_process_sheet(keys, file_date, rng):
+    """
+    生成流程表
+
+    Args:
+        keys (ndarray): (流程节点id, 流程id) 数组，形状为 (行数, 2)
+        file_date (date): 文件日期（最初接收时间在该日期之前的30天内）
+        rng (Generator): 随机数生成器
+
+    Returns:
+        DataFrame: 列为 PROCESS_COLUMN_NAMES 的流程表
+    """
+    row_count = len(keys)
+    data = {}
+    for col_name in PROCESS_COLUMN_NAMES:
+        data[col_name] = np.array([f'{col_name}{i}' for i in rng.integers(0, 500, row_count)], dtype=object)
+
+    data['流程节点id'] = keys[:, 0]
+    data['流程id'] = keys[:, 1]
+    data['所属部门'] = np.array([f'部门{i}' for i in rng.integers(0, DEPARTMENT_COUNT, row_count)], dtype=object)
+    data['节点操作者'] = np.array([f'操作者{i}' for i in rng.integers(0, OPERATOR_COUNT, row_count)], dtype=object)
+    data['节点名称'][rng.random(row_count) < 0.05] = None
+
+    start = np.datetime64(file_date - timedelta(days=30)) + np.timedelta64(8, 'h')
+    received = start + rng.integers(0, 86400 * 30, row_count).astype('timedelta64[s]')
+    handled = received + rng.integers(60, 86400 * 3, row_count).astype('timedelta64[s]')
+    data['最初接收时间'] = pd.Series(received).dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy(dtype=object)
+    data['最后处理时间'] = pd.Series(handled).dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy(dtype=object)
+    data['最后处理时间'][rng.random(row_count) < 0.2] = None
+
+    minutes = (handled - received).astype('timedelta64[m]').astype(np.int64)
+    data['总计耗时'] = np.array([f'{m // 1440}天{m % 1440 // 60}小时{m % 60}分' for m in minutes], dtype=object)
+    timeout = np.maximum(minutes - 1440, 0)
+    data['总计超时'] = np.array([f'{m // 1440}天{m % 1440 // 60}小时{m % 60}分' if m else '0' for m in timeout],
+                            dtype=object)
+    return pd.DataFrame(data, columns=PROCESS_COLUMN_NAMES)
+
+
+def build_xiangxi_sheet(rng):
+    """生成详细表：每个 (节点操作者, 所属部门) 一行"""
+    operators = np.repeat([f'操作者{i}' for i in range(OPERATOR_COUNT)], 2)
+    departments = [f'部门{i}' for i in rng.integers(0, DEPARTMENT_COUNT, len(operators))]
+    frame = pd.DataFrame({
+        '节点操作者': operators,
+        '所属部门': departments,
+        '节点操作类型': [f'节点操作类型{i}' for i in rng.integers(0, 20, len(operators))],
+        '数量': rng.integers(0, 200, len(operators)),
+    }, columns=XIANGXI_COLUMN_NAMES)
+    return frame.drop_duplicates(subset=['节点操作者', '所属部门'])
+
+
+def build_club_sheet(rng):
+    """生成部门表：每个部门一行（前3列为部门、人数、超时数，后面再加一个导入时不读取的列）"""
+    return pd.DataFrame({
+        '部门': [f'部门{i}' for i in range(DEPARTMENT_COUNT)],
+        '人数': rng.integers(1, 80, DEPARTMENT_COUNT),
+        '超时数': rng.integers(0, 30, DEPARTMENT_COUNT),
+        '备注': ['备注'] * DEPARTMENT_COUNT,
+    })
+
+
+def write_export_workbook(file_path, process_keys, nodeal_keys, file_date, seed=0):
+    """
+    写入一个合成导出文件
+
+    Args:
+        file_path (str): 输出文件路径
+        process_keys (ndarray): 第1个表的 (流程节点id, 流程id)
+        nodeal_keys (ndarray): 第2个表的 (流程节点id, 流程id)
+        file_date (date): 文件日期
+        seed (int): 随机数种子
+    """
+    rng = np.random.default_rng(seed)
+    with pd.ExcelWriter(file_path) as writer:
+        build_process_sheet(process_keys, file_date, rng).to_excel(writer, sheet_name='流程', index=False)
+        build_process_sheet(nodeal_keys, file_date, rng).to_excel(writer, sheet_name='未办结', index=False)
+        pd.DataFrame({'说明': ['导入时不读取该工作表']}).to_excel(writer, sheet_name='汇总', index=False)
+        build_xiangxi_sheet(rng).to_excel(writer, sheet_name='详细', index=False)
+        build_club_sheet(rng).to_excel(writer, sheet_name='部门', index=False)
+
+
+def _next_keys(previous, row_count, overlap, next_id, rng):
+    """生成下一个文件的键：overlap 比例的键取自前一个文件，其余为新键"""
+    reused = 0 if previous is None else min(int(row_count * overlap), len(previous))
+    fresh = row_count - reused
+    keys = np.empty((row_count, 2), dtype=np.int64)
+    if reused:
+        keys[:reused] = previous[rng.choice(len(previous), reused, replace=False)]
+    keys[reused:, 0] = np.arange(next_id, next_id + fresh)
+    keys[reused:, 1] = keys[reused:, 0] // 7 + 1_000_000
+    rng.shuffle(keys)
+    return keys, next_id + fresh
+
+
+def generate_export_directory(directory_path, file_count=4, row_count=10_000, overlap=0.2,
+                              start_date=date(2025, 10, 1), seed=0):
+    """
+    在目录中生成一组按天导出的合成工作簿
+
+    Args:
+        directory_path (str): 输出目录（不存在时创建）
+        file_count (int): 文件个数（每天一个）
+        row_count (int): 第1、2个表每个文件的行数
+        overlap (float): 与前一天的文件相同键的比例（导入时为更新）
+        start_date (date): 第一个文件的日期
+        seed (int): 随机数种子
+
+    Returns:
+        list: 生成的文件名列表（按日期排序）
+    """
+    os.makedirs(directory_path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    filenames = []
+    process_keys = nodeal_keys = None
+    next_id = 1
+    for index in range(file_count):
+        file_date = start_date + timedelta(days=index)
+        process_keys, next_id = _next_keys(process_keys, row_count, overlap, next_id, rng)
+        nodeal_keys, next_id = _next_keys(nodeal_keys, row_count, overlap, next_id, rng)
+
+        filename = export_filename(file_date, index)
+        write_export_workbook(os.path.join(directory_path, filename), process_keys, nodeal_keys, file_date,
+                              seed + index)
+        filenames.append(filename)
+    return filenames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='生成与导出文件结构相同的合成工作簿')
+    parser.add_argument('directory', help='输出目录')
+    parser.add_argument('--files', type=int, default=4, help='文件个数（每天一个）')
+    parser.add_argument('--rows', type=int, default=10_000, help='第1、2个表每个文件的行数')
+    parser.add_argument('--overlap', type=float, default=0.2, help='与前一天的文件相同键的比例')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+    args = parser.parse_args()
+    for filename in generate_export_directory(args.directory, args.files, args.rows, args.overlap, seed=args.seed):
+        print(os.path.join(args.directory, filename))
@@ -0,0 +1,117 @@
+"""
+导入变更集
+在真正写库之前，计算每个目标表会新增、更新、保持不变多少行：
+
+- 试运行（dry run）：只解析和比对，不修改任何表，也不更新导入清单；
+  各表的汇总和示例差异写入 logs/ingest_dryrun.json
+- 跳过无变化的写入：save_* 按内容哈希跳过与数据库一致的行，skip_unchanged 记录整批都没有变化的表（或数据块）
+
+环境变量:
+    LCOA_DRYRUN_REPORT          试运行报告的路径，默认为项目根目录下的 logs/ingest_dryrun.json
+    LCOA_DRYRUN_SAMPLE_SIZE     报告中每个表的新增、更新示例条数，默认5
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+from lcoa.datedeal.ingest_logging import get_logger
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DRYRUN_REPORT = os.environ.get('LCOA_DRYRUN_REPORT', os.path.join(project_root, 'logs', 'ingest_dryrun.json'))
+DRYRUN_SAMPLE_SIZE = int(os.environ.get('LCOA_DRYRUN_SAMPLE_SIZE', '5'))
+
+logger = get_logger('datedeal.changeset')
+
+
+def table_models():
+    """
+    目标表名到模型类的映射（延迟导入 lcoa.app）
+
+    Returns:
+        dict: 目标表名 -> 模型类
+    """
+    from lcoa.app import Lcoa, SysNodeal, SysXiangxi, SysClub
+    return {'lcoa': Lcoa, 'sys_nodeal': SysNodeal, 'sys_xiangxi': SysXiangxi, 'sys_club': SysClub}
+
+
+def table_changeset(table_name, rows, sample_size=None, max_id=None):
+    """
+    计算一个目标表的变更集（需要在应用上下文中调用）
+
+    Args:
+        table_name (str): 目标表名
+        rows (list): 要写入的数据行
+        sample_size (int): 示例条数，默认 LCOA_DRYRUN_SAMPLE_SIZE
+        max_id (int): 只与id不大于该值的记录比较（见 compute_changeset）
+
+    Returns:
+        dict: compute_changeset 的结果，另加 'seconds' 计算耗时
+    """
+    from lcoa.app import db, compute_changeset
+
+    start = time.perf_counter()
+    changeset = compute_changeset(db, table_models()[table_name], table_name, rows,
+                                  DRYRUN_SAMPLE_SIZE if sample_size is None else sample_size, max_id)
+    changeset['seconds'] = round(time.perf_counter() - start, 3)
+    return changeset
+
+
+def log_changeset(changeset):
+    """输出一个表的变更集汇总（示例差异只在DEBUG级别输出）"""
+    logger.info("试运行 %s: %d 行, 新增 %d 条, 更新 %d 条, 未变化 %d 条, 早于已有记录 %d 条", changeset['table'],
+                changeset['rows'], changeset['inserted'], changeset['updated'], changeset['unchanged'],
+                changeset['outdated'])
+    for update in changeset['sample_updates']:
+        logger.debug("  更新 %s: %s", update['key'], update['changes'])
+    for insert in changeset['sample_inserts']:
+        logger.debug("  新增 %s", insert)
+
+
+def write_changeset_report(changesets, files, path=None):
+    """
+    把试运行的变更集写入报告文件
+
+    Args:
+        changesets (list): 各表的变更集
+        files (list): 参与试运行的文件名
+        path (str): 报告路径，默认 DRYRUN_REPORT
+
+    Returns:
+        str: 报告路径
+    """
+    path = path or DRYRUN_REPORT
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'files': files,
+        'tables': changesets,
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logger.info("试运行报告已写入 %s", path)
+    return path
+
+
+def skip_unchanged(table_name, save):
+    """
+    包装写入函数：数据与数据库一致（没有新增也没有更新）时记录日志，并在结果中标记为跳过
+
+    save_*（upsert_values、save_with_comparison）写入前已经按键查询了已有记录的内容哈希，内容相同的行不发出任何语句，
+    数据块与数据库一致时本来就不会写库；这里不再单独计算一次变更集，否则每个数据块的键都要查询两次
+
+    Args:
+        table_name (str): 目标表名
+        save (callable): 写入函数 save(rows)
+
+    Returns:
+        callable: 新的写入函数，数据与数据库一致时返回的结果带有 'skipped': True
+    """
+    def save_if_changed(rows):
+        result = save(rows)
+        if result is not None and result['inserted'] == 0 and result['updated'] == 0:
+            logger.info("%s 表的 %d 行数据与数据库一致，没有写入", table_name, len(rows))
+            result['skipped'] = True
+        return result
+    return save_if_changed
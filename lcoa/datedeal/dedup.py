@@ -0,0 +1,235 @@
+"""
+外存去重
+按 (第二列, 第三列) 去重，同一个键保留提取日期（第一列）最新的记录，日期相同时保留后出现的记录，
+结果按每个键第一次出现的顺序输出（与原先 dict 覆盖写入的顺序一致）
+
+数据行已经全部在内存中（列表）时，只保存 键 -> 胜出行的下标，不再复制一份数据行；
+以迭代器方式输入时，内存中每个键只保留一条当前胜出的记录，估算的内存占用超过预算时，把内存中的记录按键的哈希
+分区追加写入临时文件并清空内存，最后逐个分区在内存中合并，各分区的结果再按首次出现的顺序归并输出，
+峰值内存约为 预算 + 单个分区的大小
+
+环境变量:
+    LCOA_DEDUP_MEMORY_MB    去重使用的内存预算（MB），默认256
+    LCOA_DEDUP_PARTITIONS   溢出到磁盘时的分区数，默认16
+    LCOA_DEDUP_SPILL_DIR    临时分区文件所在目录，默认使用系统临时目录
+"""
+import heapq
+import os
+import pickle
+import shutil
+import tempfile
+
+from lcoa.datedeal.ingest_logging import get_logger
+
+DEFAULT_MEMORY_BYTES = int(float(os.environ.get('LCOA_DEDUP_MEMORY_MB', '256')) * 1024 * 1024)
+DEFAULT_PARTITIONS = int(os.environ.get('LCOA_DEDUP_PARTITIONS', '16'))
+SPILL_DIR = os.environ.get('LCOA_DEDUP_SPILL_DIR') or None
+
+# 每条记录在字典中的额外开销估算（字典槽位、键元组、记录列表）
+RECORD_OVERHEAD_BYTES = 250
+# 每个单元格字符串对象的固定开销估算
+CELL_OVERHEAD_BYTES = 50
+# 写入分区文件和读取排序结果时每批的记录数（批量pickle比逐条pickle快得多）
+SPILL_BATCH_SIZE = 10000
+
+logger = get_logger('datedeal.dedup')
+
+
+def estimate_row_bytes(row):
+    """估算一条数据行占用的内存（字节），按字符串长度粗略估计（数据行的单元格都是字符串）"""
+    return RECORD_OVERHEAD_BYTES + len(row) * CELL_OVERHEAD_BYTES + sum(map(len, row))
+
+
+def _merge_record(records, key, first_sequence, date, sequence, row):
+    """把一条记录 [首次序号, 日期, 序号, 数据行] 合并到 records 中：(日期, 序号) 较大的记录胜出"""
+    current = records.get(key)
+    if current is None:
+        records[key] = [first_sequence, date, sequence, row]
+        return
+    if first_sequence < current[0]:
+        current[0] = first_sequence
+    if (date, sequence) >= (current[1], current[2]):
+        current[1], current[2], current[3] = date, sequence, row
+
+
+def _iter_pickled(f):
+    """依次读取文件中连续写入的pickle批次，逐条返回批次中的对象"""
+    while True:
+        try:
+            batch = pickle.load(f)
+        except EOFError:
+            return
+        yield from batch
+
+
+def _dump_batches(items, f):
+    """把记录按批写入文件"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= SPILL_BATCH_SIZE:
+            pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+            batch = []
+    if batch:
+        pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class ExternalDeduplicator:
+    """
+    受内存预算约束的流式去重器
+
+    Example:
+        deduplicator = ExternalDeduplicator()
+        for row in rows:
+            deduplicator.add(row)
+        unique_rows = list(deduplicator.iter_unique())
+    """
+
+    def __init__(self, memory_bytes=None, partitions=None, spill_dir=None):
+        """
+        Args:
+            memory_bytes (int): 内存预算（字节），默认 LCOA_DEDUP_MEMORY_MB
+            partitions (int): 溢出到磁盘时的分区数，默认 LCOA_DEDUP_PARTITIONS
+            spill_dir (str): 临时分区文件所在目录，默认 LCOA_DEDUP_SPILL_DIR 或系统临时目录
+        """
+        self.memory_bytes = DEFAULT_MEMORY_BYTES if memory_bytes is None else memory_bytes
+        self.partitions = max(1, partitions or DEFAULT_PARTITIONS)
+        self.spill_dir = spill_dir or SPILL_DIR
+        self.records = {}
+        self.estimated_bytes = 0
+        self.rows_in = 0
+        self.spills = 0
+        self._work_dir = None
+        self._partition_files = None
+        self._sorted_files = []
+
+    def add(self, row):
+        """添加一条数据行（第一列为提取日期）"""
+        self.extend((row,))
+
+    def extend(self, rows):
+        """添加多条数据行"""
+        records = self.records
+        sequence = self.rows_in
+        for row in rows:
+            key = (row[1], row[2]) if len(row) >= 3 else (None, sequence)
+            date = row[0] if row else ''
+            current = records.get(key)
+            if current is None:
+                # 内存中的字典按首次出现的顺序插入，序号单调递增
+                records[key] = [sequence, date, sequence, row]
+                self.estimated_bytes += estimate_row_bytes(row)
+                if self.estimated_bytes > self.memory_bytes:
+                    self._spill()
+                    records = self.records
+            elif date >= current[1]:
+                current[1], current[2], current[3] = date, sequence, row
+            sequence += 1
+            self.rows_in = sequence
+
+    def _spill(self):
+        """把内存中的记录按键的哈希写入分区文件并清空内存"""
+        if self._partition_files is None:
+            self._work_dir = tempfile.mkdtemp(prefix='lcoa_dedup_', dir=self.spill_dir)
+            self._partition_files = [
+                open(os.path.join(self._work_dir, f'partition_{index}.pkl'), 'w+b')
+                for index in range(self.partitions)
+            ]
+        partitions = [[] for _ in range(self.partitions)]
+        for key, record in self.records.items():
+            partitions[hash(key) % self.partitions].append((key, *record))
+        for records, f in zip(partitions, self._partition_files):
+            if records:
+                pickle.dump(records, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spills += 1
+        logger.debug("去重内存超过预算，第 %d 次写入分区文件: %d 个键", self.spills, len(self.records))
+        self.records = {}
+        self.estimated_bytes = 0
+
+    def _iter_partition_winners(self, f):
+        """合并一个分区文件中的记录，按首次出现的顺序返回 [首次序号, 数据行]"""
+        f.seek(0)
+        records = {}
+        for key, first_sequence, date, sequence, row in _iter_pickled(f):
+            _merge_record(records, key, first_sequence, date, sequence, row)
+        return sorted(((record[0], record[3]) for record in records.values()), key=lambda winner: winner[0])
+
+    def iter_unique(self):
+        """
+        输出去重后的数据行（按每个键第一次出现的顺序）
+
+        Yields:
+            list: 数据行
+        """
+        if self._partition_files is None:
+            for record in self.records.values():
+                yield record[3]
+            return
+
+        try:
+            self._spill()
+            # 各分区合并后按首次序号排好序写回磁盘，再多路归并，内存中只保留一个分区
+            for index, f in enumerate(self._partition_files):
+                sorted_file = open(os.path.join(self._work_dir, f'sorted_{index}.pkl'), 'w+b')
+                _dump_batches(self._iter_partition_winners(f), sorted_file)
+                f.close()
+                sorted_file.seek(0)
+                self._sorted_files.append(sorted_file)
+
+            for _, row in heapq.merge(*(_iter_pickled(f) for f in self._sorted_files), key=lambda winner: winner[0]):
+                yield row
+        finally:
+            self.close()
+
+    def close(self):
+        """删除临时分区文件"""
+        if self._work_dir is not None:
+            for f in self._partition_files + self._sorted_files:
+                f.close()
+            shutil.rmtree(self._work_dir, ignore_errors=True)
+            self._work_dir = None
+            self._partition_files = None
+            self._sorted_files = []
+        self.records = {}
+        self.estimated_bytes = 0
+
+
+def _winning_offsets(rows):
+    """
+    已经全部在内存中的数据行：只保存 键 -> 胜出行的下标，额外内存只有键和整数下标
+
+    字典保持键第一次插入的位置，更新下标不改变顺序，因此结果按每个键第一次出现的顺序排列
+    """
+    winners = {}
+    for offset, row in enumerate(rows):
+        key = (row[1], row[2]) if len(row) >= 3 else (None, offset)
+        current = winners.get(key)
+        if current is None or row[0] >= rows[current][0]:
+            winners[key] = offset
+    return [rows[offset] for offset in winners.values()]
+
+
+def deduplicate_rows(rows, memory_bytes=None):
+    """
+    按 (第二列, 第三列) 去重，同一个键保留提取日期最新的记录（日期相同时保留后出现的）
+
+    rows 为列表时数据已在内存中，只记录胜出行的下标；为其他可迭代对象（例如流式读取的生成器）时
+    使用 ExternalDeduplicator，超过内存预算后溢出到磁盘
+
+    Args:
+        rows (iterable): 数据行
+        memory_bytes (int): 内存预算（字节），默认 LCOA_DEDUP_MEMORY_MB
+
+    Returns:
+        tuple: (去重后的数据行列表, 输入行数, 溢出到磁盘的次数)
+    """
+    if isinstance(rows, list):
+        return _winning_offsets(rows), len(rows), 0
+
+    deduplicator = ExternalDeduplicator(memory_bytes)
+    try:
+        deduplicator.extend(rows)
+        unique_rows = list(deduplicator.iter_unique())
+        return unique_rows, deduplicator.rows_in, deduplicator.spills
+    finally:
+        deduplicator.close()
@@ -0,0 +1,376 @@
+"""
+导出文件目录索引
+缓存目录中每个文件的 文件名、从文件名解析的日期、文件大小、修改时间、工作表个数，
+按日期排好序，"最接近某个日期的文件"、"日期范围内的所有文件"、"最新的N个文件"都在排好序的索引上二分查找，
+不再每次调用都 os.listdir 并对每个文件名重新匹配正则
+
+- 刷新是增量的：目录的修改时间没有变化（没有新增、删除、重命名文件）时不重新列目录；
+  目录变化时重新列目录，已知文件名的日期直接复用，只有新文件名需要解析
+- 索引保存在磁盘上（JSON），进程重启后也不需要重新解析
+- 工作表个数在第一次查询时读取工作簿目录得到，按文件大小和修改时间缓存
+
+文件被原地改写不会改变目录的修改时间，索引中的大小和修改时间可能是旧值；
+需要准确签名的地方（导入清单、目录监听）仍然自己 os.stat
+
+环境变量:
+    LCOA_FILE_CATALOG           设为0时不把索引保存到磁盘（进程内仍然缓存）
+    LCOA_FILE_CATALOG_DIR       索引文件所在目录，默认为项目根目录下的 cache/file_catalog
+"""
+import bisect
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, datetime
+from functools import lru_cache
+
+from lcoa.datedeal.ingest_logging import get_logger
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATALOG_PERSIST = os.environ.get('LCOA_FILE_CATALOG', '1') != '0'
+CATALOG_DIR = os.environ.get('LCOA_FILE_CATALOG_DIR', os.path.join(project_root, 'cache', 'file_catalog'))
+
+# 索引格式版本，字段发生不兼容的变化时递增，使旧索引全部失效
+CATALOG_VERSION = 1
+
+# 目录修改时间距离现在不足该秒数时不信任它（部分文件系统的时间精度为1~2秒，同一秒内的后续改动不会改变修改时间）
+MTIME_SETTLE_SECONDS = 2.0
+
+# 文件名中的日期格式，按顺序尝试
+DATE_PATTERNS = [
+    # 格式1: 2025-09-29
+    (re.compile(r'(\d{4}-\d{2}-\d{2})'), '%Y-%m-%d'),
+    # 格式2: 2025年10月09日
+    (re.compile(r'(\d{4}年\d{1,2}月\d{1,2}日)'), '%Y年%m月%d日'),
+    # 格式3: 20250929
+    (re.compile(r'(\d{8})'), '%Y%m%d'),
+]
+
+logger = get_logger('datedeal.file_catalog')
+
+
+@lru_cache(maxsize=65536)
+def parse_filename_date(filename):
+    """
+    从文件名中解析日期（结果按文件名缓存）
+
+    Args:
+        filename (str): 文件名
+
+    Returns:
+        datetime: 解析到的日期，如果未找到则返回None
+    """
+    for pattern, date_format in DATE_PATTERNS:
+        match = pattern.search(filename)
+        if match:
+            try:
+                return datetime.strptime(match.group(1), date_format)
+            except ValueError:
+                pass
+    return None
+
+
+def _date_key(value):
+    """把 datetime / date / 'YYYY-MM-DD' 转换为索引中使用的日期字符串"""
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def count_sheets(file_path):
+    """
+    读取工作簿中的工作表个数（只读取工作簿目录，不解析单元格）
+
+    Args:
+        file_path (str): Excel文件路径
+
+    Returns:
+        int: 工作表个数，无法读取时返回None
+    """
+    try:
+        if file_path.endswith('.xlsx'):
+            from openpyxl import load_workbook
+            workbook = load_workbook(file_path, read_only=True)
+            try:
+                return len(workbook.sheetnames)
+            finally:
+                workbook.close()
+        import pandas as pd
+        with pd.ExcelFile(file_path) as excel_file:
+            return len(excel_file.sheet_names)
+    except Exception as e:
+        logger.debug("无法读取 %s 的工作表: %s", file_path, e)
+        return None
+
+
+class FileCatalog:
+    """
+    一个目录的文件索引（线程安全）
+
+    Example:
+        catalog = get_catalog(directory_path)
+        entry = catalog.closest()
+        recent = catalog.newest(3)
+    """
+
+    def __init__(self, directory_path, persist=None, catalog_dir=None):
+        """
+        Args:
+            directory_path (str): 目录路径
+            persist (bool): 是否把索引保存到磁盘，默认 LCOA_FILE_CATALOG
+            catalog_dir (str): 索引文件所在目录，默认 LCOA_FILE_CATALOG_DIR
+        """
+        self.directory_path = directory_path
+        self.persist = CATALOG_PERSIST if persist is None else persist
+        self.catalog_dir = catalog_dir or CATALOG_DIR
+        self.lock = threading.RLock()
+        # 文件名 -> {'filename', 'date', 'size', 'mtime', 'sheet_count', 'sheet_signature'}
+        self.entries = {}
+        # 有日期的文件按 (日期, 文件名) 排序
+        self.index = []
+        self.dir_mtime = None
+        self.scans = 0
+        self._loaded = False
+
+    @property
+    def catalog_path(self):
+        """索引文件路径（按目录的绝对路径区分）"""
+        digest = hashlib.sha1(os.path.abspath(self.directory_path).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.catalog_dir, f'{digest}.json')
+
+    def _load(self):
+        """读取磁盘上的索引（只在第一次刷新时执行）"""
+        self._loaded = True
+        if not self.persist or not os.path.exists(self.catalog_path):
+            return
+        try:
+            with open(self.catalog_path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("读取文件索引 %s 失败，重新建立: %s", self.catalog_path, e)
+            return
+        if saved.get('version') != CATALOG_VERSION \
+                or saved.get('directory') != os.path.abspath(self.directory_path):
+            return
+        self.entries = {entry['filename']: entry for entry in saved['entries']}
+        self.dir_mtime = saved.get('dir_mtime')
+        self._rebuild_index()
+
+    def _save(self):
+        """把索引写入磁盘（先写临时文件再替换，避免其他进程读到写了一半的文件）"""
+        if not self.persist:
+            return
+        try:
+            os.makedirs(self.catalog_dir, exist_ok=True)
+            tmp_path = f'{self.catalog_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': CATALOG_VERSION,
+                    'directory': os.path.abspath(self.directory_path),
+                    'dir_mtime': self.dir_mtime,
+                    'entries': list(self.entries.values()),
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, self.catalog_path)
+        except OSError as e:
+            logger.warning("保存文件索引 %s 失败: %s", self.catalog_path, e)
+
+    def _rebuild_index(self):
+        self.index = sorted((entry['date'], filename) for filename, entry in self.entries.items() if entry['date'])
+
+    def refresh(self, force=False):
+        """
+        按目录的修改时间增量刷新索引
+
+        Args:
+            force (bool): 为True时不论目录是否变化都重新列目录
+
+        Returns:
+            bool: 是否重新列了目录
+        """
+        with self.lock:
+            if not self._loaded:
+                self._load()
+
+            try:
+                dir_mtime = os.stat(self.directory_path).st_mtime_ns
+            except OSError:
+                if self.entries or self.dir_mtime is not None:
+                    logger.warning("目录 %s 不存在", self.directory_path)
+                    self.entries, self.index, self.dir_mtime = {}, [], None
+                return False
+
+            if not force and dir_mtime == self.dir_mtime:
+                return False
+
+            entries = {}
+            with os.scandir(self.directory_path) as it:
+                for dir_entry in it:
+                    if not dir_entry.is_file():
+                        continue
+                    stat = dir_entry.stat()
+                    entry = self.entries.get(dir_entry.name)
+                    if entry is None:
+                        parsed = parse_filename_date(dir_entry.name)
+                        entry = {
+                            'filename': dir_entry.name,
+                            'date': parsed.strftime('%Y-%m-%d') if parsed else None,
+                            'sheet_count': None,
+                            'sheet_signature': None,
+                        }
+                    entry['size'] = stat.st_size
+                    entry['mtime'] = stat.st_mtime_ns
+                    entries[dir_entry.name] = entry
+
+            self.entries = entries
+            self._rebuild_index()
+            self.scans += 1
+            # 刚刚修改过的目录下次仍然重新列目录
+            self.dir_mtime = dir_mtime if time.time() - dir_mtime / 1e9 >= MTIME_SETTLE_SECONDS else None
+            self._save()
+            logger.debug("刷新文件索引 %s: %d 个文件，%d 个有日期", self.directory_path, len(entries), len(self.index))
+            return True
+
+    def filenames(self):
+        """
+        目录中的所有文件名（不含子目录）
+
+        Returns:
+            list: 按文件名排序的文件名列表
+        """
+        self.refresh()
+        with self.lock:
+            return sorted(self.entries)
+
+    def get(self, filename):
+        """获取一个文件的索引条目，不存在时返回None"""
+        self.refresh()
+        with self.lock:
+            entry = self.entries.get(filename)
+            return dict(entry) if entry else None
+
+    def closest(self, target=None):
+        """
+        查找日期最接近 target 的文件
+
+        Args:
+            target (datetime|date|str): 目标日期，默认为当前时间
+
+        Returns:
+            dict: 索引条目，另加 'diff_days'（与目标日期相差的天数）；没有带日期的文件时返回None
+        """
+        target = datetime.now() if target is None else target
+        if isinstance(target, str):
+            target = datetime.strptime(target, '%Y-%m-%d')
+        elif not isinstance(target, datetime):
+            target = datetime(target.year, target.month, target.day)
+
+        self.refresh()
+        with self.lock:
+            if not self.index:
+                return None
+            position = bisect.bisect_left(self.index, (_date_key(target), ''))
+            # 最接近的日期只可能在插入位置的两侧：左侧取该日期的第一个文件，右侧取插入位置的文件
+            candidates = []
+            if position > 0:
+                left_date = self.index[position - 1][0]
+                candidates.append(self.index[bisect.bisect_left(self.index, (left_date, ''))])
+            if position < len(self.index):
+                candidates.append(self.index[position])
+
+            best = None
+            for file_date, filename in candidates:
+                diff_days = abs((target - datetime.strptime(file_date, '%Y-%m-%d')).days)
+                if best is None or diff_days < best[0]:
+                    best = (diff_days, filename)
+            entry = dict(self.entries[best[1]])
+            entry['diff_days'] = best[0]
+            return entry
+
+    def between(self, start=None, end=None):
+        """
+        日期在 [start, end] 范围内的所有文件（含两端）
+
+        Args:
+            start (datetime|date|str): 起始日期，默认不限
+            end (datetime|date|str): 结束日期，默认不限
+
+        Returns:
+            list: 索引条目列表，按 (日期, 文件名) 排序
+        """
+        self.refresh()
+        with self.lock:
+            low = bisect.bisect_left(self.index, (_date_key(start), '')) if start is not None else 0
+            high = bisect.bisect_right(self.index, (_date_key(end), '\U0010ffff')) if end is not None \
+                else len(self.index)
+            return [dict(self.entries[filename]) for _, filename in self.index[low:high]]
+
+    def newest(self, n=1):
+        """
+        日期最新的 n 个文件
+
+        Args:
+            n (int): 文件个数
+
+        Returns:
+            list: 索引条目列表，最新的在前
+        """
+        self.refresh()
+        with self.lock:
+            return [dict(self.entries[filename]) for _, filename in reversed(self.index[-n:])] if n > 0 else []
+
+    def sheet_count(self, filename):
+        """
+        工作簿中的工作表个数（按文件大小和修改时间缓存）
+
+        Args:
+            filename (str): 文件名
+
+        Returns:
+            int: 工作表个数，文件不存在或无法读取时返回None
+        """
+        file_path = os.path.join(self.directory_path, filename)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        signature = [stat.st_size, stat.st_mtime_ns]
+
+        with self.lock:
+            entry = self.entries.get(filename)
+            if entry is not None and entry['sheet_signature'] == signature and entry['sheet_count'] is not None:
+                return entry['sheet_count']
+
+        sheet_count = count_sheets(file_path)
+        with self.lock:
+            entry = self.entries.get(filename)
+            if entry is not None and sheet_count is not None:
+                entry['sheet_count'] = sheet_count
+                entry['sheet_signature'] = signature
+                self._save()
+        return sheet_count
+
+
+# 进程内的目录索引：绝对路径 -> FileCatalog
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(directory_path):
+    """
+    获取目录的文件索引（同一进程内共享同一个实例）
+
+    Args:
+        directory_path (str): 目录路径
+
+    Returns:
+        FileCatalog: 目录索引
+    """
+    key = os.path.abspath(directory_path)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = FileCatalog(directory_path)
+        return catalog
@@ -1,7 +1,14 @@
 import os
-import re
+import sys
 from datetime import datetime
 
+# 添加项目路径到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from lcoa.datedeal.file_catalog import get_catalog, parse_filename_date
+
 def extract_date_from_filename(filename):
     """
     从文件名中提取日期信息
@@ -12,36 +19,11 @@ def extract_date_from_filename(filename):
     Returns:
         datetime: 提取到的日期对象，如果未找到则返回None
     """
-    # 尝试多种日期格式
-    # 格式1: 2025-09-29
-    match1 = re.search(r'(\d{4}-\d{2}-\d{2})', filename)
-    if match1:
-        try:
-            return datetime.strptime(match1.group(1), '%Y-%m-%d')
-        except ValueError:
-            pass
-
-    # 格式2: 2025年10月09日
-    match2 = re.search(r'(\d{4}年\d{1,2}月\d{1,2}日)', filename)
-    if match2:
-        try:
-            return datetime.strptime(match2.group(1), '%Y年%m月%d日')
-        except ValueError:
-            pass
-
-    # 格式3: 20250929
-    match3 = re.search(r'(\d{8})', filename)
-    if match3:
-        try:
-            return datetime.strptime(match3.group(1), '%Y%m%d')
-        except ValueError:
-            pass
-
-    return None
+    return parse_filename_date(filename)
 
 def find_closest_file_to_current_date(directory_path):
     """
-    在指定目录中查找最接近当前日期的文件
+    在指定目录中查找最接近当前日期的文件（在目录索引上二分查找，见 file_catalog.py）
 
     Args:
         directory_path (str): 目录路径
@@ -54,41 +36,10 @@ def find_closest_file_to_current_date(directory_path):
         print(f"目录 {directory_path} 不存在")
         return None, None, None
 
-    # 获取当前日期
-    current_date = datetime.now()
-    
-    closest_file = None
-    closest_date = None
-    min_diff_days = float('inf')
-
-    # 遍历目录中的所有文件
-    for filename in os.listdir(directory_path):
-        # 获取文件的完整路径
-        file_path = os.path.join(directory_path, filename)
-        
-        # 只处理文件，跳过目录
-        if os.path.isfile(file_path):
-            print(f"正在处理文件: {filename}")
-            
-            # 从文件名提取日期
-            file_date = extract_date_from_filename(filename)
-            
-            if file_date:
-                # 计算与当前日期的差距（绝对值）
-                diff_days = abs((current_date - file_date).days)
-                
-                print(f"提取的日期: {file_date.strftime('%Y-%m-%d')}, 与当前日期相差: {diff_days} 天")
-                
-                # 更新最接近的文件
-                if diff_days < min_diff_days:
-                    min_diff_days = diff_days
-                    closest_file = filename
-                    closest_date = file_date
-            else:
-                print(f"未能从文件名中提取日期信息")
-
-    if closest_file:
-        return closest_file, min_diff_days, closest_date
+    entry = get_catalog(directory_path).closest(datetime.now())
+    if entry:
+        print(f"提取的日期: {entry['date']}, 与当前日期相差: {entry['diff_days']} 天")
+        return entry['filename'], entry['diff_days'], parse_filename_date(entry['filename'])
     else:
         return None, None, None
 
@@ -107,21 +58,10 @@ def list_all_files_with_dates(directory_path):
         print(f"目录 {directory_path} 不存在")
         return []
 
-    files_with_dates = []
-    
-    # 遍历目录中的所有文件
-    for filename in os.listdir(directory_path):
-        # 获取文件的完整路径
-        file_path = os.path.join(directory_path, filename)
-        
-        # 只处理文件，跳过目录
-        if os.path.isfile(file_path):
-            # 从文件名提取日期
-            file_date = extract_date_from_filename(filename)
-            
-            files_with_dates.append((filename, file_date))
-            
-    return files_with_dates
+    return [
+        (filename, parse_filename_date(filename))
+        for filename in get_catalog(directory_path).filenames()
+    ]
 
 if __name__ == "__main__":
     # 指定要搜索的目录路径
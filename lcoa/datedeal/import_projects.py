@@ -20,6 +20,8 @@ except ImportError:
 
 from datetime import datetime
 
+from lcoa.datedeal.workbook_reader import list_export_workbooks
+
 
 def sort_and_validate_milestones(milestones):
     """
@@ -563,20 +565,19 @@ def batch_import_projects_from_directory(directory_path):
     total_success = 0
     total_failed = 0
     
-    # 遍历目录中的所有Excel文件
-    for filename in os.listdir(directory_path):
-        if filename.endswith(('.xlsx', '.xls')) and not filename.startswith('~$'):
-            file_path = os.path.join(directory_path, filename)
-            print(f"正在处理文件: {filename}")
+    # 遍历目录中的所有Excel文件（来自目录索引，见 file_catalog.py）
+    for filename in list_export_workbooks(directory_path):
+        file_path = os.path.join(directory_path, filename)
+        print(f"正在处理文件: {filename}")
             
-            result = import_projects_from_excel(file_path)
-            result['file_name'] = filename
-            results.append(result)
+        result = import_projects_from_excel(file_path)
+        result['file_name'] = filename
+        results.append(result)
             
-            if result['success']:
-                total_success += len(result.get('imported_projects', []))
-            else:
-                total_failed += 1
+        if result['success']:
+            total_success += len(result.get('imported_projects', []))
+        else:
+            total_failed += 1
     
     return {
         'success': True,
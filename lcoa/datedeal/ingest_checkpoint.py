@@ -0,0 +1,143 @@
+"""
+导入检查点
+流式模式和流水线模式每提交一个数据块，就在 ingest_checkpoint 表中记录该 (文件, 工作表, 目标表) 已提交的数据块个数；
+一个文件的所有数据块都写入成功后立即写入导入清单并删除它的检查点
+
+导入中途失败（例如写库时MySQL断开）后重新运行：
+- 已写入导入清单的文件不会再出现在待导入列表中
+- 中断的文件只重新读取，已提交的数据块跳过写库，从中断的数据块继续
+
+检查点与文件内容哈希和分块大小绑定，文件内容或分块大小变化后检查点失效，整个文件重新写入。
+数据块提交和检查点提交之间中断时，该数据块会被重新写入一次，save_*_with_comparison 按键更新，结果不变
+"""
+from lcoa.datedeal.ingest_logging import get_logger
+from lcoa.datedeal.ingest_manifest import record_ingested_workbooks
+from lcoa.datedeal.workbook_reader import SHEET_ROUTES
+
+logger = get_logger('datedeal.ingest_checkpoint')
+
+
+def ensure_checkpoint_table(db, IngestCheckpoint):
+    """确保导入检查点表存在（兼容尚未执行 create_tables 的旧数据库）"""
+    IngestCheckpoint.__table__.create(db.engine, checkfirst=True)
+
+
+class IngestCheckpoints:
+    """一次导入运行的检查点（需要在应用上下文中使用）"""
+
+    def __init__(self, db, IngestCheckpoint, IngestManifest, fingerprints, chunk_size):
+        """
+        Args:
+            db: SQLAlchemy数据库实例
+            IngestCheckpoint: IngestCheckpoint模型类
+            IngestManifest: IngestManifest模型类
+            fingerprints (list): 本次待导入文件的指纹（find_pending_workbooks 的结果）
+            chunk_size (int): 分块行数
+        """
+        self.db = db
+        self.IngestCheckpoint = IngestCheckpoint
+        self.IngestManifest = IngestManifest
+        self.fingerprints = {fp['filename']: fp for fp in fingerprints}
+        self.chunk_size = chunk_size
+        # (文件名, 目标表名) -> IngestCheckpoint
+        self.entries = {}
+        # (文件名, 目标表名) -> 已提交的数据块个数和行数（避免提交后读取过期的ORM属性再查询数据库）
+        self.progress = {}
+        self.rows_done = {}
+        self.failed_files = set()
+        self.finished_files = set()
+
+    def load(self):
+        """
+        读取待导入文件的检查点，内容哈希或分块大小不一致的检查点直接删除
+
+        Returns:
+            int: 可以续传的检查点个数
+        """
+        if not self.fingerprints:
+            return 0
+
+        stale = False
+        for entry in self.IngestCheckpoint.query.filter(
+            self.IngestCheckpoint.filename.in_(list(self.fingerprints))
+        ).all():
+            fingerprint = self.fingerprints[entry.filename]
+            if entry.content_hash != fingerprint['content_hash'] or entry.chunk_size != self.chunk_size:
+                self.db.session.delete(entry)
+                stale = True
+                continue
+            self.entries[(entry.filename, entry.table_name)] = entry
+            self.progress[(entry.filename, entry.table_name)] = entry.chunks_done
+            self.rows_done[(entry.filename, entry.table_name)] = entry.rows_done
+        if stale:
+            self.db.session.commit()
+
+        if self.entries:
+            logger.info("从检查点续传: %s", ', '.join(
+                f"{filename}/{table_name} 已完成 {chunks_done} 块"
+                for (filename, table_name), chunks_done in self.progress.items()
+            ))
+        return len(self.entries)
+
+    def is_done(self, filename, table_name, chunk_index):
+        """该数据块是否已在之前的运行中提交"""
+        return chunk_index < self.progress.get((filename, table_name), 0)
+
+    def record_chunk(self, filename, table_name, chunk_index, rows):
+        """
+        记录一个已提交的数据块
+
+        Args:
+            filename (str): 文件名
+            table_name (str): 目标表名
+            chunk_index (int): 数据块在该文件、该目标表中的序号（从0开始）
+            rows (int): 数据块的行数
+        """
+        fingerprint = self.fingerprints.get(filename)
+        # 文件中已有数据块写入失败时不再推进检查点，续传时从失败的数据块开始
+        if fingerprint is None or filename in self.failed_files:
+            return
+
+        key = (filename, table_name)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.IngestCheckpoint(
+                filename=filename,
+                content_hash=fingerprint['content_hash'],
+                sheet_index=SHEET_ROUTES[table_name],
+                table_name=table_name,
+                chunk_size=self.chunk_size,
+                chunks_done=0,
+                rows_done=0
+            )
+            self.db.session.add(entry)
+            self.entries[key] = entry
+        entry.chunks_done = chunk_index + 1
+        self.rows_done[key] = self.rows_done.get(key, 0) + rows
+        entry.rows_done = self.rows_done[key]
+        self.db.session.commit()
+        self.progress[key] = chunk_index + 1
+
+    def mark_failed(self, filename):
+        """标记文件有数据块写入失败，该文件不会写入导入清单"""
+        self.failed_files.add(filename)
+
+    def finish_file(self, filename):
+        """
+        文件的所有数据块都已写入：写入导入清单并删除该文件的检查点
+
+        Returns:
+            bool: 是否写入了导入清单（有数据块失败或不是本次待导入的文件时返回False）
+        """
+        if filename in self.finished_files or filename in self.failed_files or filename not in self.fingerprints:
+            return False
+
+        record_ingested_workbooks(self.db, self.IngestManifest, [self.fingerprints[filename]])
+        self.IngestCheckpoint.query.filter_by(filename=filename).delete()
+        self.db.session.commit()
+        for key in [key for key in self.entries if key[0] == filename]:
+            del self.entries[key]
+            self.progress.pop(key, None)
+            self.rows_done.pop(key, None)
+        self.finished_files.add(filename)
+        return True
@@ -0,0 +1,141 @@
+"""
+导入任务锁
+保证同一时间只有一个导入任务（定时任务、目录监听服务、手动运行）写入 lcoa / sys_nodeal 等表
+
+进程之间使用锁文件上的操作系统文件锁（Linux 为 fcntl.flock，Windows 为 msvcrt.locking），同一进程内的线程之间再加一把线程锁。
+文件锁由操作系统在文件关闭或进程退出时释放，持有锁的进程异常退出后不会留下需要清理的过期锁；
+锁文件本身一直保留（删除锁文件会让等待者锁住不同的文件），其中记录最后一个持有者的进程号和获取时间，便于排查
+
+环境变量:
+    LCOA_INGEST_LOCK                 锁文件路径，默认为项目根目录下的 logs/ingest.lock
+"""
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+from lcoa.datedeal.ingest_logging import get_logger
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOCK_PATH = os.environ.get('LCOA_INGEST_LOCK', os.path.join(project_root, 'logs', 'ingest.lock'))
+
+logger = get_logger('datedeal.ingest_lock')
+
+# 同一进程内的线程锁
+_thread_lock = threading.Lock()
+
+
+def _lock_file(fd):
+    """对打开的锁文件加排他锁（不等待），成功返回True，已被其他进程锁住时返回False"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            # 锁住文件的第一个字节（文件为空时也可以锁住）
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock_file(fd):
+    """释放锁文件上的排他锁"""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class IngestLock:
+    """
+    导入任务锁，可作为上下文管理器使用
+
+    Example:
+        lock = IngestLock(timeout=0)
+        if lock.acquire():
+            try:
+                ...
+            finally:
+                lock.release()
+    """
+
+    def __init__(self, path=None, timeout=None, poll_interval=1.0):
+        """
+        Args:
+            path (str): 锁文件路径，默认 LOCK_PATH
+            timeout (float): 等待锁的最长秒数，None表示一直等待，0表示不等待
+            poll_interval (float): 等待时检查锁的间隔（秒）
+        """
+        self.path = path or LOCK_PATH
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd = None
+        self._thread_locked = False
+
+    def _try_lock(self):
+        """尝试锁住锁文件，成功后记录本进程的进程号和获取时间"""
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+        if not _lock_file(fd):
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, f'{os.getpid()} {time.time()}'.encode('utf-8'))
+        self._fd = fd
+        return True
+
+    def acquire(self):
+        """
+        获取锁
+
+        Returns:
+            bool: 是否成功获取锁
+        """
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+
+        if not _thread_lock.acquire(timeout=-1 if self.timeout is None else self.timeout):
+            return False
+        self._thread_locked = True
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        waiting = False
+        while True:
+            if self._try_lock():
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                _thread_lock.release()
+                self._thread_locked = False
+                return False
+            if not waiting:
+                logger.info("导入锁被其他导入任务持有，等待释放: %s", self.path)
+                waiting = True
+            time.sleep(self.poll_interval)
+
+    def release(self):
+        """释放锁"""
+        if self._fd is not None:
+            try:
+                _unlock_file(self._fd)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        if self._thread_locked:
+            self._thread_locked = False
+            _thread_lock.release()
+
+    def __enter__(self):
+        if not self.acquire():
+            raise TimeoutError(f"等待导入锁超时: {self.path}")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
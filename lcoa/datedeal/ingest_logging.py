@@ -0,0 +1,104 @@
+"""
+导入日志
+为 lcoa/datedeal 和 data_service 提供分级日志：默认只输出每个文件、每个表的汇总信息，
+数据行只按采样输出少量示例；完整的数据行输出需要显式开启，生产环境不为诊断输出付出代价
+
+所有日志记录器都在 "lcoa" 之下（例如 lcoa.datedeal.main、lcoa.data_service），
+会同时传播到根记录器，run_scheduled 等入口脚本配置的日志文件也能收到
+
+环境变量:
+    LCOA_LOG_LEVEL          日志级别（DEBUG、INFO、WARNING、ERROR），默认INFO；DEBUG时输出表头、列映射和采样行
+    LCOA_LOG_SAMPLE_ROWS    DEBUG级别下每批数据输出的采样行数，默认3
+    LCOA_LOG_FULL_DUMP      设为1时输出所有数据行，并把去重后的数据保存为数组文件
+"""
+import logging
+import os
+import sys
+
+LOGGER_NAME = 'lcoa'
+
+LOG_LEVEL = os.environ.get('LCOA_LOG_LEVEL', 'INFO').upper()
+SAMPLE_ROWS = int(os.environ.get('LCOA_LOG_SAMPLE_ROWS', '3'))
+FULL_DUMP = os.environ.get('LCOA_LOG_FULL_DUMP', '0') == '1'
+
+_configured = False
+
+
+def configure_logging(level=None):
+    """
+    配置 "lcoa" 记录器：设置级别，并添加一个输出到控制台的处理器（只添加一次）
+
+    Args:
+        level (str): 日志级别，默认读取环境变量 LCOA_LOG_LEVEL
+    """
+    global _configured
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(getattr(logging, (level or LOG_LEVEL).upper(), logging.INFO))
+    if not _configured:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        _configured = True
+
+
+def get_logger(name):
+    """
+    获取 "lcoa" 之下的日志记录器
+
+    Args:
+        name (str): 记录器名称（例如 datedeal.main）
+
+    Returns:
+        Logger: 日志记录器
+    """
+    if not _configured:
+        configure_logging()
+    return logging.getLogger(f'{LOGGER_NAME}.{name}')
+
+
+def full_dump_enabled():
+    """是否开启了完整数据输出"""
+    return FULL_DUMP
+
+
+def log_rows(logger, title, rows, sample=None):
+    """
+    输出一批数据行：INFO级别只输出行数，DEBUG级别输出前 sample 行，开启完整输出时输出所有行
+
+    Args:
+        logger (Logger): 日志记录器
+        title (str): 数据标题
+        rows (list): 数据行
+        sample (int): 采样行数，默认 LCOA_LOG_SAMPLE_ROWS
+    """
+    logger.info("%s: 共 %d 行数据", title, len(rows))
+
+    if FULL_DUMP:
+        for i, row in enumerate(rows):
+            logger.info("Row %d: %s", i + 1, row)
+        return
+
+    if logger.isEnabledFor(logging.DEBUG):
+        sample = SAMPLE_ROWS if sample is None else sample
+        for i, row in enumerate(rows[:sample]):
+            logger.debug("Row %d: %s", i + 1, row)
+        if len(rows) > sample:
+            logger.debug("... 其余 %d 行未输出（设置 LCOA_LOG_FULL_DUMP=1 输出所有行）", len(rows) - sample)
+
+
+def log_frame_preview(logger, label, df, col_index_mapping=None):
+    """
+    DEBUG级别下输出工作表的列名、前两行数据和列映射（DataFrame格式化开销较大，其他级别直接跳过）
+
+    Args:
+        logger (Logger): 日志记录器
+        label (str): 工作表描述（例如 "文件 xxx 的第二个工作表"）
+        df (DataFrame): 工作表数据
+        col_index_mapping (dict): 列索引映射
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug("%s列名: %s", label, list(df.columns))
+    logger.debug("%s前两行数据:\n%s", label, df.head(2))
+    if col_index_mapping is not None:
+        logger.debug("列索引映射: %s", col_index_mapping)
@@ -0,0 +1,133 @@
+"""
+增量导入清单
+以 文件名、文件大小、修改时间、内容哈希 记录已导入的导出文件，
+定时任务只解析和写入新增或内容发生变化的工作簿
+"""
+import hashlib
+import os
+
+# 计算哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_content_hash(file_path):
+    """
+    计算文件内容的SHA-256哈希
+
+    Args:
+        file_path (str): 文件路径
+
+    Returns:
+        str: 十六进制哈希字符串
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(directory_path, filename, with_hash=True):
+    """
+    获取文件的指纹信息
+
+    Args:
+        directory_path (str): 文件所在目录
+        filename (str): 文件名
+        with_hash (bool): 是否计算内容哈希
+
+    Returns:
+        dict: {'filename', 'file_size', 'file_mtime', 'content_hash'}
+    """
+    file_path = os.path.join(directory_path, filename)
+    stat = os.stat(file_path)
+    return {
+        'filename': filename,
+        'file_size': stat.st_size,
+        'file_mtime': stat.st_mtime,
+        'content_hash': file_content_hash(file_path) if with_hash else None,
+    }
+
+
+def ensure_manifest_table(db, IngestManifest):
+    """确保导入清单表存在（兼容尚未执行 create_tables 的旧数据库）"""
+    IngestManifest.__table__.create(db.engine, checkfirst=True)
+
+
+def find_pending_workbooks(db, IngestManifest, directory_path, filenames):
+    """
+    找出需要导入的工作簿（新增文件或内容发生变化的文件）
+
+    文件大小和修改时间都与清单一致时直接视为未变化，不计算哈希；
+    否则计算内容哈希，哈希一致（例如仅被复制或touch）时只刷新清单中的大小和修改时间
+
+    Args:
+        db: SQLAlchemy数据库实例
+        IngestManifest: IngestManifest模型类
+        directory_path (str): 文件所在目录
+        filenames (list): 候选文件名列表
+
+    Returns:
+        list: 需要导入的文件指纹列表，顺序与filenames一致
+    """
+    manifest = {entry.filename: entry for entry in IngestManifest.query.all()}
+
+    pending = []
+    touched = False
+    for filename in filenames:
+        fingerprint = file_fingerprint(directory_path, filename, with_hash=False)
+        entry = manifest.get(filename)
+
+        if entry is not None and entry.file_size == fingerprint['file_size'] \
+                and entry.file_mtime == fingerprint['file_mtime']:
+            continue
+
+        fingerprint['content_hash'] = file_content_hash(os.path.join(directory_path, filename))
+        if entry is not None and entry.content_hash == fingerprint['content_hash']:
+            entry.file_size = fingerprint['file_size']
+            entry.file_mtime = fingerprint['file_mtime']
+            touched = True
+            continue
+
+        pending.append(fingerprint)
+
+    if touched:
+        db.session.commit()
+
+    return pending
+
+
+def all_workbook_fingerprints(directory_path, filenames):
+    """计算所有文件的指纹（用于 --full 全量重建）"""
+    return [file_fingerprint(directory_path, filename) for filename in filenames]
+
+
+def record_ingested_workbooks(db, IngestManifest, fingerprints):
+    """
+    将已成功导入的文件写入清单
+
+    Args:
+        db: SQLAlchemy数据库实例
+        IngestManifest: IngestManifest模型类
+        fingerprints (list): 文件指纹列表
+    """
+    if not fingerprints:
+        return
+
+    existing = {
+        entry.filename: entry
+        for entry in IngestManifest.query.filter(
+            IngestManifest.filename.in_([fp['filename'] for fp in fingerprints])
+        ).all()
+    }
+
+    for fingerprint in fingerprints:
+        entry = existing.get(fingerprint['filename'])
+        if entry is None:
+            db.session.add(IngestManifest(**fingerprint))
+        else:
+            entry.file_size = fingerprint['file_size']
+            entry.file_mtime = fingerprint['file_mtime']
+            entry.content_hash = fingerprint['content_hash']
+
+    db.session.commit()
@@ -0,0 +1,272 @@
+"""
+导入任务的分阶段统计
+记录每次导入各阶段（清单比对、Excel解析、去重、各表写入等）的耗时、输入输出行数、读取的字节数、
+各表新增/更新条数以及进程的峰值内存，每次运行以一行JSON追加到 logs/ingest_metrics.jsonl，
+文件只保留最近的若干条记录，便于对比发现性能回退
+
+环境变量:
+    LCOA_METRICS_FILE       统计文件路径，默认为项目根目录下的 logs/ingest_metrics.jsonl
+    LCOA_METRICS_HISTORY    保留的历史记录条数，默认200
+"""
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from lcoa.datedeal.ingest_logging import get_logger
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+METRICS_FILE = os.environ.get('LCOA_METRICS_FILE', os.path.join(project_root, 'logs', 'ingest_metrics.jsonl'))
+METRICS_HISTORY = int(os.environ.get('LCOA_METRICS_HISTORY', '200'))
+
+logger = get_logger('datedeal.ingest_telemetry')
+
+
+def peak_rss_bytes():
+    """
+    获取当前进程（以及已结束的子进程）的峰值内存
+
+    Returns:
+        int: 峰值常驻内存（字节），无法获取时返回None
+    """
+    if resource is not None:
+        # Linux 上 ru_maxrss 的单位是KB，macOS 上是字节
+        scale = 1 if sys.platform == 'darwin' else 1024
+        self_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        children_peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+        return max(self_peak, children_peak)
+    if psutil is not None:
+        memory_info = psutil.Process().memory_info()
+        # Windows 提供峰值工作集，其他平台只能取当前值
+        return getattr(memory_info, 'peak_wset', memory_info.rss)
+    return None
+
+
+def pool_snapshot():
+    """
+    本进程的连接池统计（见 services/db_pool.py）
+
+    Returns:
+        dict: 获取连接次数、耗时、占满次数和连接新建/关闭次数，还没有导入 lcoa.app 时返回None
+    """
+    # 与 lcoa.app 导入的是同一个模块（lcoa 目录在 sys.path 中），统计才是本进程连接池的
+    db_pool = sys.modules.get('services.db_pool')
+    if db_pool is None:
+        return None
+    from lcoa.app import db
+    try:
+        return db_pool.pool_metrics.snapshot(db.engine)
+    except RuntimeError:
+        # 不在应用上下文中时没有 db.engine，只返回计数
+        return db_pool.pool_metrics.snapshot()
+
+
+class IngestTelemetry:
+    """一次导入运行的统计信息"""
+
+    def __init__(self, mode):
+        """
+        Args:
+            mode (str): 运行模式（例如 incremental、full、stream）
+        """
+        self.mode = mode
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.tables = {}
+        self.files = 0
+        self.bytes_read = 0
+        # 长时间运行的监听进程会多次导入，连接池统计从每次导入开始时重新计算
+        db_pool = sys.modules.get('services.db_pool')
+        if db_pool is not None:
+            db_pool.pool_metrics.reset()
+
+    def _stage_record(self, name):
+        return self.stages.setdefault(name, {'seconds': 0.0, 'rows_in': None, 'rows_out': None})
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        统计一个阶段的耗时（同名阶段多次执行时累加）
+
+        Args:
+            name (str): 阶段名称
+            rows_in (int): 输入行数
+
+        Yields:
+            dict: 阶段记录，调用方可以设置 record['rows_out']
+        """
+        record = self._stage_record(name)
+        if rows_in is not None:
+            record['rows_in'] = (record['rows_in'] or 0) + rows_in
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] += time.perf_counter() - start
+
+    def add_files(self, count, bytes_read):
+        """记录读取的文件数和字节数"""
+        self.files += count
+        self.bytes_read += bytes_read
+
+    def record_table(self, table_name, rows, result, seconds):
+        """
+        记录一个目标表的写入结果
+
+        Args:
+            table_name (str): 目标表名
+            rows (int): 写入的行数
+            result (dict): save_to_* 的返回值，None表示写入失败
+            seconds (float): 写入耗时
+        """
+        table = self.tables.setdefault(table_name, {
+            'rows': 0, 'inserted': 0, 'updated': 0, 'failed': 0,
+            'seconds': 0.0, 'preload_seconds': 0.0, 'write_seconds': 0.0, 'commits': 0, 'retries': 0,
+        })
+        table['rows'] += rows
+        table['seconds'] += seconds
+        if result is None:
+            table['failed'] += 1
+            return
+        table['inserted'] += result['inserted']
+        table['updated'] += result['updated']
+        table['preload_seconds'] += result.get('preload_seconds', 0.0)
+        table['write_seconds'] += result.get('write_seconds', 0.0)
+        table['commits'] += result.get('chunks', 0)
+        table['retries'] += result.get('retries', 0)
+
+    def to_dict(self, status):
+        """生成本次运行的统计记录"""
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'mode': self.mode,
+            'status': status,
+            'wall_seconds': round(time.perf_counter() - self._start, 3),
+            'files': self.files,
+            'bytes_read': self.bytes_read,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'stages': {
+                name: {key: round(value, 3) if isinstance(value, float) else value for key, value in record.items()}
+                for name, record in self.stages.items()
+            },
+            'tables': {
+                name: {key: round(value, 3) if isinstance(value, float) else value for key, value in record.items()}
+                for name, record in self.tables.items()
+            },
+            'pool': pool_snapshot(),
+        }
+
+    def finish(self, status='ok', path=None, history=None):
+        """
+        结束统计：追加一行JSON到统计文件，只保留最近 history 条，并输出与历史记录的对比
+
+        Args:
+            status (str): 运行结果（ok、partial、skipped、error）
+            path (str): 统计文件路径，默认 METRICS_FILE
+            history (int): 保留的历史记录条数，默认 METRICS_HISTORY
+
+        Returns:
+            dict: 本次运行的统计记录
+        """
+        path = path or METRICS_FILE
+        history = METRICS_HISTORY if history is None else history
+        record = self.to_dict(status)
+
+        try:
+            previous = load_history(path)
+            lines = [json.dumps(item, ensure_ascii=False) for item in previous]
+            lines.append(json.dumps(record, ensure_ascii=False))
+            lines = lines[-history:] if history > 0 else lines
+
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("写入导入统计失败: %s", e)
+            previous = []
+
+        print_summary(record, previous)
+        return record
+
+
+def load_history(path=None):
+    """
+    读取历史统计记录（忽略无法解析的行）
+
+    Returns:
+        list: 统计记录列表，按时间先后排列
+    """
+    path = path or METRICS_FILE
+    if not os.path.exists(path):
+        return []
+
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def print_summary(record, previous=None, window=10):
+    """
+    输出本次运行的分阶段耗时，并与最近 window 次相同模式的成功运行的中位数对比
+
+    Args:
+        record (dict): 本次运行的统计记录
+        previous (list): 之前的统计记录
+        window (int): 参与对比的历史记录条数
+    """
+    logger.info("导入统计（%s, %s）: 总耗时 %.2f 秒, %d 个文件, 读取 %.1f MB, 峰值内存 %.0f MB",
+                record['mode'], record['status'], record['wall_seconds'], record['files'],
+                record['bytes_read'] / 1024 / 1024, (record['peak_rss_bytes'] or 0) / 1024 / 1024)
+    for name, stage in record['stages'].items():
+        rows = ''
+        if stage['rows_in'] is not None or stage['rows_out'] is not None:
+            rows = f", 行数 {stage['rows_in']} -> {stage['rows_out']}"
+        logger.info("  阶段 %s: %.2f 秒%s", name, stage['seconds'], rows)
+    for name, table in record['tables'].items():
+        logger.info("  表 %s: %d 行, 新增 %d 条, 更新 %d 条, 耗时 %.2f 秒（预加载 %.2f, 写入 %.2f）, "
+                    "提交 %d 次, 重试 %d 次",
+                    name, table['rows'], table['inserted'], table['updated'], table['seconds'],
+                    table['preload_seconds'], table['write_seconds'],
+                    table.get('commits', 0), table.get('retries', 0))
+
+    pool = record.get('pool')
+    if pool:
+        logger.info("  连接池（%s）: 获取连接 %d 次, 耗时平均 %.1f ms, p95 %.1f ms, 最大 %.1f ms, "
+                    "占满 %d 次, 超时 %d 次, 新建连接 %d 次, 关闭 %d 次",
+                    pool['role'], pool['checkouts'], pool['checkout_ms']['avg'], pool['checkout_ms']['p95'],
+                    pool['checkout_ms']['max'], pool['saturated_checkouts'], pool['timeouts'],
+                    pool['connects'], pool['closes'])
+
+    recent = [
+        item['wall_seconds'] for item in (previous or [])
+        if item.get('mode') == record['mode'] and item.get('status') == 'ok'
+    ][-window:]
+    if recent:
+        median = statistics.median(recent)
+        ratio = f"，本次为中位数的 {record['wall_seconds'] / median:.1f} 倍" if median > 0 else ''
+        logger.info("  最近 %d 次%s运行的耗时中位数 %.2f 秒%s", len(recent), record['mode'], median, ratio)
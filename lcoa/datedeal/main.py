@@ -1,8 +1,6 @@
 import os
 import sys
-import pandas as pd
-import re
-from datetime import datetime
+import time
 
 # 添加项目路径到Python路径
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -14,13 +12,21 @@ lcoa_path = os.path.join(project_root, 'lcoa')
 if lcoa_path not in sys.path:
     sys.path.insert(0, lcoa_path)
 
+from lcoa.datedeal.ingest_logging import get_logger, full_dump_enabled, log_rows, log_frame_preview
+
+logger = get_logger('datedeal.main')
+
+# 本模块是数据导入的入口（run_datedeal.py、定时任务、监听服务都经由这里导入 lcoa.app），
+# 在导入 lcoa.app 之前设置进程角色，使用导入进程的连接池配置（见 services/db_pool.py）
+os.environ.setdefault('LCOA_PROCESS_ROLE', 'ingest')
+
 # 延迟导入，确保路径设置完成后再导入
 try:
     from lcoa.app import save_to_lcoa_table, save_to_sys_club_table_with_comparison, save_to_sys_nodeal_table_with_comparison, save_to_sys_xiangxi_table_with_comparison
-    print("✓ 成功导入所有必需函数")
+    logger.debug("✓ 成功导入所有必需函数")
 except ImportError as e:
-    print(f"导入错误: {e}")
-    print("尝试使用动态导入方式...")
+    logger.warning("导入错误: %s", e)
+    logger.warning("尝试使用动态导入方式...")
     
     # 动态导入lcoa.app模块中的函数
     try:
@@ -37,40 +43,42 @@ except ImportError as e:
         save_to_sys_nodeal_table_with_comparison = getattr(app_module, 'save_to_sys_nodeal_table_with_comparison')
         save_to_sys_xiangxi_table_with_comparison = getattr(app_module, 'save_to_sys_xiangxi_table_with_comparison')
         
-        print("✓ 动态导入成功")
+        logger.info("✓ 动态导入成功")
     except Exception as dynamic_error:
-        print(f"动态导入也失败了: {dynamic_error}")
-        print("请确保已安装所有依赖项并正确设置PYTHONPATH")
+        logger.error("动态导入也失败了: %s", dynamic_error)
+        logger.error("请确保已安装所有依赖项并正确设置PYTHONPATH")
         sys.exit(1)
 
-def extract_date_from_filename(filename):
-    """
-    从文件名中提取日期信息
-
-    Args:
-        filename (str): 文件名
-
-    Returns:
-        str: 提取到的日期，如果未找到则返回空字符串
-    """
-    # 尝试多种日期格式
-    # 格式1: 2025-09-29
-    match1 = re.search(r'(\d{4}-\d{2}-\d{2})', filename)
-    if match1:
-        return match1.group(1)
-
-    # 格式2: 2025年10月09日
-    match2 = re.search(r'(\d{4}年\d{1,2}月\d{1,2}日)', filename)
-    if match2:
-        date_str = match2.group(1)
-        try:
-            # 转换为标准格式
-            date_obj = datetime.strptime(date_str, '%Y年%m月%d日')
-            return date_obj.strftime('%Y-%m-%d')
-        except ValueError:
-            pass
-
-    return ''
+from lcoa.datedeal.workbook_reader import (
+    extract_date_from_filename,
+    extract_all_sheet_data_parallel,
+    iter_parsed_workbooks,
+    list_export_workbooks,
+    print_file_timings,
+    build_column_index_mapping,
+    frame_to_rows,
+    read_sheet_cached,
+    read_sheet_projected,
+    rows_from_mapped_columns,
+    rows_from_leading_columns,
+    sort_by_extracted_date,
+    SHEET_ROUTES
+)
+from lcoa.datedeal.ingest_manifest import (
+    ensure_manifest_table,
+    find_pending_workbooks,
+    all_workbook_fingerprints,
+    record_ingested_workbooks
+)
+from lcoa.datedeal.stream_ingest import stream_ingest_workbooks, table_sinks, DEFAULT_CHUNK_SIZE, DEDUP_TABLES
+from lcoa.datedeal.changeset import table_changeset, log_changeset, write_changeset_report
+from lcoa.datedeal.pipeline import pipelined_ingest_workbooks
+from lcoa.datedeal.dedup import ExternalDeduplicator, deduplicate_rows
+from lcoa.datedeal.ingest_lock import IngestLock
+from lcoa.datedeal.ingest_telemetry import IngestTelemetry
+
+# 导出文件所在目录
+EXPORT_DIRECTORY = r"C:\Users\Administrator\Documents\导出表格\结果"
 
 def read_excel_fifth_sheets(directory_path):
     """
@@ -87,48 +95,35 @@ def read_excel_fifth_sheets(directory_path):
 
     # 检查目录是否存在
     if not os.path.exists(directory_path):
-        print(f"目录 {directory_path} 不存在")
+        logger.warning("目录 %s 不存在", directory_path)
         return all_data
 
-    # 遍历目录中的所有文件
-    for filename in os.listdir(directory_path):
-        # 检查是否为Excel文件
-        if filename.endswith(('.xlsx', '.xls')) and not filename.startswith('~$'):
-            file_path = os.path.join(directory_path, filename)
-            print(f"正在处理文件: {filename}")
-
-            # 从文件名提取日期
-            extracted_datetime = extract_date_from_filename(filename)
-            print(f"从文件名提取的日期: {extracted_datetime}")
-
-            try:
-                # 读取Excel文件的第五个工作表（索引为4）
-                df = pd.read_excel(file_path, sheet_name=4)  # 第五个工作表
-
-                # 如果DataFrame为空，跳过此文件
-                if df.empty:
-                    print(f"文件 {filename} 的第五个工作表是空的，跳过")
-                    continue
-
-                # 打印调试信息
-                print(f"文件 {filename} 的第五个工作表列名: {list(df.columns)}")
-                print(f"文件 {filename} 的第五个工作表前两行数据:")
-                print(df.head(2))
-
-                # 读取所有行的数据
-                for index, row in df.iterrows():
-                    # 创建一行数据，包含提取的时间、文件名和所有数据列
-                    row_data = [extracted_datetime, filename]  # 前两个元素是时间信息和文件名
-                    for val in row:
-                        # 处理NaN值
-                        row_data.append(str(val) if pd.notna(val) else '')
-
-                    all_data.append(row_data)
-
-            except Exception as e:
-                print(f"处理文件 {filename} 时出错: {e}")
-                import traceback
-                traceback.print_exc()
+    # 遍历目录中的所有Excel文件（按文件名中的日期排序）
+    for filename in list_export_workbooks(directory_path):
+        file_path = os.path.join(directory_path, filename)
+        # 从文件名提取日期
+        extracted_datetime = extract_date_from_filename(filename)
+        logger.debug("正在处理文件: %s（从文件名提取的日期: %s）", filename, extracted_datetime)
+
+        try:
+            # 读取Excel文件的第五个工作表（索引为4）
+            df = read_sheet_cached(file_path, 4)  # 第五个工作表
+
+            # 如果DataFrame为空，跳过此文件
+            if df.empty:
+                logger.info("文件 %s 的第五个工作表是空的，跳过", filename)
+                continue
+
+            # 调试信息（只在DEBUG级别输出）
+            log_frame_preview(logger, f"文件 {filename} 的第五个工作表", df)
+
+            # 向量化地读取所有行的数据，前两个元素是时间信息和文件名
+            rows = frame_to_rows(df, list(range(len(df.columns))), [extracted_datetime, filename])
+            all_data.extend(rows)
+            logger.info("文件 %s 的第五个工作表: %d 行数据", filename, len(rows))
+
+        except Exception as e:
+            logger.exception("处理文件 %s 时出错: %s", filename, e)
 
     return all_data
 
@@ -143,7 +138,7 @@ def save_data_to_file(data, output_file='fifth_sheet_data.txt'):
     with open(output_file, 'w', encoding='utf-8') as f:
         for i, row in enumerate(data):
             f.write(f"Row {i+1}: 提取的日期: {row[0]} | 文件名: {row[1]} | 数据: {row[2:]}\n")
-    print(f"第五个表数据已保存到 {output_file}")
+    logger.info("第五个表数据已保存到 %s", output_file)
 
 def extract_second_sheet_data(directory_path):
     """
@@ -167,76 +162,38 @@ def extract_second_sheet_data(directory_path):
 
     # 检查目录是否存在
     if not os.path.exists(directory_path):
-        print(f"目录 {directory_path} 不存在")
+        logger.warning("目录 %s 不存在", directory_path)
         return all_data
 
-    # 遍历目录中的所有文件
-    for filename in os.listdir(directory_path):
-        # 检查是否为Excel文件
-        if filename.endswith(('.xlsx', '.xls')) and not filename.startswith('~$'):
-            file_path = os.path.join(directory_path, filename)
-            print(f"正在处理文件: {filename}")
-
-            # 从文件名提取日期
-            file_date = extract_date_from_filename(filename)
-            print(f"从文件名提取的日期: {file_date}")
-
-            try:
-                # 读取Excel文件的第二个工作表（索引为1）
-                df = pd.read_excel(file_path, sheet_name=1)
-
-                # 如果DataFrame为空，跳过此文件
-                if df.empty:
-                    print(f"文件 {filename} 的第二个工作表是空的，跳过")
-                    continue
-
-                # 打印调试信息
-                print(f"文件 {filename} 的第二个工作表列名: {list(df.columns)}")
-                print(f"文件 {filename} 的第二个工作表前两行数据:")
-                print(df.head(2))
-
-                # 获取列名
-                header_cols = list(df.columns)
-
-                # 创建列索引映射（模糊匹配）
-                col_index_mapping = {}
-                for i, col_name in enumerate(header_cols):
-                    # 清理列名（去除空格等）
-                    clean_col_name = col_name.strip()
-                    # 检查是否在我们需要的列名中
-                    for target_col in column_names:
-                        # 去除空格后比较
-                        if clean_col_name == target_col.strip():
-                            col_index_mapping[target_col] = i
-                            break
-
-                print(f"列索引映射: {col_index_mapping}")
-
-                # 读取所有行的数据
-                for index, row in df.iterrows():
-                    # 先添加从文件名提取的日期作为第一列
-                    row_data = [file_date]
-
-                    # 根据列索引映射获取对应列的数据并添加到row_data中
-                    for col_name in column_names:
-                        if col_name in col_index_mapping:
-                            col_idx = col_index_mapping[col_name]
-                            # 确保不会越界访问
-                            if col_idx < len(row):
-                                # 处理NaN值
-                                val = row.iloc[col_idx]
-                                row_data.append(str(val) if pd.notna(val) else '')
-                            else:
-                                row_data.append('')
-                        else:
-                            row_data.append('')
-
-                    all_data.append(row_data)
-
-            except Exception as e:
-                print(f"处理文件 {filename} 时出错: {e}")
-                import traceback
-                traceback.print_exc()
+    # 遍历目录中的所有Excel文件（按文件名中的日期排序）
+    for filename in list_export_workbooks(directory_path):
+        file_path = os.path.join(directory_path, filename)
+        # 从文件名提取日期
+        file_date = extract_date_from_filename(filename)
+        logger.debug("正在处理文件: %s（从文件名提取的日期: %s）", filename, file_date)
+
+        try:
+            # 读取Excel文件的第二个工作表（索引为1），只解析需要的列
+            df = read_sheet_projected(file_path, 'sys_nodeal')
+
+            # 如果DataFrame为空，跳过此文件
+            if df.empty:
+                logger.info("文件 %s 的第二个工作表是空的，跳过", filename)
+                continue
+
+            # 创建列索引映射（去除空格后精确匹配）
+            col_index_mapping = build_column_index_mapping(list(df.columns), column_names)
+
+            # 调试信息（只在DEBUG级别输出）
+            log_frame_preview(logger, f"文件 {filename} 的第二个工作表", df, col_index_mapping)
+
+            # 向量化地读取所有行的数据
+            rows = rows_from_mapped_columns(df, column_names, file_date, col_index_mapping)
+            all_data.extend(rows)
+            logger.info("文件 %s 的第二个工作表: %d 行数据", filename, len(rows))
+
+        except Exception as e:
+            logger.exception("处理文件 %s 时出错: %s", filename, e)
 
     return all_data
 
@@ -260,76 +217,38 @@ def extract_fourth_sheet_data(directory_path):
 
     # 检查目录是否存在
     if not os.path.exists(directory_path):
-        print(f"目录 {directory_path} 不存在")
+        logger.warning("目录 %s 不存在", directory_path)
         return all_data
 
-    # 遍历目录中的所有文件
-    for filename in os.listdir(directory_path):
-        # 检查是否为Excel文件
-        if filename.endswith(('.xlsx', '.xls')) and not filename.startswith('~$'):
-            file_path = os.path.join(directory_path, filename)
-            print(f"正在处理文件: {filename}")
-
-            # 从文件名提取日期
-            file_date = extract_date_from_filename(filename)
-            print(f"从文件名提取的日期: {file_date}")
-
-            try:
-                # 读取Excel文件的第四个工作表（索引为3）
-                df = pd.read_excel(file_path, sheet_name=3)
-
-                # 如果DataFrame为空，跳过此文件
-                if df.empty:
-                    print(f"文件 {filename} 的第四个工作表是空的，跳过")
-                    continue
-
-                # 打印调试信息
-                print(f"文件 {filename} 的第四个工作表列名: {list(df.columns)}")
-                print(f"文件 {filename} 的第四个工作表前两行数据:")
-                print(df.head(2))
-
-                # 获取列名
-                header_cols = list(df.columns)
-
-                # 创建列索引映射（模糊匹配）
-                col_index_mapping = {}
-                for i, col_name in enumerate(header_cols):
-                    # 清理列名（去除空格等）
-                    clean_col_name = col_name.strip()
-                    # 检查是否在我们需要的列名中
-                    for target_col in column_names:
-                        # 去除空格后比较
-                        if clean_col_name == target_col.strip():
-                            col_index_mapping[target_col] = i
-                            break
-
-                print(f"列索引映射: {col_index_mapping}")
-
-                # 读取所有行的数据
-                for index, row in df.iterrows():
-                    # 先添加从文件名提取的日期作为第一列
-                    row_data = [file_date]
-
-                    # 根据列索引映射获取对应列的数据并添加到row_data中
-                    for col_name in column_names:
-                        if col_name in col_index_mapping:
-                            col_idx = col_index_mapping[col_name]
-                            # 确保不会越界访问
-                            if col_idx < len(row):
-                                # 处理NaN值
-                                val = row.iloc[col_idx]
-                                row_data.append(str(val) if pd.notna(val) else '')
-                            else:
-                                row_data.append('')
-                        else:
-                            row_data.append('')
-
-                    all_data.append(row_data)
-
-            except Exception as e:
-                print(f"处理文件 {filename} 时出错: {e}")
-                import traceback
-                traceback.print_exc()
+    # 遍历目录中的所有Excel文件（按文件名中的日期排序）
+    for filename in list_export_workbooks(directory_path):
+        file_path = os.path.join(directory_path, filename)
+        # 从文件名提取日期
+        file_date = extract_date_from_filename(filename)
+        logger.debug("正在处理文件: %s（从文件名提取的日期: %s）", filename, file_date)
+
+        try:
+            # 读取Excel文件的第四个工作表（索引为3），只解析需要的列
+            df = read_sheet_projected(file_path, 'sys_xiangxi')
+
+            # 如果DataFrame为空，跳过此文件
+            if df.empty:
+                logger.info("文件 %s 的第四个工作表是空的，跳过", filename)
+                continue
+
+            # 创建列索引映射（去除空格后精确匹配）
+            col_index_mapping = build_column_index_mapping(list(df.columns), column_names)
+
+            # 调试信息（只在DEBUG级别输出）
+            log_frame_preview(logger, f"文件 {filename} 的第四个工作表", df, col_index_mapping)
+
+            # 向量化地读取所有行的数据
+            rows = rows_from_mapped_columns(df, column_names, file_date, col_index_mapping)
+            all_data.extend(rows)
+            logger.info("文件 %s 的第四个工作表: %d 行数据", filename, len(rows))
+
+        except Exception as e:
+            logger.exception("处理文件 %s 时出错: %s", filename, e)
 
     return all_data
 
@@ -355,76 +274,38 @@ def extract_process_data(directory_path):
 
     # 检查目录是否存在
     if not os.path.exists(directory_path):
-        print(f"目录 {directory_path} 不存在")
+        logger.warning("目录 %s 不存在", directory_path)
         return all_data
 
-    # 遍历目录中的所有文件
-    for filename in os.listdir(directory_path):
-        # 检查是否为Excel文件
-        if filename.endswith(('.xlsx', '.xls')) and not filename.startswith('~$'):
-            file_path = os.path.join(directory_path, filename)
-            print(f"正在处理文件: {filename}")
-
-            # 从文件名提取日期
-            file_date = extract_date_from_filename(filename)
-            print(f"从文件名提取的日期: {file_date}")
-
-            try:
-                # 读取Excel文件的第一个工作表
-                df = pd.read_excel(file_path, sheet_name=0)
-
-                # 如果DataFrame为空，跳过此文件
-                if df.empty:
-                    print(f"文件 {filename} 是空的，跳过")
-                    continue
-
-                # 打印调试信息
-                print(f"文件 {filename} 的列名: {list(df.columns)}")
-                print(f"文件 {filename} 的前两行数据:")
-                print(df.head(2))
-
-                # 获取列名
-                header_cols = list(df.columns)
-
-                # 创建列索引映射（模糊匹配）
-                col_index_mapping = {}
-                for i, col_name in enumerate(header_cols):
-                    # 清理列名（去除空格等）
-                    clean_col_name = col_name.strip()
-                    # 检查是否在我们需要的列名中
-                    for target_col in column_names:
-                        # 去除空格后比较
-                        if clean_col_name == target_col.strip():
-                            col_index_mapping[target_col] = i
-                            break
-
-                print(f"列索引映射: {col_index_mapping}")
-
-                # 读取所有行的数据
-                for index, row in df.iterrows():
-                    # 先添加从文件名提取的日期作为第一列
-                    row_data = [file_date]
-
-                    # 根据列索引映射获取对应列的数据并添加到row_data中
-                    for col_name in column_names:
-                        if col_name in col_index_mapping:
-                            col_idx = col_index_mapping[col_name]
-                            # 确保不会越界访问
-                            if col_idx < len(row):
-                                # 处理NaN值
-                                val = row.iloc[col_idx]
-                                row_data.append(str(val) if pd.notna(val) else '')
-                            else:
-                                row_data.append('')
-                        else:
-                            row_data.append('')
-
-                    all_data.append(row_data)
-
-            except Exception as e:
-                print(f"处理文件 {filename} 时出错: {e}")
-                import traceback
-                traceback.print_exc()
+    # 遍历目录中的所有Excel文件（按文件名中的日期排序）
+    for filename in list_export_workbooks(directory_path):
+        file_path = os.path.join(directory_path, filename)
+        # 从文件名提取日期
+        file_date = extract_date_from_filename(filename)
+        logger.debug("正在处理文件: %s（从文件名提取的日期: %s）", filename, file_date)
+
+        try:
+            # 读取Excel文件的第一个工作表，只解析需要的列
+            df = read_sheet_projected(file_path, 'lcoa')
+
+            # 如果DataFrame为空，跳过此文件
+            if df.empty:
+                logger.info("文件 %s 是空的，跳过", filename)
+                continue
+
+            # 创建列索引映射（去除空格后精确匹配）
+            col_index_mapping = build_column_index_mapping(list(df.columns), column_names)
+
+            # 调试信息（只在DEBUG级别输出）
+            log_frame_preview(logger, f"文件 {filename} 的", df, col_index_mapping)
+
+            # 向量化地读取所有行的数据
+            rows = rows_from_mapped_columns(df, column_names, file_date, col_index_mapping)
+            all_data.extend(rows)
+            logger.info("文件 %s 的: %d 行数据", filename, len(rows))
+
+        except Exception as e:
+            logger.exception("处理文件 %s 时出错: %s", filename, e)
 
     return all_data
 
@@ -443,87 +324,60 @@ def extract_fifth_sheet_data_for_sys_club(directory_path):
 
     # 检查目录是否存在
     if not os.path.exists(directory_path):
-        print(f"目录 {directory_path} 不存在")
+        logger.warning("目录 %s 不存在", directory_path)
         return all_data
 
-    # 遍历目录中的所有文件
-    for filename in os.listdir(directory_path):
-        # 检查是否为Excel文件
-        if filename.endswith(('.xlsx', '.xls')) and not filename.startswith('~$'):
-            file_path = os.path.join(directory_path, filename)
-            print(f"正在处理文件: {filename}")
-
-            # 从文件名提取日期
-            file_date = extract_date_from_filename(filename)
-            print(f"从文件名提取的日期: {file_date}")
-
-            try:
-                # 读取Excel文件的第五个工作表（索引为4）
-                df = pd.read_excel(file_path, sheet_name=4)
-
-                # 如果DataFrame为空，跳过此文件
-                if df.empty:
-                    print(f"文件 {filename} 的第五个工作表是空的，跳过")
-                    continue
-
-                # 打印调试信息
-                print(f"文件 {filename} 的第五个工作表列名: {list(df.columns)}")
-                print(f"文件 {filename} 的第五个工作表前两行数据:")
-                print(df.head(2))
-
-                # 读取所有行的数据，只取前3列加上日期列
-                for index, row in df.iterrows():
-                    # 创建一行数据，包含提取的时间和前三列数据
-                    row_data = [file_date]  # 从文件名提取的日期
-                    
-                    # 只取前三列数据
-                    for i in range(min(3, len(row))):
-                        val = row.iloc[i]
-                        row_data.append(str(val) if pd.notna(val) else '')
-
-                    all_data.append(row_data)
-
-            except Exception as e:
-                print(f"处理文件 {filename} 时出错: {e}")
-                import traceback
-                traceback.print_exc()
+    # 遍历目录中的所有Excel文件（按文件名中的日期排序）
+    for filename in list_export_workbooks(directory_path):
+        file_path = os.path.join(directory_path, filename)
+        # 从文件名提取日期
+        file_date = extract_date_from_filename(filename)
+        logger.debug("正在处理文件: %s（从文件名提取的日期: %s）", filename, file_date)
+
+        try:
+            # 读取Excel文件的第五个工作表（索引为4），只解析前3列
+            df = read_sheet_projected(file_path, 'sys_club')
+
+            # 如果DataFrame为空，跳过此文件
+            if df.empty:
+                logger.info("文件 %s 的第五个工作表是空的，跳过", filename)
+                continue
+
+            # 调试信息（只在DEBUG级别输出）
+            log_frame_preview(logger, f"文件 {filename} 的第五个工作表", df)
+
+            # 向量化地读取所有行的数据，只取前3列加上日期列
+            rows = rows_from_leading_columns(df, file_date, 3)
+            all_data.extend(rows)
+            logger.info("文件 %s 的第五个工作表: %d 行数据", filename, len(rows))
+
+        except Exception as e:
+            logger.exception("处理文件 %s 时出错: %s", filename, e)
 
     return all_data
 
+def log_dedup(rows_in, rows_out, spills=0):
+    """输出去重前后的数据条数"""
+    logger.info("去重前数据条数: %d, 去重后数据条数: %d, 删除重复数据条数: %d%s",
+                rows_in, rows_out, rows_in - rows_out, f"（溢出到磁盘 {spills} 次）" if spills else "")
+
+
 def remove_duplicates(data):
     """
-    根据第二列和第三列的数据进行去重，保留后面的记录
+    根据第二列和第三列的数据进行去重，同一个键保留提取日期（第一列）最新的记录，日期相同时保留后面的记录
+
+    data 为列表时只记录胜出行的下标；为迭代器时每个键只保留一条记录，超过内存预算（LCOA_DEDUP_MEMORY_MB）时
+    按键的哈希分区溢出到磁盘，见 dedup.py（普通导入在 parse_workbooks 中边解析边去重）
 
     Args:
-        data (list): 包含所有数据行的数组
+        data (iterable): 包含所有数据行的数组（也可以是数据行的迭代器）
 
     Returns:
         list: 去重后的数据
     """
-    if not data:
-        return []
-
-    # 使用字典来存储唯一的记录，键为第二列和第三列的组合
-    unique_dict = {}
-
-    for row in data:
-        # 确保行数据至少有3列
-        if len(row) >= 3:
-            # 使用第二列和第三列组合作为键
-            key = (row[1], row[2])  # 第二列和第三列（索引从0开始）
-            # 后面的记录会覆盖前面的记录
-            unique_dict[key] = row
-        else:
-            # 如果行数据不足3列，直接添加
-            unique_dict[len(unique_dict)] = row
-
-    # 将字典中的值转换为列表
-    unique_data = list(unique_dict.values())
-
-    print(f"去重前数据条数: {len(data)}")
-    print(f"去重后数据条数: {len(unique_data)}")
-    print(f"删除重复数据条数: {len(data) - len(unique_data)}")
-
+    unique_data, rows_in, spills = deduplicate_rows(data)
+    if rows_in:
+        log_dedup(rows_in, len(unique_data), spills)
     return unique_data
 
 def save_data_as_arrays(data, output_file='process_data_arrays.txt'):
@@ -543,155 +397,327 @@ def save_data_as_arrays(data, output_file='process_data_arrays.txt'):
             else:
                 f.write("\n")
         f.write("]\n")
-    print(f"数据已保存到 {output_file}")
+    logger.info("数据已保存到 %s", output_file)
 
 def print_array_data(data, title="数组数据"):
     """
-    打印数组数据
+    输出数组数据：默认只输出行数，DEBUG级别输出采样行，LCOA_LOG_FULL_DUMP=1 时输出所有行
     
     Args:
-        data (list): 要打印的数据
+        data (list): 要输出的数据
         title (str): 数据标题
     """
-    print(f"\n{title}:")
-    print(f"总共 {len(data)} 行数据")
-    for i, row in enumerate(data):
-        print(f"Row {i+1}: {row}")
+    log_rows(logger, title, data)
 
-def main():
+def main(workers=None):
     """
     主程序，提取流程数据
+
+    整个过程持有导入锁：定时任务或目录监听服务正在导入时等待其结束，不会同时写入同一批表
+
+    Args:
+        workers (int): 并行解析的进程数，默认读取环境变量 LCOA_INGEST_WORKERS
     """
-    # 指定Excel文件所在的目录路径
-    directory_path = r"C:\Users\Administrator\Documents\导出表格\结果"
+    with IngestLock():
+        # 指定Excel文件所在的目录路径
+        directory_path = EXPORT_DIRECTORY
 
-    print("开始处理所有文件的第一个表...")
+        logger.info("开始处理所有文件（每个文件只读取一次）...")
 
-    # 读取数据
-    extracted_data = extract_process_data(directory_path)
+        # 单次遍历所有文件，同时提取第一、二、四、五个表的数据
+        sheet_data, file_timings = extract_all_sheet_data_parallel(directory_path, workers)
+        print_file_timings(file_timings)
 
-    # 打印统计信息
-    print(f"总共提取了 {len(extracted_data)} 行数据")
+        extracted_data = sheet_data['lcoa']
 
-    # 如果没有提取到数据，给出提示
-    if len(extracted_data) == 0:
-        print("警告：未提取到任何数据，请检查文件路径和文件格式")
-        return []
+        # 打印统计信息
+        logger.info("总共提取了 %d 行数据", len(extracted_data))
 
-    # 根据第二列和第三列进行去重，保留后面的记录
-    unique_data = remove_duplicates(extracted_data)
+        # 如果没有提取到数据，给出提示
+        if len(extracted_data) == 0:
+            logger.warning("警告：未提取到任何数据，请检查文件路径和文件格式")
+            return []
+
+        # 根据第二列和第三列进行去重，保留后面的记录
+        unique_data = remove_duplicates(extracted_data)
 
-    # 保存数据到文件
-    save_data_as_arrays(unique_data, 'first—date.txt')
+        # 完整数据文件只在开启完整输出时保存
+        if full_dump_enabled():
+            save_data_as_arrays(unique_data, 'first—date.txt')
     
-    # 将去重后的数据保存到lcoa表中
-    # 修复函数调用 - 需要传递db和Lcoa参数
-    from lcoa.app import app, db, Lcoa
-    with app.app_context():
-        save_to_lcoa_table(db, Lcoa, unique_data)
+        # 将去重后的数据保存到lcoa表中
+        # 修复函数调用 - 需要传递db和Lcoa参数
+        from lcoa.app import app, db, Lcoa
+        with app.app_context():
+            save_to_lcoa_table(db, Lcoa, unique_data)
 
-    # 显示前5行数据示例
-    print("\n前5行数据示例:")
-    for i, row in enumerate(unique_data[:5]):
-        print(f"Row {i+1}: {row}")
+        # 显示数据示例
+        log_rows(logger, "第一个表去重后的数据", unique_data)
 
-    # 新增功能：读取所有文件中第二个表的数据
-    print("\n开始处理所有文件的第二个表...")
-    second_sheet_data = extract_second_sheet_data(directory_path)
+        # 第二个表的数据
+        logger.info("开始保存所有文件的第二个表...")
+        second_sheet_data = sheet_data['sys_nodeal']
     
-    # 对第二个表的数据进行去重
-    unique_second_sheet_data = remove_duplicates(second_sheet_data)
+        # 对第二个表的数据进行去重
+        unique_second_sheet_data = remove_duplicates(second_sheet_data)
     
-    # 将第二个表去重后的数据保存到sys_nodeal表中（使用比对更新逻辑）
-    from lcoa.app import save_to_sys_nodeal_table_with_comparison, SysNodeal
-    with app.app_context():
-        save_to_sys_nodeal_table_with_comparison(db, SysNodeal, unique_second_sheet_data)
+        # 将第二个表去重后的数据保存到sys_nodeal表中（使用比对更新逻辑）
+        from lcoa.app import save_to_sys_nodeal_table_with_comparison, SysNodeal
+        with app.app_context():
+            save_to_sys_nodeal_table_with_comparison(db, SysNodeal, unique_second_sheet_data)
     
-    print_array_data(unique_second_sheet_data, "第二个表去重后的数据")
+        print_array_data(unique_second_sheet_data, "第二个表去重后的数据")
     
-    # 新增功能：读取所有文件中第四个表的数据
-    print("\n开始处理所有文件的第四个表...")
-    fourth_sheet_data = extract_fourth_sheet_data(directory_path)
+        # 第四个表的数据
+        logger.info("开始保存所有文件的第四个表...")
+        fourth_sheet_data = sheet_data['sys_xiangxi']
     
-    # 将第四个表的数据保存到sys_xiangxi表中（使用比对更新逻辑）
-    from lcoa.app import save_to_sys_xiangxi_table_with_comparison, SysXiangxi
-    with app.app_context():
-        save_to_sys_xiangxi_table_with_comparison(db, SysXiangxi, fourth_sheet_data)
+        # 将第四个表的数据保存到sys_xiangxi表中（使用比对更新逻辑，或按 LCOA_SNAPSHOT_TABLES 替换快照）
+        with app.app_context():
+            table_sinks()['sys_xiangxi'](fourth_sheet_data)
     
-    # 第四个表的数据不需要去重，直接打印
-    print_array_data(fourth_sheet_data, "第四个表的数据（未去重）")
+        # 第四个表的数据不需要去重，直接输出
+        print_array_data(fourth_sheet_data, "第四个表的数据（未去重）")
     
-    # 新增功能：读取所有文件中第五个表的数据
-    print("\n开始处理所有文件的第五个表...")
-    fifth_sheet_data = extract_fifth_sheet_data_for_sys_club(directory_path)
+        # 第五个表的数据
+        logger.info("开始保存所有文件的第五个表...")
+        fifth_sheet_data = sheet_data['sys_club']
     
-    # 将第五个表的数据保存到sys_club表中（使用比对更新逻辑）
-    from lcoa.app import save_to_sys_club_table_with_comparison, SysClub
-    with app.app_context():
-        save_to_sys_club_table_with_comparison(db, SysClub, fifth_sheet_data)
+        # 将第五个表的数据保存到sys_club表中（使用比对更新逻辑，或按 LCOA_SNAPSHOT_TABLES 替换快照）
+        with app.app_context():
+            table_sinks()['sys_club'](fifth_sheet_data)
     
-    # 第五个表的数据不需要去重，直接打印
-    print_array_data(fifth_sheet_data, "第五个表的数据（未去重）")
+        # 第五个表的数据不需要去重，直接输出
+        print_array_data(fifth_sheet_data, "第五个表的数据（未去重）")
 
-    return unique_data
+        return unique_data
 
-def main_silent():
+def parse_workbooks(directory_path, filenames=None, workers=None, telemetry=None):
     """
-    静默模式主程序，用于定时任务运行，不输出详细信息到控制台
+    解析指定的工作簿，并对lcoa、sys_nodeal两个表的数据去重
+
+    Args:
+        directory_path (str): Excel文件所在的目录路径
+        filenames (list): 需要解析的文件名，默认解析目录下所有Excel文件
+        workers (int): 并行解析的进程数，默认读取环境变量 LCOA_INGEST_WORKERS
+        telemetry (IngestTelemetry): 分阶段统计，默认不记录
+
+    Returns:
+        tuple: (目标表名 -> 待写入的数据行列表, 成功解析的文件名列表)
     """
+    telemetry = telemetry or IngestTelemetry('ingest')
+
+    # 单次遍历所有文件，同时提取第一、二、四、五个表的数据（可并行解析）；
+    # 第一、二个表的数据行边解析边去重，内存中每个键只保留一条记录，超过内存预算时溢出到磁盘（见 dedup.py）
+    deduplicators = {table_name: ExternalDeduplicator() for table_name in DEDUP_TABLES}
+    sheet_data = {table_name: [] for table_name in SHEET_ROUTES}
+    file_timings = []
     try:
-        # 指定Excel文件所在的目录路径
-        directory_path = r"C:\Users\Administrator\Documents\导出表格\结果"
+        with telemetry.stage('parse') as stage:
+            for filename, sheet_rows, elapsed in iter_parsed_workbooks(directory_path, workers, filenames):
+                file_timings.append((filename, elapsed))
+                for table_name, rows in sheet_rows.items():
+                    if table_name in deduplicators:
+                        deduplicators[table_name].extend(rows)
+                    else:
+                        sheet_data[table_name].extend(rows)
+            dedup_rows_in = sum(deduplicator.rows_in for deduplicator in deduplicators.values())
+            stage['rows_out'] = dedup_rows_in + sum(len(rows) for rows in sheet_data.values())
+        print_file_timings(file_timings)
+        parsed_files = [filename for filename, _ in file_timings]
+        telemetry.add_files(len(parsed_files), sum(
+            os.path.getsize(os.path.join(directory_path, filename)) for filename in parsed_files
+        ))
+
+        # 如果没有提取到数据，给出提示；第一个表为空时其他表照常写入（否则这些文件记入导入清单后其他表的数据再也不会导入）
+        if dedup_rows_in == 0 and not any(sheet_data.values()):
+            logger.warning("警告：未提取到任何数据，请检查文件路径和文件格式")
+        elif deduplicators['lcoa'].rows_in == 0:
+            logger.warning("第一个表没有数据，只写入其他表")
+
+        # 根据第二列和第三列去重，保留提取日期最新的记录
+        with telemetry.stage('dedup', dedup_rows_in) as stage:
+            for table_name, deduplicator in deduplicators.items():
+                sheet_data[table_name] = list(deduplicator.iter_unique())
+                log_dedup(deduplicator.rows_in, len(sheet_data[table_name]), deduplicator.spills)
+            stage['rows_out'] = sum(len(sheet_data[table_name]) for table_name in deduplicators)
+    finally:
+        for deduplicator in deduplicators.values():
+            deduplicator.close()
+
+    for table_name, rows in sheet_data.items():
+        log_rows(logger, f"{table_name} 表待写入的数据", rows)
+    return sheet_data, parsed_files
+
+
+def ingest_workbooks(directory_path, filenames=None, workers=None, telemetry=None, skip_unchanged=False):
+    """
+    解析指定的工作簿并写入lcoa、sys_nodeal、sys_xiangxi、sys_club四个表
 
-        # 读取数据
-        extracted_data = extract_process_data(directory_path)
+    Args:
+        directory_path (str): Excel文件所在的目录路径
+        filenames (list): 需要导入的文件名，默认导入目录下所有Excel文件
+        workers (int): 并行解析的进程数，默认读取环境变量 LCOA_INGEST_WORKERS
+        telemetry (IngestTelemetry): 分阶段统计，默认不记录
+        skip_unchanged (bool): 为True时记录与数据库一致、没有写入的表（见 changeset.skip_unchanged）
 
-        # 如果没有提取到数据，给出提示
-        if len(extracted_data) == 0:
-            print("警告：未提取到任何数据，请检查文件路径和文件格式")
-            return []
+    Returns:
+        tuple: (lcoa表去重后的数据, 成功解析的文件名列表, 所有表是否都写入成功)
+    """
+    telemetry = telemetry or IngestTelemetry('ingest')
 
-        # 根据第二列和第三列进行去重，保留后面的记录
-        unique_data = remove_duplicates(extracted_data)
+    sheet_data, parsed_files = parse_workbooks(directory_path, filenames, workers, telemetry)
 
-        # 将去重后的数据保存到lcoa表中
-        from lcoa.app import app, db, Lcoa
-        with app.app_context():
-            save_to_lcoa_table(db, Lcoa, unique_data)
+    # 数据库写入只在主进程中、同一个应用上下文内完成
+    from lcoa.app import app
+    results = []
+    with app.app_context():
+        sinks = table_sinks(skip_unchanged)
+        for table_name, rows in sheet_data.items():
+            with telemetry.stage('save', len(rows)):
+                start = time.perf_counter()
+                result = sinks[table_name](rows)
+                telemetry.record_table(table_name, len(rows), result, time.perf_counter() - start)
+            results.append(result)
 
-        # 新增功能：读取所有文件中第二个表的数据
-        second_sheet_data = extract_second_sheet_data(directory_path)
-        
-        # 对第二个表的数据进行去重
-        unique_second_sheet_data = remove_duplicates(second_sheet_data)
-        
-        # 将第二个表去重后的数据保存到sys_nodeal表中（使用比对更新逻辑）
-        from lcoa.app import save_to_sys_nodeal_table_with_comparison, SysNodeal
-        with app.app_context():
-            save_to_sys_nodeal_table_with_comparison(db, SysNodeal, unique_second_sheet_data)
-        
-        # 新增功能：读取所有文件中第四个表的数据
-        fourth_sheet_data = extract_fourth_sheet_data(directory_path)
-        
-        # 将第四个表的数据保存到sys_xiangxi表中（使用比对更新逻辑）
-        from lcoa.app import save_to_sys_xiangxi_table_with_comparison, SysXiangxi
-        with app.app_context():
-            save_to_sys_xiangxi_table_with_comparison(db, SysXiangxi, fourth_sheet_data)
-        
-        # 新增功能：读取所有文件中第五个表的数据
-        fifth_sheet_data = extract_fifth_sheet_data_for_sys_club(directory_path)
-        
-        # 将第五个表的数据保存到sys_club表中（使用比对更新逻辑）
-        from lcoa.app import save_to_sys_club_table_with_comparison, SysClub
-        with app.app_context():
-            save_to_sys_club_table_with_comparison(db, SysClub, fifth_sheet_data)
+    return sheet_data['lcoa'], parsed_files, all(result is not None for result in results)
+
+
+def dry_run_workbooks(directory_path, filenames=None, workers=None, telemetry=None):
+    """
+    试运行：解析并计算各表的变更集，不修改任何表，汇总和示例差异写入试运行报告
+
+    Args:
+        directory_path (str): Excel文件所在的目录路径
+        filenames (list): 需要比对的文件名，默认比对目录下所有Excel文件
+        workers (int): 并行解析的进程数，默认读取环境变量 LCOA_INGEST_WORKERS
+        telemetry (IngestTelemetry): 分阶段统计，默认不记录
+
+    Returns:
+        list: 各表的变更集
+    """
+    telemetry = telemetry or IngestTelemetry('dry_run')
+
+    sheet_data, parsed_files = parse_workbooks(directory_path, filenames, workers, telemetry)
 
+    from lcoa.app import app
+    changesets = []
+    with app.app_context():
+        for table_name, rows in sheet_data.items():
+            with telemetry.stage('changeset', len(rows)):
+                changeset = table_changeset(table_name, rows)
+            log_changeset(changeset)
+            changesets.append(changeset)
+
+    write_changeset_report(changesets, parsed_files)
+    return changesets
+
+def main_silent(workers=None, full=False, directory_path=EXPORT_DIRECTORY, stream=False, chunk_size=None,
+                filenames=None, lock_timeout=0, pipeline=False, dry_run=False, skip_unchanged=False):
+    """
+    静默模式主程序，用于定时任务运行，不输出详细信息到控制台
+
+    默认只导入导入清单中没有记录、或大小/修改时间/内容哈希发生变化的工作簿；
+    整个导入过程持有导入锁，定时任务和目录监听服务不会同时写入同一批表。
+    每次运行的分阶段统计追加到 logs/ingest_metrics.jsonl
+
+    Args:
+        workers (int): 并行解析的进程数，默认读取环境变量 LCOA_INGEST_WORKERS
+        full (bool): 为True时忽略导入清单，全量重新导入所有文件
+        directory_path (str): Excel文件所在的目录路径
+        stream (bool): 为True时使用流式模式分块读取和写入，峰值内存只与分块大小有关；
+            每个数据块提交后记录检查点，中途失败后重新运行从中断处继续
+        chunk_size (int): 流式模式的分块行数，默认读取环境变量 LCOA_STREAM_CHUNK_SIZE
+        filenames (list): 只考虑指定的文件，默认考虑目录下所有Excel文件
+        lock_timeout (float): 等待导入锁的秒数，0表示已有导入任务在运行时直接跳过，None表示一直等待
+        pipeline (bool): 为True时使用流水线模式，解析和写库在两个线程中同时进行（分块方式与流式模式相同）
+        dry_run (bool): 为True时只计算各表的变更集并写入试运行报告，不修改任何表和导入清单
+        skip_unchanged (bool): 为True时记录与数据库一致、没有写入的表（或数据块），见 changeset.skip_unchanged
+
+    Returns:
+        list: lcoa表去重后的数据；流式模式和流水线模式不保留数据行，返回写入lcoa表的行数；
+            试运行返回各表的变更集
+    """
+    if dry_run:
+        mode = 'dry_run'
+    elif pipeline:
+        mode = 'pipeline'
+    elif stream:
+        mode = 'stream'
+    else:
+        mode = 'full' if full else 'incremental'
+    telemetry = IngestTelemetry(mode)
+
+    lock = IngestLock(timeout=lock_timeout)
+    with telemetry.stage('lock_wait'):
+        locked = lock.acquire()
+    if not locked:
+        logger.info("已有导入任务正在运行，跳过本次导入")
+        telemetry.finish('skipped')
+        return []
+
+    status = 'error'
+    try:
+        from lcoa.app import app, db, IngestManifest
+
+        if filenames is None:
+            filenames = list_export_workbooks(directory_path)
+        with telemetry.stage('manifest', len(filenames)) as stage:
+            with app.app_context():
+                ensure_manifest_table(db, IngestManifest)
+                if full:
+                    pending = all_workbook_fingerprints(directory_path, filenames)
+                else:
+                    pending = find_pending_workbooks(db, IngestManifest, directory_path, filenames)
+            stage['rows_out'] = len(pending)
+
+        if not pending:
+            logger.info("没有新增或变化的文件，跳过本次导入")
+            status = 'skipped'
+            return []
+
+        logger.info("本次需要导入 %d 个文件（共 %d 个）", len(pending), len(filenames))
+        # 按提取日期的先后导入，分块写入时日期较新的记录最后写入
+        pending_filenames = sort_by_extracted_date([fp['filename'] for fp in pending])
+        if dry_run:
+            # 试运行不写库，也不更新导入清单
+            changesets = dry_run_workbooks(directory_path, pending_filenames, workers, telemetry)
+            status = 'ok'
+            return changesets
+        if pipeline:
+            stats, parsed_files, all_saved = pipelined_ingest_workbooks(
+                directory_path, pending_filenames, chunk_size or DEFAULT_CHUNK_SIZE, telemetry=telemetry,
+                skip_unchanged=skip_unchanged, fingerprints=pending
+            )
+            unique_data = stats['lcoa']['rows']
+        elif stream:
+            stats, parsed_files, all_saved = stream_ingest_workbooks(
+                directory_path, pending_filenames, chunk_size or DEFAULT_CHUNK_SIZE, telemetry, skip_unchanged,
+                fingerprints=pending
+            )
+            unique_data = stats['lcoa']['rows']
+        else:
+            unique_data, parsed_files, all_saved = ingest_workbooks(
+                directory_path, pending_filenames, workers, telemetry, skip_unchanged
+            )
+
+        # 只有所有表都写入成功时才更新导入清单，失败的文件下次会重新导入；
+        # 流式模式和流水线模式已经在每个文件写完后记录导入清单和检查点
+        if all_saved and not (stream or pipeline):
+            with telemetry.stage('record_manifest'):
+                with app.app_context():
+                    record_ingested_workbooks(
+                        db, IngestManifest, [fp for fp in pending if fp['filename'] in parsed_files]
+                    )
+
+        status = 'ok' if all_saved else 'partial'
         return unique_data
     except Exception as e:
-        print(f"执行过程中发生错误: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("执行过程中发生错误: %s", e)
         return []
+    finally:
+        lock.release()
+        telemetry.finish(status)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""
+工作表解析缓存
+以 工作簿内容哈希 + 工作表索引 + 解析方式 为键，把解析好的DataFrame以pickle格式保存在磁盘上，
+重新导入（例如修复表结构或恢复数据库之后）时直接加载，不再重新解析XLSX
+
+缓存目录的总大小超过上限时，按最近使用时间（命中时刷新文件修改时间）淘汰最久未使用的条目
+
+环境变量:
+    LCOA_PARSE_CACHE            设为0时关闭缓存
+    LCOA_PARSE_CACHE_DIR        缓存目录，默认为项目根目录下的 cache/parsed_sheets
+    LCOA_PARSE_CACHE_MAX_MB     缓存目录的大小上限（MB），默认1024
+"""
+import hashlib
+import os
+import pickle
+
+import pandas as pd
+
+from lcoa.datedeal.ingest_logging import get_logger
+from lcoa.datedeal.ingest_manifest import file_content_hash
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 缓存格式版本，解析逻辑发生不兼容的变化时递增，使旧缓存全部失效
+CACHE_VERSION = 1
+
+CACHE_ENABLED = os.environ.get('LCOA_PARSE_CACHE', '1') != '0'
+CACHE_DIR = os.environ.get('LCOA_PARSE_CACHE_DIR', os.path.join(project_root, 'cache', 'parsed_sheets'))
+CACHE_MAX_BYTES = int(float(os.environ.get('LCOA_PARSE_CACHE_MAX_MB', '1024')) * 1024 * 1024)
+
+CACHE_SUFFIX = '.pkl'
+
+logger = get_logger('datedeal.parse_cache')
+
+# 进程内的文件哈希缓存：(路径, 大小, 修改时间) -> 内容哈希，避免同一文件的多个工作表重复计算
+_content_hashes = {}
+
+
+def workbook_hash(file_path):
+    """
+    获取工作簿的内容哈希（同一进程内按大小和修改时间复用）
+
+    Args:
+        file_path (str): Excel文件路径
+
+    Returns:
+        str: 十六进制哈希字符串
+    """
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    content_hash = _content_hashes.get(memo_key)
+    if content_hash is None:
+        content_hash = file_content_hash(file_path)
+        _content_hashes[memo_key] = content_hash
+    return content_hash
+
+
+def cache_key(content_hash, sheet_index, variant):
+    """
+    生成缓存键
+
+    Args:
+        content_hash (str): 工作簿内容哈希
+        sheet_index (int): 工作表索引
+        variant (str): 解析方式的签名（例如使用的列和dtype），不同的解析方式分别缓存
+
+    Returns:
+        str: 缓存文件名（不含目录）
+    """
+    signature = f'{CACHE_VERSION}|{pd.__version__}|{variant}'
+    variant_hash = hashlib.sha256(signature.encode('utf-8')).hexdigest()[:16]
+    return f'{content_hash}_{sheet_index}_{variant_hash}{CACHE_SUFFIX}'
+
+
+def _load(cache_path):
+    """读取缓存文件，命中时刷新修改时间作为最近使用时间；文件损坏时删除并返回None"""
+    try:
+        with open(cache_path, 'rb') as f:
+            df = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("解析缓存文件 %s 已损坏，重新解析: %s", os.path.basename(cache_path), e)
+        _remove(cache_path)
+        return None
+
+    try:
+        os.utime(cache_path)
+    except OSError:
+        pass
+    return df
+
+
+def _store(cache_path, df):
+    """原子地写入缓存文件（先写临时文件再替换），避免并行进程读到写了一半的文件"""
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        logger.warning("写入解析缓存失败: %s", e)
+        _remove(tmp_path)
+
+
+def _remove(path):
+    """删除文件，文件不存在时忽略"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def evict(cache_dir=None, max_bytes=None):
+    """
+    按最近使用时间淘汰缓存条目，直到缓存目录的总大小不超过上限
+
+    Args:
+        cache_dir (str): 缓存目录，默认 CACHE_DIR
+        max_bytes (int): 大小上限（字节），默认 CACHE_MAX_BYTES
+
+    Returns:
+        int: 删除的条目数
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    entries = []
+    total = 0
+    for entry in os.scandir(cache_dir):
+        if not entry.name.endswith(CACHE_SUFFIX):
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total += stat.st_size
+
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        _remove(path)
+        total -= size
+        removed += 1
+    return removed
+
+
+def cached_parse(file_path, sheet_index, variant, parse):
+    """
+    先查缓存，未命中时调用 parse 解析工作表并写入缓存
+
+    Args:
+        file_path (str): Excel文件路径
+        sheet_index (int): 工作表索引
+        variant (str): 解析方式的签名
+        parse (callable): 无参数的解析函数，返回DataFrame
+
+    Returns:
+        DataFrame: 工作表数据
+    """
+    if not CACHE_ENABLED:
+        return parse()
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        cache_path = os.path.join(CACHE_DIR, cache_key(workbook_hash(file_path), sheet_index, variant))
+    except OSError as e:
+        logger.warning("解析缓存不可用，直接解析: %s", e)
+        return parse()
+
+    df = _load(cache_path)
+    if df is not None:
+        return df
+
+    df = parse()
+    _store(cache_path, df)
+    evict()
+    return df
+
+
+def clear_cache(cache_dir=None):
+    """删除所有缓存条目"""
+    return evict(cache_dir, 0)
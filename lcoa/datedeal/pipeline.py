@@ -0,0 +1,168 @@
+"""
+流水线导入
+解析和写库同时进行：主线程流式解析工作簿并把去重后的数据块放入有界队列，
+写入线程持有自己的应用上下文（也就是自己的数据库会话）依次写入，
+解析下一个数据块时数据库在处理上一个数据块的提交，二者不再互相等待
+
+- 队列满时解析线程阻塞（背压），内存中最多只有 队列长度 + 2 个数据块
+- 只有一个写入线程，数据块按读取顺序写入，"后面的记录覆盖前面的记录"与流式模式一致
+- 写入线程发生异常后不再写库，但会继续取出队列中的数据块，解析线程不会因队列满而卡住
+
+环境变量:
+    LCOA_PIPELINE_QUEUE_SIZE    解析和写入之间的队列长度（数据块个数），默认4
+"""
+import os
+import queue
+import threading
+import time
+
+from lcoa.datedeal.ingest_logging import get_logger
+from lcoa.datedeal.stream_ingest import (
+    DEFAULT_CHUNK_SIZE,
+    dedup_chunks,
+    iter_directory_chunks,
+    log_ingest_stats,
+    new_table_stats,
+    number_chunks,
+    open_checkpoints,
+    table_sinks,
+    write_chunk
+)
+
+DEFAULT_QUEUE_SIZE = int(os.environ.get('LCOA_PIPELINE_QUEUE_SIZE', '4'))
+
+logger = get_logger('datedeal.pipeline')
+
+# 队列结束标记
+_DONE = object()
+
+
+class ChunkWriter(threading.Thread):
+    """写入线程：在自己的应用上下文中依次写入队列中的数据块"""
+
+    def __init__(self, work_queue, telemetry, skip_unchanged=False, fingerprints=None, chunk_size=None,
+                 completed_files=None):
+        """
+        Args:
+            work_queue (Queue): 数据块队列，元素为 (文件名, 目标表名, 序号, 数据行列表)，以 _DONE 结束
+            telemetry (IngestTelemetry): 分阶段统计
+            skip_unchanged (bool): 为True时记录与数据库一致、没有写入的数据块
+            fingerprints (list): 待导入文件的指纹，提供时记录检查点并逐个文件写入导入清单
+            chunk_size (int): 分块行数（检查点使用）
+            completed_files (list): 解析线程已完整读取的文件名（解析线程追加，写入线程只读）
+        """
+        super().__init__(name='ingest-writer', daemon=True)
+        self.work_queue = work_queue
+        self.telemetry = telemetry
+        self.skip_unchanged = skip_unchanged
+        self.fingerprints = fingerprints
+        self.chunk_size = chunk_size
+        self.completed_files = completed_files if completed_files is not None else []
+        self.stats = new_table_stats()
+        self.all_saved = True
+        self.error = None
+
+    def run(self):
+        from lcoa.app import app
+
+        try:
+            with app.app_context():
+                sinks = table_sinks(self.skip_unchanged)
+                checkpoints = open_checkpoints(self.fingerprints, self.chunk_size)
+                current_file = None
+                while True:
+                    item = self.work_queue.get()
+                    if item is _DONE:
+                        break
+                    filename = item[0]
+                    if checkpoints is not None and filename != current_file \
+                            and current_file in self.completed_files:
+                        # 上一个文件已经读完并全部写入
+                        checkpoints.finish_file(current_file)
+                    current_file = filename
+                    if not write_chunk(sinks, self.stats, self.telemetry, checkpoints, *item):
+                        self.all_saved = False
+                # 收到结束标记时解析线程已经结束，completed_files 是完整的
+                if checkpoints is not None:
+                    for filename in list(self.completed_files):
+                        checkpoints.finish_file(filename)
+        except Exception as e:
+            logger.exception("写入线程发生错误: %s", e)
+            self.error = e
+            self.all_saved = False
+            self._drain()
+
+    def _drain(self):
+        """出错后丢弃剩余的数据块，直到收到结束标记"""
+        while self.work_queue.get() is not _DONE:
+            pass
+
+
+def _put(work_queue, item, writer):
+    """放入队列；队列满时等待，写入线程意外退出（不再取出数据块）时抛出异常，避免解析线程一直阻塞"""
+    while True:
+        try:
+            work_queue.put(item, timeout=1)
+            return
+        except queue.Full:
+            if not writer.is_alive():
+                raise RuntimeError("写入线程已退出，停止解析")
+
+
+def pipelined_ingest_workbooks(directory_path, filenames=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                               queue_size=DEFAULT_QUEUE_SIZE, telemetry=None, skip_unchanged=False,
+                               fingerprints=None):
+    """
+    流水线导入工作簿：解析（主线程）和写库（写入线程）通过有界队列重叠执行
+
+    Args:
+        directory_path (str): Excel文件所在的目录路径
+        filenames (list): 需要导入的文件名，默认导入目录下所有Excel文件
+        chunk_size (int): 每块的行数
+        queue_size (int): 队列中最多缓存的数据块个数
+        telemetry (IngestTelemetry): 分阶段统计，默认不记录
+            （parse 为解析耗时，queue_wait 为队列满时解析线程等待的时间，save 为写入线程的耗时）
+        skip_unchanged (bool): 为True时记录与数据库一致、没有写入的数据块
+        fingerprints (list): 待导入文件的指纹，提供时记录检查点并逐个文件写入导入清单（见 ingest_checkpoint.py）
+
+    Returns:
+        tuple: (各目标表的统计 {'rows', 'chunks', 'inserted', 'updated', 'resumed_chunks'},
+                成功读取的文件名列表, 所有写入是否成功)
+    """
+    from lcoa.datedeal.main import remove_duplicates
+    from lcoa.datedeal.ingest_telemetry import IngestTelemetry
+
+    telemetry = telemetry or IngestTelemetry('pipeline')
+
+    completed_files = []
+    work_queue = queue.Queue(maxsize=max(1, queue_size))
+    writer = ChunkWriter(work_queue, telemetry, skip_unchanged, fingerprints, chunk_size, completed_files)
+    writer.start()
+
+    start = time.perf_counter()
+    try:
+        chunks = number_chunks(dedup_chunks(
+            iter_directory_chunks(directory_path, filenames, chunk_size, completed_files), remove_duplicates
+        ))
+        while True:
+            with telemetry.stage('parse') as stage:
+                item = next(chunks, None)
+                if item is not None:
+                    stage['rows_out'] = (stage['rows_out'] or 0) + len(item[3])
+            if item is None:
+                break
+            with telemetry.stage('queue_wait'):
+                _put(work_queue, item, writer)
+    finally:
+        # 解析出错时也要让写入线程结束
+        if writer.is_alive():
+            _put(work_queue, _DONE, writer)
+        writer.join()
+
+    telemetry.add_files(len(completed_files), sum(
+        os.path.getsize(os.path.join(directory_path, filename)) for filename in completed_files
+    ))
+
+    log_ingest_stats("流水线导入", writer.stats, completed_files, time.perf_counter() - start)
+
+    return writer.stats, completed_files, writer.all_saved and writer.error is None
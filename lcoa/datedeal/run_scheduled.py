@@ -1,11 +1,22 @@
 """
 计划任务运行脚本
 用于在后台定时运行数据处理脚本
+
+默认使用普通模式：多进程并行解析（--workers）、只读取需要的列、使用解析缓存，解析所有文件后整批写入，
+全部写完才记录导入清单；中途失败时下次运行重新导入所有待导入的文件（按键和内容哈希写入，重新导入不会产生重复记录）。
+
+--stream 使用流式模式：每个文件写完后立即记录导入清单，每个数据块提交后记录检查点，
+中途失败后下次运行只重新导入没有完成的文件，并从中断的数据块继续，峰值内存只与分块大小有关；
+代价是单进程逐行解析、不使用解析缓存，每个工作表要读取两遍（先找出浮点列，再读取数据行），
+适合单个文件很大、或者导入经常被中断的环境。--pipeline 的解析方式与流式模式相同
 """
 
 import os
 import sys
+import argparse
+import json
 import logging
+import traceback
 from datetime import datetime
 
 # 添加项目路径到Python路径
@@ -22,17 +33,51 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-def main():
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='导出表格定时导入任务')
+    parser.add_argument('--full', action='store_true',
+                        help='忽略导入清单，全量重新导入所有文件')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='并行解析的进程数，默认读取环境变量 LCOA_INGEST_WORKERS')
+    parser.add_argument('--stream', action='store_true',
+                        help='流式模式：分块读取和写入，每个文件写完后记录导入清单，中断后从检查点继续（单进程解析）')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='流式模式和流水线模式的分块行数，默认读取环境变量 LCOA_STREAM_CHUNK_SIZE')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='流水线模式：解析和写库同时进行，分块方式与流式模式相同')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='试运行：只计算各表会新增、更新、保持不变的行数，写入 logs/ingest_dryrun.json，不修改数据库')
+    parser.add_argument('--skip-unchanged', action='store_true',
+                        help='记录与数据库一致、没有写入的表（内容相同的行总是不写入）')
+    args = parser.parse_args(argv)
+    if args.workers is not None and (args.stream or args.pipeline):
+        parser.error('--workers 只用于普通模式，流式模式和流水线模式在单个进程中解析')
+    return args
+
+def main(argv=None):
     """主函数，用于计划任务调用"""
+    args = parse_args(argv)
     try:
-        logging.info("开始执行定时任务")
+        logging.info(f"开始执行定时任务（{'全量' if args.full else '增量'}，"
+                     f"{'流水线' if args.pipeline else '流式' if args.stream else '普通'}模式）")
         print(f"[{datetime.now()}] 开始执行定时任务")
         
-        # 导入并运行主要的数据处理函数
-        from lcoa.datedeal.main import main as process_data
-        result = process_data()
+        # 导入并运行主要的数据处理函数（默认只处理新增或变化的文件）
+        from lcoa.datedeal.main import main_silent as process_data
+        result = process_data(workers=args.workers, full=args.full,
+                              stream=args.stream, chunk_size=args.chunk_size, pipeline=args.pipeline,
+                              dry_run=args.dry_run, skip_unchanged=args.skip_unchanged)
         
-        logging.info(f"定时任务执行完成，处理了 {len(result) if result else 0} 条数据")
+        # 流式模式和流水线模式返回的是行数，普通模式返回数据行列表
+        row_count = result if isinstance(result, int) else len(result or [])
+        logging.info(f"定时任务执行完成，处理了 {row_count} 条数据")
+
+        # 记录本次运行的分阶段统计（完整历史见 logs/ingest_metrics.jsonl）
+        from lcoa.datedeal.ingest_telemetry import load_history
+        history = load_history()
+        if history:
+            logging.info(f"导入统计: {json.dumps(history[-1], ensure_ascii=False)}")
         print(f"[{datetime.now()}] 定时任务执行完成")
         
     except Exception as e:
@@ -42,5 +87,4 @@ def main():
         print(f"[{datetime.now()}] {error_msg}")
 
 if __name__ == "__main__":
-    import traceback
     main()
\ No newline at end of file
@@ -0,0 +1,508 @@
+"""
+流式导入
+基于 openpyxl 的 read_only 模式逐行读取超大导出表格，按固定大小分块产出数据行，
+每个数据块依次经过去重和 save_to_* 写入，峰值内存只与分块大小有关，与历史文件数量无关
+
+pandas 按整列推断类型（例如含空值的整数列会变成浮点列，输出 "12.0"），
+为了与普通模式写入相同的键值，每个工作表先做一遍只记录列类型标记的扫描，
+第二遍再按扫描结果转换单元格，内存占用仍与行数无关
+"""
+import os
+import time
+from datetime import datetime
+
+import openpyxl
+from sqlalchemy import func
+
+from lcoa.datedeal.ingest_logging import get_logger
+from lcoa.datedeal.workbook_reader import (
+    PROCESS_COLUMN_NAMES,
+    XIANGXI_COLUMN_NAMES,
+    CLUB_LEADING_COLUMNS,
+    SHEET_ROUTES,
+    build_column_index_mapping,
+    extract_date_from_filename,
+    list_export_workbooks,
+    read_workbook_once
+)
+
+# 默认分块大小（行）
+DEFAULT_CHUNK_SIZE = int(os.environ.get('LCOA_STREAM_CHUNK_SIZE', '5000'))
+
+# pandas 默认识别为缺失值的字符串
+NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+}
+
+# 需要按第二列和第三列去重的目标表
+DEDUP_TABLES = ('lcoa', 'sys_nodeal')
+
+# 按提取日期整体替换快照的目标表（逗号分隔，可选 sys_xiangxi、sys_club），其余表按键比对更新
+SNAPSHOT_TABLES = {
+    name.strip() for name in os.environ.get('LCOA_SNAPSHOT_TABLES', '').split(',') if name.strip()
+}
+
+logger = get_logger('datedeal.stream_ingest')
+
+
+def _is_missing(value):
+    """判断单元格是否会被 pandas 识别为缺失值"""
+    if value is None:
+        return True
+    if isinstance(value, float):
+        return value != value
+    if isinstance(value, str):
+        return value in NA_STRINGS
+    return False
+
+
+def cell_to_string(value, float_column=False):
+    """
+    把单元格的值转换为字符串，规则与 pandas 读取后 str(val) 一致
+
+    Args:
+        value: openpyxl 读取到的单元格值
+        float_column (bool): 该列是否会被 pandas 推断为浮点列
+
+    Returns:
+        str: 字符串值，缺失值返回空字符串
+    """
+    if _is_missing(value):
+        return ''
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, (int, float)):
+        if float_column:
+            return str(float(value))
+        # 与 pandas 一致：整数值的浮点数按整数处理
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+    if isinstance(value, datetime):
+        return str(value)
+    return str(value)
+
+
+def _header_names(raw_header):
+    """按 pandas 的规则生成列名：空列名为 "Unnamed: i"，重复列名添加 ".1"、".2" 后缀"""
+    names = []
+    seen = {}
+    for i, value in enumerate(raw_header):
+        name = f'Unnamed: {i}' if value is None or value == '' else value
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _sheet_positions(table_name, header):
+    """计算目标表每个输出列在工作表中的列位置（None表示不存在）"""
+    if table_name in ('lcoa', 'sys_nodeal'):
+        mapping = build_column_index_mapping(header, PROCESS_COLUMN_NAMES)
+        return [mapping.get(col_name) for col_name in PROCESS_COLUMN_NAMES]
+    if table_name == 'sys_xiangxi':
+        mapping = build_column_index_mapping(header, XIANGXI_COLUMN_NAMES)
+        return [mapping.get(col_name) for col_name in XIANGXI_COLUMN_NAMES]
+    if table_name == 'sys_club':
+        return list(range(min(CLUB_LEADING_COLUMNS, len(header))))
+    raise ValueError(f"未知的目标表: {table_name}")
+
+
+def _is_blank_row(raw_row):
+    """判断是否为完全空白的行"""
+    return not any(value is not None and value != '' for value in raw_row)
+
+
+def scan_float_columns(worksheet, positions):
+    """
+    扫描一遍工作表，找出会被 pandas 推断为浮点类型的列
+
+    只包含数字（不含布尔值），并且存在缺失值或非整数值的列会被 pandas 读成 float64
+
+    Args:
+        worksheet: openpyxl 的只读工作表
+        positions (list): 需要扫描的列位置（None表示不存在）
+
+    Returns:
+        list: 与 positions 对应的布尔值列表
+    """
+    targets = sorted({position for position in positions if position is not None})
+    numeric_only = dict.fromkeys(targets, True)
+    needs_float = dict.fromkeys(targets, False)
+    has_value = dict.fromkeys(targets, False)
+
+    rows = worksheet.iter_rows(values_only=True)
+    for raw_row in rows:
+        if not _is_blank_row(raw_row):
+            break
+
+    for raw_row in rows:
+        if _is_blank_row(raw_row):
+            continue
+        for position in targets:
+            if not numeric_only[position]:
+                continue
+            value = raw_row[position] if position < len(raw_row) else None
+            if _is_missing(value):
+                needs_float[position] = True
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                numeric_only[position] = False
+            else:
+                has_value[position] = True
+                if isinstance(value, float) and not value.is_integer():
+                    needs_float[position] = True
+
+    return [
+        position is not None and numeric_only[position] and has_value[position] and needs_float[position]
+        for position in positions
+    ]
+
+
+def iter_worksheet_row_chunks(worksheet, table_name, file_date, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    逐行读取工作表，按固定大小分块产出目标表的数据行
+
+    Args:
+        worksheet: openpyxl 的只读工作表
+        table_name (str): 目标表名
+        file_date (str): 从文件名提取的日期
+        chunk_size (int): 每块的行数
+
+    Yields:
+        list: 数据行列表，每行为 [日期] + 各目标列的值
+    """
+    rows = worksheet.iter_rows(values_only=True)
+
+    # 与 pandas 一致，跳过完全空白的行，第一个非空行作为表头
+    header = None
+    for raw_row in rows:
+        if not _is_blank_row(raw_row):
+            header = _header_names(raw_row)
+            break
+    if header is None:
+        return
+
+    positions = _sheet_positions(table_name, header)
+    float_columns = scan_float_columns(worksheet, positions)
+    columns = list(zip(positions, float_columns))
+
+    chunk = []
+    for raw_row in rows:
+        if _is_blank_row(raw_row):
+            continue
+        row_data = [file_date]
+        for position, float_column in columns:
+            if position is not None and position < len(raw_row):
+                row_data.append(cell_to_string(raw_row[position], float_column))
+            else:
+                row_data.append('')
+        chunk.append(row_data)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def iter_workbook_chunks(file_path, file_date, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    打开一次工作簿，依次流式读取所有目标工作表
+
+    .xls 文件 openpyxl 无法读取，退回 pandas 整表读取后再分块
+
+    Args:
+        file_path (str): Excel文件路径
+        file_date (str): 从文件名提取的日期
+        chunk_size (int): 每块的行数
+
+    Yields:
+        tuple: (目标表名, 数据行列表)
+    """
+    if file_path.endswith('.xls'):
+        for table_name, rows in read_workbook_once(file_path, file_date).items():
+            for start in range(0, len(rows), chunk_size):
+                yield table_name, rows[start:start + chunk_size]
+        return
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for table_name, sheet_index in SHEET_ROUTES.items():
+            if sheet_index >= len(workbook.worksheets):
+                continue
+            try:
+                for chunk in iter_worksheet_row_chunks(workbook.worksheets[sheet_index], table_name,
+                                                       file_date, chunk_size):
+                    yield table_name, chunk
+            except Exception as e:
+                # 抛出给 iter_directory_chunks：这个文件不计为已完整读取，不会写入导入清单，下次导入时重新读取
+                logger.error("流式读取文件 %s 的第 %d 个工作表时出错: %s", os.path.basename(file_path), sheet_index + 1, e)
+                raise
+    finally:
+        workbook.close()
+
+
+def iter_directory_chunks(directory_path, filenames=None, chunk_size=DEFAULT_CHUNK_SIZE, completed=None):
+    """
+    按文件顺序流式读取目录下的工作簿
+
+    Args:
+        directory_path (str): Excel文件所在的目录路径
+        filenames (list): 需要读取的文件名，默认读取目录下所有Excel文件
+        chunk_size (int): 每块的行数
+        completed (list): 如果提供，每个完整读取的文件名会追加到该列表
+
+    Yields:
+        tuple: (文件名, 目标表名, 数据行列表)
+    """
+    if filenames is None:
+        filenames = list_export_workbooks(directory_path)
+
+    for filename in filenames:
+        file_path = os.path.join(directory_path, filename)
+        file_date = extract_date_from_filename(filename)
+        try:
+            for table_name, chunk in iter_workbook_chunks(file_path, file_date, chunk_size):
+                yield filename, table_name, chunk
+        except Exception as e:
+            logger.error("流式读取文件 %s 时出错: %s", filename, e)
+            continue
+        if completed is not None:
+            completed.append(filename)
+
+
+def dedup_chunks(chunks, remove_duplicates):
+    """
+    对 lcoa 和 sys_nodeal 的每个数据块做块内去重
+
+    块之间"后面的记录覆盖前面的记录"由 save_to_* 的按键更新逻辑按顺序保证
+
+    Yields:
+        tuple: (文件名, 目标表名, 去重后的数据行列表)
+    """
+    for filename, table_name, chunk in chunks:
+        if table_name in DEDUP_TABLES:
+            chunk = remove_duplicates(chunk)
+        yield filename, table_name, chunk
+
+
+def table_sinks(skip_unchanged=False):
+    """
+    构建各目标表的写入函数（需要在应用上下文中调用）
+
+    LCOA_SNAPSHOT_TABLES 中的表按提取日期整体替换快照（见 save_snapshot_table）：
+    同一次导入中每个日期只在第一次出现时删除旧快照，之后的数据块只追加
+
+    sys_xiangxi、sys_club 表的键上没有唯一索引，整批写入时键不存在的每一行都新增一条记录；
+    这里记下导入开始前两个表的最大id，每个数据块只与导入前已有的记录匹配，
+    流式、流水线模式分块写入的结果与普通模式整批写入相同
+
+    Args:
+        skip_unchanged (bool): 为True时记录与数据库一致、没有写入的数据块（快照表不记录，见 changeset.skip_unchanged）
+
+    Returns:
+        dict: 目标表名 -> 写入函数 save(rows)，返回 save_to_* 的结果；
+            快照表的写入函数带有 replaced_dates 属性（本次导入已经替换过的日期）
+    """
+    from lcoa.app import db, Lcoa, SysNodeal, SysXiangxi, SysClub
+    from lcoa.app import (
+        save_to_lcoa_table,
+        save_to_sys_nodeal_table_with_comparison,
+        save_to_sys_xiangxi_table_with_comparison,
+        save_to_sys_club_table_with_comparison,
+        save_snapshot_table
+    )
+
+    from lcoa.datedeal.changeset import skip_unchanged as skip_unchanged_sink
+
+    # 导入开始前的最大id（空表为0）
+    max_ids = {
+        'sys_xiangxi': db.session.query(func.max(SysXiangxi.id)).scalar() or 0,
+        'sys_club': db.session.query(func.max(SysClub.id)).scalar() or 0,
+    }
+
+    sinks = {
+        'lcoa': lambda rows: save_to_lcoa_table(db, Lcoa, rows),
+        'sys_nodeal': lambda rows: save_to_sys_nodeal_table_with_comparison(db, SysNodeal, rows),
+        'sys_xiangxi': lambda rows: save_to_sys_xiangxi_table_with_comparison(db, SysXiangxi, rows,
+                                                                              max_id=max_ids['sys_xiangxi']),
+        'sys_club': lambda rows: save_to_sys_club_table_with_comparison(db, SysClub, rows,
+                                                                        max_id=max_ids['sys_club']),
+    }
+    if skip_unchanged:
+        sinks = {table_name: skip_unchanged_sink(table_name, save) for table_name, save in sinks.items()}
+
+    snapshot_models = {'sys_xiangxi': SysXiangxi, 'sys_club': SysClub}
+    for table_name in SNAPSHOT_TABLES:
+        if table_name not in snapshot_models:
+            logger.warning("LCOA_SNAPSHOT_TABLES 中的 %s 不是快照表，忽略", table_name)
+            continue
+        sinks[table_name] = snapshot_sink(db, snapshot_models[table_name], table_name, save_snapshot_table)
+    return sinks
+
+
+def snapshot_sink(db, Model, table_name, save_snapshot_table):
+    """构建快照表的写入函数，replaced_dates 属性记录本次导入已经替换过的日期"""
+    replaced_dates = set()
+
+    def save(rows):
+        return save_snapshot_table(db, Model, table_name, rows, replaced_dates)
+    save.replaced_dates = replaced_dates
+    return save
+
+
+def new_table_stats():
+    """各目标表的导入统计初始值"""
+    return {
+        table_name: {'rows': 0, 'chunks': 0, 'inserted': 0, 'updated': 0, 'resumed_chunks': 0}
+        for table_name in SHEET_ROUTES
+    }
+
+
+def number_chunks(chunks):
+    """
+    给每个数据块编上它在所属 (文件, 目标表) 中的序号，检查点按序号记录进度
+
+    Yields:
+        tuple: (文件名, 目标表名, 序号, 数据行列表)
+    """
+    counters = {}
+    for filename, table_name, chunk in chunks:
+        index = counters.get((filename, table_name), 0)
+        counters[(filename, table_name)] = index + 1
+        yield filename, table_name, index, chunk
+
+
+def write_chunk(sinks, stats, telemetry, checkpoints, filename, table_name, chunk_index, chunk):
+    """
+    写入一个数据块：之前的运行已提交的数据块直接跳过，写入成功后记录检查点
+
+    Args:
+        sinks (dict): table_sinks() 的结果
+        stats (dict): new_table_stats() 的结果，原地累计
+        telemetry (IngestTelemetry): 分阶段统计
+        checkpoints (IngestCheckpoints): 检查点，None表示不记录
+        filename (str): 文件名
+        table_name (str): 目标表名
+        chunk_index (int): 数据块序号
+        chunk (list): 数据行列表
+
+    Returns:
+        bool: 是否写入成功（跳过视为成功）
+    """
+    table_stats = stats[table_name]
+    if checkpoints is not None and checkpoints.is_done(filename, table_name, chunk_index):
+        table_stats['resumed_chunks'] += 1
+        # 快照表：之前的运行已经替换过这些日期，后面的数据块只追加
+        replaced_dates = getattr(sinks[table_name], 'replaced_dates', None)
+        if replaced_dates is not None:
+            replaced_dates.update(row[0] if row else '' for row in chunk)
+        return True
+
+    with telemetry.stage('save', len(chunk)):
+        save_start = time.perf_counter()
+        result = sinks[table_name](chunk)
+        telemetry.record_table(table_name, len(chunk), result, time.perf_counter() - save_start)
+    table_stats['rows'] += len(chunk)
+    table_stats['chunks'] += 1
+    if result is None:
+        if checkpoints is not None:
+            checkpoints.mark_failed(filename)
+        return False
+
+    table_stats['inserted'] += result['inserted']
+    table_stats['updated'] += result['updated']
+    if checkpoints is not None:
+        checkpoints.record_chunk(filename, table_name, chunk_index, len(chunk))
+    return True
+
+
+def open_checkpoints(fingerprints, chunk_size):
+    """
+    创建并读取本次运行的检查点（需要在应用上下文中调用）
+
+    Args:
+        fingerprints (list): 待导入文件的指纹，None表示不记录检查点
+        chunk_size (int): 分块行数
+
+    Returns:
+        IngestCheckpoints: 检查点，fingerprints为None时返回None
+    """
+    if fingerprints is None:
+        return None
+
+    from lcoa.app import db, IngestCheckpoint, IngestManifest
+    from lcoa.datedeal.ingest_checkpoint import IngestCheckpoints, ensure_checkpoint_table
+
+    ensure_checkpoint_table(db, IngestCheckpoint)
+    checkpoints = IngestCheckpoints(db, IngestCheckpoint, IngestManifest, fingerprints, chunk_size)
+    checkpoints.load()
+    return checkpoints
+
+
+def log_ingest_stats(label, stats, completed_files, seconds):
+    """输出流式/流水线导入的汇总"""
+    logger.info("%s完成，共 %d 个文件，耗时 %.2f 秒", label, len(completed_files), seconds)
+    for table_name, table_stats in stats.items():
+        resumed = f", 从检查点跳过 {table_stats['resumed_chunks']} 块" if table_stats['resumed_chunks'] else ''
+        logger.info("  %s: %d 块, %d 行, 新增 %d 条, 更新 %d 条%s", table_name, table_stats['chunks'],
+                    table_stats['rows'], table_stats['inserted'], table_stats['updated'], resumed)
+
+
+def stream_ingest_workbooks(directory_path, filenames=None, chunk_size=DEFAULT_CHUNK_SIZE, telemetry=None,
+                            skip_unchanged=False, fingerprints=None):
+    """
+    流式导入工作簿：读取 -> 块内去重 -> 写入 组成生成器流水线，同一时间只保留一个数据块
+
+    提供 fingerprints 时每个数据块提交后记录检查点，每个文件写完后立即写入导入清单，
+    中途失败后重新运行会从中断的数据块继续（见 ingest_checkpoint.py）
+
+    Args:
+        directory_path (str): Excel文件所在的目录路径
+        filenames (list): 需要导入的文件名，默认导入目录下所有Excel文件
+        chunk_size (int): 每块的行数
+        telemetry (IngestTelemetry): 分阶段统计，默认不记录（读取和去重的耗时为 stream 减去 save）
+        skip_unchanged (bool): 为True时记录与数据库一致、没有写入的数据块
+        fingerprints (list): 待导入文件的指纹，提供时记录检查点并逐个文件写入导入清单
+
+    Returns:
+        tuple: (各目标表的统计 {'rows', 'chunks', 'inserted', 'updated', 'resumed_chunks'},
+                成功读取的文件名列表, 所有写入是否成功)
+    """
+    from lcoa.app import app
+    from lcoa.datedeal.main import remove_duplicates
+    from lcoa.datedeal.ingest_telemetry import IngestTelemetry
+
+    telemetry = telemetry or IngestTelemetry('stream')
+
+    stats = new_table_stats()
+    completed_files = []
+    all_saved = True
+
+    start = time.perf_counter()
+    with telemetry.stage('stream'), app.app_context():
+        sinks = table_sinks(skip_unchanged)
+        checkpoints = open_checkpoints(fingerprints, chunk_size)
+        chunks = iter_directory_chunks(directory_path, filenames, chunk_size, completed_files)
+        current_file = None
+        for filename, table_name, chunk_index, chunk in number_chunks(dedup_chunks(chunks, remove_duplicates)):
+            if checkpoints is not None and filename != current_file and current_file in completed_files:
+                # 上一个文件已经读完并全部写入
+                checkpoints.finish_file(current_file)
+            current_file = filename
+            if not write_chunk(sinks, stats, telemetry, checkpoints, filename, table_name, chunk_index, chunk):
+                all_saved = False
+        if checkpoints is not None:
+            for filename in completed_files:
+                checkpoints.finish_file(filename)
+
+    telemetry.add_files(len(completed_files), sum(
+        os.path.getsize(os.path.join(directory_path, filename)) for filename in completed_files
+    ))
+    log_ingest_stats("流式导入", stats, completed_files, time.perf_counter() - start)
+
+    return stats, completed_files, all_saved
@@ -0,0 +1,298 @@
+"""
+导出目录监听服务
+常驻运行，轮询导出目录中文件的大小和修改时间，发现新增或变化的工作簿后只导入该文件，
+替代按固定时间全量扫描的定时任务
+
+- 文件大小和修改时间在 LCOA_WATCH_STABLE_SECONDS 秒内保持不变才认为写入完成（防止读取写了一半的文件）
+- 忽略 Office 的 ~$ 锁文件
+- 待导入文件放入有界队列，由单个工作线程依次导入；队列满时暂缓入队，下次轮询再试
+- 导入时持有导入锁，与定时任务、手动运行互斥，不会重复写入 lcoa / sys_nodeal
+- 导入失败（文件没有记录到导入清单）的文件按退避时间重新入队，文件变化后立即按新文件处理
+
+用法:
+    python lcoa/datedeal/watch_exports.py [目录] [--interval 5] [--stable-seconds 10] [--queue-size 100]
+        [--retry-seconds 60]
+
+环境变量:
+    LCOA_WATCH_INTERVAL         轮询间隔（秒），默认5
+    LCOA_WATCH_STABLE_SECONDS   文件保持不变多少秒后才导入，默认10
+    LCOA_WATCH_QUEUE_SIZE       待导入队列的最大长度，默认100
+    LCOA_WATCH_RETRY_SECONDS    导入失败后第一次重试前等待的秒数，之后每次失败加倍，默认60
+    LCOA_WATCH_RETRY_MAX_SECONDS  重试等待时间的上限（秒），默认3600
+"""
+import argparse
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+# 添加项目路径到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from lcoa.datedeal.ingest_logging import get_logger
+from lcoa.datedeal.workbook_reader import list_export_workbooks
+
+DEFAULT_INTERVAL = float(os.environ.get('LCOA_WATCH_INTERVAL', '5'))
+DEFAULT_STABLE_SECONDS = float(os.environ.get('LCOA_WATCH_STABLE_SECONDS', '10'))
+DEFAULT_QUEUE_SIZE = int(os.environ.get('LCOA_WATCH_QUEUE_SIZE', '100'))
+DEFAULT_RETRY_SECONDS = float(os.environ.get('LCOA_WATCH_RETRY_SECONDS', '60'))
+MAX_RETRY_SECONDS = float(os.environ.get('LCOA_WATCH_RETRY_MAX_SECONDS', '3600'))
+
+# 设置日志
+log_dir = os.path.join(project_root, 'logs')
+os.makedirs(log_dir, exist_ok=True)
+logging.basicConfig(
+    filename=os.path.join(log_dir, 'watch_exports.log'),
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = get_logger('datedeal.watch_exports')
+
+
+def ingest_single_workbook(directory_path, filename):
+    """
+    导入单个工作簿（等待导入锁，导入清单中已记录且未变化的文件会被跳过）
+
+    main_silent 记录导入中的错误但不抛出，导入后按导入清单判断文件是否导入成功
+
+    Args:
+        directory_path (str): Excel文件所在的目录路径
+        filename (str): 文件名
+
+    Returns:
+        bool: 文件是否已经记录到导入清单（本次导入成功，或之前已经导入且没有变化）
+    """
+    from lcoa.app import app, db, IngestManifest
+    from lcoa.datedeal.ingest_manifest import find_pending_workbooks
+    from lcoa.datedeal.main import main_silent
+
+    main_silent(directory_path=directory_path, filenames=[filename], lock_timeout=None)
+    with app.app_context():
+        return not find_pending_workbooks(db, IngestManifest, directory_path, [filename])
+
+
+class ExportWatcher:
+    """轮询导出目录，把写入完成的新文件交给工作线程导入"""
+
+    def __init__(self, directory_path, interval=DEFAULT_INTERVAL, stable_seconds=DEFAULT_STABLE_SECONDS,
+                 queue_size=DEFAULT_QUEUE_SIZE, ingest=ingest_single_workbook,
+                 retry_seconds=DEFAULT_RETRY_SECONDS, max_retry_seconds=MAX_RETRY_SECONDS):
+        """
+        Args:
+            directory_path (str): 监听的目录
+            interval (float): 轮询间隔（秒）
+            stable_seconds (float): 文件保持不变多少秒后才导入
+            queue_size (int): 待导入队列的最大长度
+            ingest (callable): 导入函数 ingest(directory_path, filename)，返回False或抛出异常表示导入失败
+            retry_seconds (float): 导入失败后第一次重试前等待的秒数，之后每次失败加倍
+            max_retry_seconds (float): 重试等待时间的上限（秒）
+        """
+        self.directory_path = directory_path
+        self.interval = interval
+        self.stable_seconds = stable_seconds
+        self.ingest = ingest
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self.work_queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+
+        # 轮询线程和工作线程都会修改下面的状态
+        self.state_lock = threading.Lock()
+        # 已入队的文件签名：文件名 -> (大小, 修改时间)
+        self.queued_signatures = {}
+        # 正在等待写入完成的文件：文件名 -> ((大小, 修改时间), 首次看到该签名的时间)
+        self.settling = {}
+        # 导入失败等待重试的文件：文件名 -> ((大小, 修改时间), 连续失败次数, 可以重新入队的时间)
+        self.failed = {}
+
+    def _signature(self, filename):
+        """获取文件签名，文件已被删除时返回None"""
+        try:
+            stat = os.stat(os.path.join(self.directory_path, filename))
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def poll_once(self, now=None):
+        """
+        扫描一次目录，把已经写入完成的新文件或变化的文件放入队列
+
+        Args:
+            now (float): 当前时间（time.monotonic），默认取当前值
+
+        Returns:
+            list: 本次入队的文件名
+        """
+        now = time.monotonic() if now is None else now
+        filenames = set(list_export_workbooks(self.directory_path))
+        with self.state_lock:
+            return self._poll_files(filenames, now)
+
+    def _poll_files(self, filenames, now):
+        """poll_once 的实现（调用时持有 state_lock）"""
+        # 文件被删除后清理状态，之后重新出现时当作新文件处理
+        for state in (self.queued_signatures, self.settling, self.failed):
+            for filename in list(state):
+                if filename not in filenames:
+                    del state[filename]
+
+        enqueued = []
+        for filename in sorted(filenames):
+            signature = self._signature(filename)
+            if signature is None or self.queued_signatures.get(filename) == signature:
+                continue
+
+            failed = self.failed.get(filename)
+            if failed is not None:
+                if failed[0] != signature:
+                    # 导入失败后文件又有变化：按新文件处理，重新等待写入完成
+                    del self.failed[filename]
+                elif now < failed[2]:
+                    continue
+                else:
+                    # 到了重试时间，文件没有变化，不需要再等待写入完成
+                    self.settling[filename] = (signature, now - self.stable_seconds)
+
+            settling = self.settling.get(filename)
+            if settling is None or settling[0] != signature:
+                # 新文件或仍在写入：记录签名，等待保持不变
+                self.settling[filename] = (signature, now)
+                continue
+            if now - settling[1] < self.stable_seconds:
+                continue
+
+            try:
+                self.work_queue.put_nowait(filename)
+            except queue.Full:
+                logger.warning("待导入队列已满（%d），%s 等待下次轮询", self.work_queue.maxsize, filename)
+                break
+            del self.settling[filename]
+            self.queued_signatures[filename] = signature
+            enqueued.append(filename)
+            if failed is not None and filename in self.failed:
+                logger.info("重新导入之前失败的文件（第 %d 次重试）: %s", failed[1], filename)
+            else:
+                logger.info("文件写入完成，加入导入队列: %s", filename)
+
+        return enqueued
+
+    def _record_failure(self, filename, now=None):
+        """
+        记录导入失败的文件：取消已入队的签名，按退避时间安排重试
+
+        重试等待时间从 retry_seconds 开始，每次连续失败加倍，不超过 max_retry_seconds；
+        重试时签名仍然相同才重新入队，文件变化后按新文件处理
+
+        Args:
+            filename (str): 文件名
+            now (float): 当前时间（time.monotonic），默认取当前值
+
+        Returns:
+            float: 距离下次重试的秒数
+        """
+        now = time.monotonic() if now is None else now
+        with self.state_lock:
+            signature = self.queued_signatures.pop(filename, None)
+            if signature is None:
+                # 导入期间文件被删除，不需要重试
+                return 0
+            previous = self.failed.get(filename)
+            attempts = previous[1] + 1 if previous is not None and previous[0] == signature else 1
+            delay = min(self.retry_seconds * 2 ** (attempts - 1), self.max_retry_seconds)
+            self.failed[filename] = (signature, attempts, now + delay)
+        return delay
+
+    def ingest_file(self, filename, now=None):
+        """
+        导入一个已出队的文件，失败（ingest 返回False或抛出异常）时按退避时间安排重试
+
+        Args:
+            filename (str): 文件名
+            now (float): 导入结束的时间（time.monotonic），默认取当前值
+
+        Returns:
+            bool: 是否导入成功
+        """
+        logger.info("开始导入 %s", filename)
+        try:
+            ingested = self.ingest(self.directory_path, filename) is not False
+        except Exception as e:
+            logger.exception("导入 %s 时发生错误: %s", filename, e)
+            ingested = False
+
+        if not ingested:
+            delay = self._record_failure(filename, now)
+            logger.warning("%s 没有导入成功，%.0f 秒后重试（文件变化时提前处理）", filename, delay)
+            return False
+
+        with self.state_lock:
+            self.failed.pop(filename, None)
+        logger.info("导入完成 %s", filename)
+        return True
+
+    def _worker(self):
+        """工作线程：依次导入队列中的文件（同一时间只有一个导入任务）"""
+        while not self.stop_event.is_set():
+            try:
+                filename = self.work_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                self.ingest_file(filename)
+            finally:
+                self.work_queue.task_done()
+
+    def run(self):
+        """启动工作线程并持续轮询，直到收到 KeyboardInterrupt 或调用 stop()"""
+        worker = threading.Thread(target=self._worker, name='export-ingest-worker', daemon=True)
+        worker.start()
+
+        logger.info("开始监听目录 %s（轮询间隔 %s 秒，稳定时间 %s 秒）",
+                    self.directory_path, self.interval, self.stable_seconds)
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    self.poll_once()
+                except Exception as e:
+                    logger.error("扫描目录时发生错误: %s", e)
+                self.stop_event.wait(self.interval)
+        except KeyboardInterrupt:
+            logger.info("收到中断信号，等待当前导入完成后退出")
+        finally:
+            self.stop_event.set()
+            worker.join()
+            logger.info("目录监听服务已停止")
+
+    def stop(self):
+        """请求停止监听"""
+        self.stop_event.set()
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    from lcoa.datedeal.main import EXPORT_DIRECTORY
+
+    parser = argparse.ArgumentParser(description='监听导出目录并导入新增的工作簿')
+    parser.add_argument('directory', nargs='?', default=EXPORT_DIRECTORY, help='监听的导出目录')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='轮询间隔（秒）')
+    parser.add_argument('--stable-seconds', type=float, default=DEFAULT_STABLE_SECONDS,
+                        help='文件保持不变多少秒后才导入')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE, help='待导入队列的最大长度')
+    parser.add_argument('--retry-seconds', type=float, default=DEFAULT_RETRY_SECONDS,
+                        help='导入失败后第一次重试前等待的秒数（之后每次失败加倍）')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    ExportWatcher(args.directory, args.interval, args.stable_seconds, args.queue_size,
+                  retry_seconds=args.retry_seconds).run()
+
+
+if __name__ == "__main__":
+    main()
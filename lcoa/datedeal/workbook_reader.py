@@ -0,0 +1,569 @@
+"""
+工作簿单次读取引擎
+每个Excel文件只打开一次，从同一个句柄解析第1、2、4、5个工作表，
+并将各工作表的数据行分发到 lcoa、sys_nodeal、sys_xiangxi、sys_club 四个目标表
+"""
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from pandas.errors import ParserError
+
+from lcoa.datedeal.file_catalog import get_catalog
+from lcoa.datedeal.ingest_logging import get_logger
+from lcoa.datedeal.parse_cache import cached_parse
+
+# 第一个表和第二个表需要读取的列名
+PROCESS_COLUMN_NAMES = [
+    '流程节点id', '流程id', '流程标题', '流程名称', '流程类型',
+    '所属分部', '所属部门', '节点操作者', '节点操作类型', '节点名称',
+    '最初接收时间', '最后处理时间', '总计耗时', '总计超时'
+]
+
+# 第四个表需要读取的列名
+XIANGXI_COLUMN_NAMES = [
+    '节点操作者', '所属部门', '节点操作类型', '数量'
+]
+
+# 第五个表只取前3列
+CLUB_LEADING_COLUMNS = 3
+
+# 各目标表的工作表结构：需要读取的列，第五个表按位置取前3列
+# 各列仍按 pandas 的类型推断读取（不指定 dtype），数字单元格转换为字符串的结果与完整解析相同
+SHEET_SCHEMAS = {
+    'lcoa': {'columns': PROCESS_COLUMN_NAMES},
+    'sys_nodeal': {'columns': PROCESS_COLUMN_NAMES},
+    'sys_xiangxi': {'columns': XIANGXI_COLUMN_NAMES},
+    'sys_club': {'leading_columns': CLUB_LEADING_COLUMNS},
+}
+
+# 目标表 -> 工作表索引
+SHEET_ROUTES = {
+    'lcoa': 0,
+    'sys_nodeal': 1,
+    'sys_xiangxi': 3,
+    'sys_club': 4,
+}
+
+# 并行解析的默认进程数（1表示串行）
+DEFAULT_INGEST_WORKERS = int(os.environ.get('LCOA_INGEST_WORKERS', '1'))
+
+logger = get_logger('datedeal.workbook_reader')
+
+
+# 文件名中的日期格式
+DASH_DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+CHINESE_DATE_PATTERN = re.compile(r'(\d{4}年\d{1,2}月\d{1,2}日)')
+
+
+@lru_cache(maxsize=65536)
+def extract_date_from_filename(filename):
+    """
+    从文件名中提取日期信息（结果按文件名缓存，排序和导入时同一个文件名只匹配一次正则）
+
+    Args:
+        filename (str): 文件名
+
+    Returns:
+        str: 提取到的日期，如果未找到则返回空字符串
+    """
+    # 尝试多种日期格式
+    # 格式1: 2025-09-29
+    match1 = DASH_DATE_PATTERN.search(filename)
+    if match1:
+        return match1.group(1)
+
+    # 格式2: 2025年10月09日
+    match2 = CHINESE_DATE_PATTERN.search(filename)
+    if match2:
+        date_str = match2.group(1)
+        try:
+            # 转换为标准格式
+            date_obj = datetime.strptime(date_str, '%Y年%m月%d日')
+            return date_obj.strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+
+    return ''
+
+
+def is_export_workbook(filename):
+    """判断文件名是否为需要处理的Excel导出文件（排除Office锁文件）"""
+    return filename.endswith(('.xlsx', '.xls')) and not filename.startswith('~$')
+
+
+def list_export_workbooks(directory_path):
+    """
+    列出目录下所有需要处理的Excel文件（来自目录索引，目录没有变化时不重新列目录，见 file_catalog.py）
+
+    Args:
+        directory_path (str): Excel文件所在的目录路径
+
+    Returns:
+        list: 文件名列表（按文件名中提取的日期排序，见 sort_by_extracted_date）
+    """
+    if not os.path.exists(directory_path):
+        logger.warning("目录 %s 不存在", directory_path)
+        return []
+    return sort_by_extracted_date(
+        [filename for filename in get_catalog(directory_path).filenames() if is_export_workbook(filename)]
+    )
+
+
+def sort_by_extracted_date(filenames):
+    """
+    按文件名中提取的日期排序（日期相同时按文件名），没有日期的文件排在最前面
+
+    导入和去重时"后面的记录覆盖前面的记录"由该顺序决定，不再依赖 os.listdir 返回的顺序
+
+    Args:
+        filenames (list): 文件名列表
+
+    Returns:
+        list: 排序后的文件名列表
+    """
+    return sorted(filenames, key=lambda filename: (extract_date_from_filename(filename), filename))
+
+
+def build_column_index_mapping(header_cols, column_names):
+    """
+    根据表头创建列索引映射（去除空格后精确匹配）
+
+    Args:
+        header_cols (list): 工作表的列名
+        column_names (list): 需要读取的列名
+
+    Returns:
+        dict: 目标列名 -> 列索引
+    """
+    col_index_mapping = {}
+    for i, col_name in enumerate(header_cols):
+        # 清理列名（去除空格等）
+        clean_col_name = col_name.strip()
+        for target_col in column_names:
+            if clean_col_name == target_col.strip():
+                col_index_mapping[target_col] = i
+                break
+    return col_index_mapping
+
+
+# 对数组逐元素调用str()的ufunc
+_to_str = np.frompyfunc(str, 1, 1)
+
+
+def _column_to_strings(column, common_dtype):
+    """
+    把一列值整体转换为字符串数组，缺失值转换为空字符串
+
+    与 iterrows 后逐个单元格执行 str(val) if pd.notna(val) else '' 的结果完全一致
+
+    Args:
+        column (Series): 工作表中的一列
+        common_dtype: 整个工作表 df.values 的公共类型（iterrows 按该类型取值）
+
+    Returns:
+        ndarray: object类型的字符串数组
+    """
+    missing = column.isna().to_numpy()
+
+    if column.dtype.kind == 'M' and column.dt.tz is None \
+            and not (column.dt.microsecond.any() or column.dt.nanosecond.any()):
+        # 不含秒以下部分的日期列：str(Timestamp) 固定为 "YYYY-MM-DD HH:MM:SS"，可整列格式化
+        strings = column.dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy(dtype=object)
+    else:
+        values = column.to_numpy(dtype=common_dtype)
+        if values.dtype.kind in 'mM':
+            # iterrows 会把日期/时间差装箱为 Timestamp/Timedelta，这里保持一致
+            values = pd.Series(values).to_numpy(dtype=object)
+        if values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) == 'string':
+            strings = values.copy()
+        else:
+            strings = _to_str(values).astype(object)
+
+    strings[missing] = ''
+    return strings
+
+
+def frame_to_rows(df, positions, prefix):
+    """
+    向量化地把DataFrame的指定列转换为数据行
+
+    Args:
+        df (DataFrame): 工作表数据
+        positions (list): 每个输出列对应的列位置，None表示该列不存在（输出空字符串）
+        prefix (list): 每行开头固定添加的值（例如从文件名提取的日期）
+
+    Returns:
+        list: 数据行列表，每行为 prefix + 各列的字符串值
+    """
+    row_count = len(df)
+    rows = np.empty((row_count, len(prefix) + len(positions)), dtype=object)
+    for i, value in enumerate(prefix):
+        rows[:, i] = value
+
+    # iterrows 按 df.values 的公共类型取值（例如整数列与浮点列共存时整数会变成浮点），
+    # 这里用空切片取得同样的公共类型，只转换需要的列，保证结果逐字节一致
+    common_dtype = df.iloc[:0].to_numpy().dtype
+    for j, position in enumerate(positions, start=len(prefix)):
+        if position is None:
+            rows[:, j] = ''
+        else:
+            rows[:, j] = _column_to_strings(df.iloc[:, position], common_dtype)
+
+    return rows.tolist()
+
+
+def rows_from_mapped_columns(df, column_names, file_date, col_index_mapping=None):
+    """
+    按列名映射把DataFrame转换为数据行，每行为 [日期] + 各目标列的值
+
+    Args:
+        df (DataFrame): 工作表数据
+        column_names (list): 需要读取的列名
+        file_date (str): 从文件名提取的日期
+        col_index_mapping (dict): 已计算好的列索引映射，默认根据表头计算
+
+    Returns:
+        list: 数据行列表
+    """
+    if col_index_mapping is None:
+        col_index_mapping = build_column_index_mapping(list(df.columns), column_names)
+    positions = [col_index_mapping.get(col_name) for col_name in column_names]
+    return frame_to_rows(df, positions, [file_date])
+
+
+def rows_from_leading_columns(df, file_date, count=CLUB_LEADING_COLUMNS):
+    """
+    取DataFrame的前count列转换为数据行，每行为 [日期] + 前count列的值
+
+    Args:
+        df (DataFrame): 工作表数据
+        file_date (str): 从文件名提取的日期
+        count (int): 读取的列数，None表示读取所有列
+
+    Returns:
+        list: 数据行列表
+    """
+    column_count = len(df.columns) if count is None else min(count, len(df.columns))
+    return frame_to_rows(df, list(range(column_count)), [file_date])
+
+
+def rows_from_mapped_columns_iterrows(df, column_names, file_date):
+    """
+    逐行（iterrows）实现的 rows_from_mapped_columns，作为向量化实现的对照基准
+    """
+    col_index_mapping = build_column_index_mapping(list(df.columns), column_names)
+
+    rows = []
+    for index, row in df.iterrows():
+        row_data = [file_date]
+        for col_name in column_names:
+            if col_name in col_index_mapping:
+                col_idx = col_index_mapping[col_name]
+                if col_idx < len(row):
+                    val = row.iloc[col_idx]
+                    row_data.append(str(val) if pd.notna(val) else '')
+                else:
+                    row_data.append('')
+            else:
+                row_data.append('')
+        rows.append(row_data)
+    return rows
+
+
+def rows_from_leading_columns_iterrows(df, file_date, count=CLUB_LEADING_COLUMNS):
+    """
+    逐行（iterrows）实现的 rows_from_leading_columns，作为向量化实现的对照基准
+    """
+    rows = []
+    for index, row in df.iterrows():
+        row_data = [file_date]
+        for i in range(min(count, len(row))):
+            val = row.iloc[i]
+            row_data.append(str(val) if pd.notna(val) else '')
+        rows.append(row_data)
+    return rows
+
+
+def schema_read_options(table_name):
+    """
+    根据目标表的工作表结构生成解析参数
+
+    按列名选择的表使用可调用的 usecols（去除空格后匹配，与 build_column_index_mapping 一致），
+    不需要先读取表头。不指定 dtype：文本列中的数字单元格按推断的类型读取，
+    转换为字符串的结果（例如 1.0）与完整解析一致，row_hash 和键值不会因此变化
+
+    Args:
+        table_name (str): 目标表名
+
+    Returns:
+        dict: 传给 ExcelFile.parse 的 usecols 参数
+    """
+    schema = SHEET_SCHEMAS[table_name]
+    if 'leading_columns' in schema:
+        return {'usecols': list(range(schema['leading_columns']))}
+
+    target_names = {col_name.strip() for col_name in schema['columns']}
+    return {'usecols': lambda col_name: str(col_name).strip() in target_names}
+
+
+def parse_sheet_projected(excel_file, sheet_index, table_name):
+    """
+    按目标表的结构解析工作表：只保留需要的列
+
+    不需要的列不会生成DataFrame列；列名保持不变，转换数据行的逻辑不需要修改。
+    工作表的列数少于 usecols、或者找不到任何需要的列时退回完整解析，保持原来的输出。
+    frame_to_rows 按DataFrame的公共类型取值，保留的列全部是数字列时公共类型可能与完整解析不同
+    （例如缺失值使整数变成浮点），这时也退回完整解析
+
+    Args:
+        excel_file (ExcelFile): 已打开的工作簿
+        sheet_index (int): 工作表索引
+        table_name (str): 目标表名
+
+    Returns:
+        DataFrame: 只包含需要的列的工作表数据
+    """
+    try:
+        df = excel_file.parse(sheet_name=sheet_index, **schema_read_options(table_name))
+    except ParserError:
+        return excel_file.parse(sheet_name=sheet_index)
+    if len(df.columns) == 0 or df.iloc[:0].to_numpy().dtype != object:
+        return excel_file.parse(sheet_name=sheet_index)
+    return df
+
+
+def schema_variant(table_name):
+    """按结构解析时的解析缓存签名，工作表结构修改后旧的缓存自动失效"""
+    return f'schema:{table_name}:{SHEET_SCHEMAS[table_name]!r}'
+
+
+def read_sheet_projected(file_path, table_name):
+    """
+    按目标表的结构解析对应的工作表（优先从解析缓存读取）
+
+    Args:
+        file_path (str): Excel文件路径
+        table_name (str): 目标表名
+
+    Returns:
+        DataFrame: 只包含需要的列的工作表数据
+    """
+    sheet_index = SHEET_ROUTES[table_name]
+
+    def parse():
+        with pd.ExcelFile(file_path) as excel_file:
+            return parse_sheet_projected(excel_file, sheet_index, table_name)
+
+    return cached_parse(file_path, sheet_index, schema_variant(table_name), parse)
+
+
+def full_variant(**read_options):
+    """完整解析时的解析缓存签名（包含传给 pd.read_excel 的参数）"""
+    return f'full:{sorted(read_options.items())!r}'
+
+
+def read_sheet_cached(file_path, sheet_index, **read_options):
+    """
+    完整解析工作表（优先从解析缓存读取），参数与 pd.read_excel 相同
+
+    Args:
+        file_path (str): Excel文件路径
+        sheet_index (int): 工作表索引
+        **read_options: 传给 pd.read_excel 的其他参数（例如 header）
+
+    Returns:
+        DataFrame: 工作表数据
+    """
+    return cached_parse(file_path, sheet_index, full_variant(**read_options),
+                        lambda: pd.read_excel(file_path, sheet_name=sheet_index, **read_options))
+
+
+def sheet_to_rows(table_name, df, file_date):
+    """按目标表的规则把工作表数据转换为数据行"""
+    if table_name in ('lcoa', 'sys_nodeal'):
+        return rows_from_mapped_columns(df, PROCESS_COLUMN_NAMES, file_date)
+    if table_name == 'sys_xiangxi':
+        return rows_from_mapped_columns(df, XIANGXI_COLUMN_NAMES, file_date)
+    if table_name == 'sys_club':
+        return rows_from_leading_columns(df, file_date)
+    raise ValueError(f"未知的目标表: {table_name}")
+
+
+def read_workbook_once(file_path, file_date, projected=True):
+    """
+    打开一次工作簿，解析所有目标工作表并转换为各目标表的数据行
+
+    Args:
+        file_path (str): Excel文件路径
+        file_date (str): 从文件名提取的日期
+        projected (bool): 是否按目标表的结构只解析需要的列（False时完整解析所有列）
+
+    Returns:
+        dict: 目标表名 -> 数据行列表；工作簿中没有的工作表对应的列表为空，
+            其他工作表读取错误直接抛出（不返回缺了某个表的部分结果）
+    """
+    sheet_rows = {table_name: [] for table_name in SHEET_ROUTES}
+
+    # 所有工作表都命中解析缓存时不需要打开工作簿
+    opened = []
+
+    def open_workbook():
+        if not opened:
+            opened.append(pd.ExcelFile(file_path))
+        return opened[0]
+
+    try:
+        for table_name, sheet_index in SHEET_ROUTES.items():
+            try:
+                if projected:
+                    df = cached_parse(file_path, sheet_index, schema_variant(table_name),
+                                      lambda: parse_sheet_projected(open_workbook(), sheet_index, table_name))
+                else:
+                    df = cached_parse(file_path, sheet_index, full_variant(),
+                                      lambda: open_workbook().parse(sheet_name=sheet_index))
+                if df.empty:
+                    continue
+                sheet_rows[table_name] = sheet_to_rows(table_name, df, file_date)
+            except Exception as e:
+                # 工作簿中没有这个工作表时按空表处理；其他读取错误抛出，整个文件不计为已解析，下次导入时重新读取
+                if sheet_index >= len(open_workbook().sheet_names):
+                    continue
+                logger.error("处理文件 %s 的第 %d 个工作表时出错: %s", os.path.basename(file_path), sheet_index + 1, e)
+                raise
+    finally:
+        if opened:
+            opened[0].close()
+
+    return sheet_rows
+
+
+def extract_all_sheet_data(directory_path, filenames=None):
+    """
+    单次遍历目录，每个工作簿只打开一次，提取所有目标表的数据
+
+    Args:
+        directory_path (str): Excel文件所在的目录路径
+        filenames (list): 只处理指定的文件，默认处理目录下所有Excel文件
+
+    Returns:
+        tuple: (目标表名 -> 数据行列表, 每个文件的解析耗时列表[(文件名, 秒数)])
+    """
+    all_data = {table_name: [] for table_name in SHEET_ROUTES}
+    file_timings = []
+
+    if filenames is None:
+        filenames = list_export_workbooks(directory_path)
+
+    for filename in filenames:
+        file_path = os.path.join(directory_path, filename)
+        file_date = extract_date_from_filename(filename)
+
+        start = time.perf_counter()
+        try:
+            sheet_rows = read_workbook_once(file_path, file_date)
+        except Exception as e:
+            logger.exception("处理文件 %s 时出错: %s", filename, e)
+            continue
+        elapsed = time.perf_counter() - start
+        file_timings.append((filename, elapsed))
+
+        for table_name, rows in sheet_rows.items():
+            all_data[table_name].extend(rows)
+
+    return all_data, file_timings
+
+
+def _read_workbook_task(task):
+    """
+    进程池中执行的单个文件解析任务（必须是模块级函数才能被pickle）
+
+    Args:
+        task (tuple): (文件名, 文件路径, 文件日期)
+
+    Returns:
+        tuple: (文件名, 目标表名 -> 数据行列表 或 None, 解析耗时, 错误信息)
+    """
+    filename, file_path, file_date = task
+    start = time.perf_counter()
+    try:
+        sheet_rows = read_workbook_once(file_path, file_date)
+    except Exception as e:
+        return filename, None, time.perf_counter() - start, str(e)
+    return filename, sheet_rows, time.perf_counter() - start, None
+
+
+def iter_parsed_workbooks(directory_path, workers=None, filenames=None):
+    """
+    逐个文件返回解析结果，调用方可以边解析边处理（例如边解析边去重），不需要先把所有文件的数据行合并到一起
+
+    workers 大于1时使用进程池并行解析，结果仍按文件列表的顺序返回
+
+    Args:
+        directory_path (str): Excel文件所在的目录路径
+        workers (int): 进程数，默认读取环境变量 LCOA_INGEST_WORKERS
+        filenames (list): 只处理指定的文件，默认处理目录下所有Excel文件
+
+    Yields:
+        tuple: (文件名, 目标表名 -> 数据行列表, 解析耗时)；解析出错的文件记录错误日志后跳过
+    """
+    workers = workers or DEFAULT_INGEST_WORKERS
+    if filenames is None:
+        filenames = list_export_workbooks(directory_path)
+
+    tasks = [
+        (filename, os.path.join(directory_path, filename), extract_date_from_filename(filename))
+        for filename in filenames
+    ]
+    if not tasks:
+        return
+
+    def results():
+        if workers <= 1:
+            yield from map(_read_workbook_task, tasks)
+            return
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            # executor.map 按提交顺序返回结果，保证合并顺序确定
+            yield from executor.map(_read_workbook_task, tasks)
+
+    for filename, sheet_rows, elapsed, error in results():
+        if error is not None:
+            logger.error("处理文件 %s 时出错: %s", filename, error)
+            continue
+        yield filename, sheet_rows, elapsed
+
+
+def extract_all_sheet_data_parallel(directory_path, workers=None, filenames=None):
+    """
+    使用进程池并行解析目录下的所有工作簿（见 iter_parsed_workbooks）
+
+    结果按文件列表的顺序合并，与串行模式完全一致
+
+    Args:
+        directory_path (str): Excel文件所在的目录路径
+        workers (int): 进程数，默认读取环境变量 LCOA_INGEST_WORKERS
+        filenames (list): 只处理指定的文件，默认处理目录下所有Excel文件
+
+    Returns:
+        tuple: (目标表名 -> 数据行列表, 每个文件的解析耗时列表[(文件名, 秒数)])
+    """
+    all_data = {table_name: [] for table_name in SHEET_ROUTES}
+    file_timings = []
+    for filename, sheet_rows, elapsed in iter_parsed_workbooks(directory_path, workers, filenames):
+        file_timings.append((filename, elapsed))
+        for table_name, rows in sheet_rows.items():
+            all_data[table_name].extend(rows)
+    return all_data, file_timings
+
+
+def print_file_timings(file_timings):
+    """输出解析耗时：每个文件的耗时和汇总（每个文件一行，INFO级别输出，便于找出解析慢的文件）"""
+    total = sum(elapsed for _, elapsed in file_timings)
+    for filename, elapsed in file_timings:
+        logger.info("  %s: %.2f 秒", filename, elapsed)
+    logger.info("共解析 %d 个文件，总耗时 %.2f 秒", len(file_timings), total)
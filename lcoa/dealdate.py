@@ -1,5 +1,4 @@
 import os
-import re
 import sys
 from datetime import datetime
 import pandas as pd
@@ -11,6 +10,9 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+from lcoa.datedeal.workbook_reader import read_sheet_cached, rows_from_leading_columns
+from lcoa.datedeal.file_catalog import get_catalog, parse_filename_date
+
 # ==============================
 # Excel数据处理类（参考tableprint.py实现）
 # ==============================
@@ -24,7 +26,7 @@ class ExcelDataProcessor:
         """读取Excel文件"""
         try:
             # 读取Excel文件，使用第二行作为列名
-            df = pd.read_excel(self.file_path, sheet_name=0, header=1)  # 读取第一个工作表
+            df = read_sheet_cached(self.file_path, 0, header=1)  # 读取第一个工作表（优先使用解析缓存）
             print(f"✅ 成功读取Excel文件，数据行数：{len(df)}")
             return df
         except Exception as e:
@@ -309,13 +311,10 @@ def read_filenames_from_directory(directory_path):
         list: 包含所有文件名的列表
     """
     try:
-        # 获取目录下的所有文件和文件夹
-        entries = os.listdir(directory_path)
-
-        # 筛选出文件（而不是文件夹）
-        filenames = [entry for entry in entries if os.path.isfile(os.path.join(directory_path, entry))]
-
-        return filenames
+        # 目录索引中的文件名（不含文件夹），目录没有变化时不重新列目录
+        if not os.path.exists(directory_path):
+            raise FileNotFoundError(directory_path)
+        return get_catalog(directory_path).filenames()
     except FileNotFoundError:
         print(f"错误：找不到指定的目录 {directory_path}")
         return []
@@ -359,36 +358,11 @@ def extract_date_from_filename(filename):
     Returns:
         datetime: 提取到的日期对象，如果未找到则返回None
     """
-    # 尝试多种日期格式
-    # 格式1: 2025-09-29
-    match1 = re.search(r'(\d{4}-\d{2}-\d{2})', filename)
-    if match1:
-        try:
-            return datetime.strptime(match1.group(1), '%Y-%m-%d')
-        except ValueError:
-            pass
-
-    # 格式2: 2025年10月09日
-    match2 = re.search(r'(\d{4}年\d{1,2}月\d{1,2}日)', filename)
-    if match2:
-        try:
-            return datetime.strptime(match2.group(1), '%Y年%m月%d日')
-        except ValueError:
-            pass
-
-    # 格式3: 20250929
-    match3 = re.search(r'(\d{8})', filename)
-    if match3:
-        try:
-            return datetime.strptime(match3.group(1), '%Y%m%d')
-        except ValueError:
-            pass
-
-    return None
+    return parse_filename_date(filename)
 
 def find_closest_file_to_current_date(directory_path):
     """
-    在指定目录中查找最接近当前日期的文件
+    在指定目录中查找最接近当前日期的文件（在目录索引上二分查找，见 datedeal/file_catalog.py）
 
     Args:
         directory_path (str): 目录路径
@@ -401,39 +375,10 @@ def find_closest_file_to_current_date(directory_path):
         print(f"目录 {directory_path} 不存在")
         return None, None, None
 
-    # 获取当前日期
-    current_date = datetime.now()
-    
-    closest_file = None
-    closest_date = None
-    min_diff_days = float('inf')
-
-    # 获取目录下的所有文件
-    filenames = read_filenames_from_directory(directory_path)
-    
-    # 遍历所有文件
-    for filename in filenames:
-        print(f"正在处理文件: {filename}")
-        
-        # 从文件名提取日期
-        file_date = extract_date_from_filename(filename)
-        
-        if file_date:
-            # 计算与当前日期的差距（绝对值）
-            diff_days = abs((current_date - file_date).days)
-            
-            print(f"提取的日期: {file_date.strftime('%Y-%m-%d')}, 与当前日期相差: {diff_days} 天")
-            
-            # 更新最接近的文件
-            if diff_days < min_diff_days:
-                min_diff_days = diff_days
-                closest_file = filename
-                closest_date = file_date
-        else:
-            print(f"未能从文件名中提取日期信息: {filename}")
-
-    if closest_file:
-        return closest_file, min_diff_days, closest_date
+    entry = get_catalog(directory_path).closest(datetime.now())
+    if entry:
+        print(f"提取的日期: {entry['date']}, 与当前日期相差: {entry['diff_days']} 天")
+        return entry['filename'], entry['diff_days'], parse_filename_date(entry['filename'])
     else:
         return None, None, None
 
@@ -487,7 +432,7 @@ def read_all_sheets_from_closest_file(directory_path):
             print(f"\n正在处理第 {i+1} 个工作表: {sheet_names[i]}")
             try:
                 # 读取第i个工作表
-                df = pd.read_excel(file_path, sheet_name=i)
+                df = read_sheet_cached(file_path, i)
                 
                 # 如果DataFrame为空，添加空数组
                 if df.empty:
@@ -495,11 +440,8 @@ def read_all_sheets_from_closest_file(directory_path):
                     sheet_arrays[i] = []
                     continue
                 
-                # 将每行数据添加到对应的数组中
-                for index, row in df.iterrows():
-                    # 将行数据转换为列表，处理NaN值，并在第一列添加提取的日期
-                    row_data = [extracted_date_str] + [str(val) if pd.notna(val) else '' for val in row]
-                    sheet_arrays[i].append(row_data)
+                # 向量化地把所有行转换为列表，处理NaN值，并在第一列添加提取的日期
+                sheet_arrays[i] = rows_from_leading_columns(df, extracted_date_str, None)
                 
                 print(f"从工作表 {sheet_names[i]} 读取了 {len(sheet_arrays[i])} 行数据")
                     
@@ -0,0 +1,95 @@
+"""
+查询索引迁移脚本
+为接口的常用查询建立模型中定义的二级索引（已有相同列的索引时跳过）：
+
+- sys_personal、sys_xiangxi、sys_club：按 extracted_date / extracted_on 取最新日期、查询某天的快照、按日期统计
+- sys_xiangxi、sys_club：导入时按键（没有唯一索引）查询已有记录
+- modification_log：按 (table_name, record_id) 查询修改日志并按 operation_time 倒序
+- sys_project_milestone：按 project_id 加载项目的里程碑
+- sys_project_milestone_impact_history：按 milestone_id、project_id 加载影响周期修改历史
+
+lcoa、sys_nodeal 表的导入键唯一索引需要先去重，见 migrate_upsert_keys.py；
+影子列需要先增加列，见 migrate_typed_columns.py（本脚本跳过表上还没有的列）。
+建立索引后可以运行 lcoa/test_query_plans.py 检查这些查询的执行计划
+
+用法:
+    python lcoa/migrate_indexes.py [--dry-run]
+"""
+import argparse
+import os
+import sys
+
+# 添加项目根目录和lcoa目录到Python路径（app.py 按 from models import ... 导入）
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (project_root, os.path.join(project_root, 'lcoa')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def missing_indexes(db, Model):
+    """
+    模型中定义的、数据库中还没有相同列（按顺序）索引的非唯一索引
+
+    MySQL 会为外键列自动建立索引，这类列视为已有索引
+
+    Returns:
+        tuple: (缺少的索引列表, 因表上缺少列而跳过的索引列表)
+    """
+    table_name = Model.__tablename__
+    inspector = db.inspect(db.engine)
+    columns = {column['name'] for column in inspector.get_columns(table_name)}
+    existing = {tuple(index['column_names']) for index in inspector.get_indexes(table_name)}
+    existing |= {tuple(constraint['column_names']) for constraint in inspector.get_unique_constraints(table_name)}
+
+    missing, skipped = [], []
+    for index in sorted(Model.__table__.indexes, key=lambda index: index.name):
+        if index.unique:
+            continue
+        index_columns = tuple(index.columns.keys())
+        if index_columns in existing:
+            continue
+        if not set(index_columns) <= columns:
+            skipped.append(index)
+        else:
+            missing.append(index)
+    return missing, skipped
+
+
+def migrate_indexes(dry_run=False):
+    """建立常用查询的二级索引"""
+    from lcoa.app import (app, db, SysPersonal, SysXiangxi, SysClub, SysProjectMilestone,
+                          SysProjectMilestoneImpactHistory, ModificationLog)
+
+    with app.app_context():
+        for Model in (SysPersonal, SysXiangxi, SysClub, SysProjectMilestone,
+                      SysProjectMilestoneImpactHistory, ModificationLog):
+            table_name = Model.__tablename__
+            try:
+                missing, skipped = missing_indexes(db, Model)
+                for index in skipped:
+                    print(f"{table_name} 表缺少索引 {index.name} 的列 ({', '.join(index.columns.keys())})，"
+                          f"请先运行 migrate_typed_columns.py")
+                if not missing:
+                    print(f"{table_name} 表的索引已全部建立")
+                    continue
+
+                for index in missing:
+                    description = f"{index.name} ({', '.join(index.columns.keys())})"
+                    if dry_run:
+                        print(f"{table_name} 表将建立索引 {description}")
+                        continue
+                    # 先结束当前会话的事务，否则MySQL建索引时会一直等待该事务持有的元数据锁
+                    db.session.commit()
+                    index.create(db.engine)
+                    print(f"{table_name} 表已建立索引 {description}")
+            except Exception as e:
+                db.session.rollback()
+                print(f"迁移 {table_name} 表时出错: {e}")
+                raise
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='为接口的常用查询建立二级索引')
+    parser.add_argument('--dry-run', action='store_true', help='只输出将要建立的索引，不修改数据库')
+    args = parser.parse_args()
+    migrate_indexes(args.dry_run)
@@ -0,0 +1,111 @@
+"""
+内容哈希列迁移脚本
+为 lcoa、sys_nodeal、sys_xiangxi、sys_club 表增加 row_hash 列，并回填已有记录的内容哈希；
+导入时按该哈希判断记录内容是否变化，没有变化的行不再写入
+
+回填按id分批读取、计算并提交，已有哈希的记录跳过，中途中断后重新运行会从未回填的记录继续。
+没有回填的记录导入时按"内容已变化"处理（照常写入并补上哈希），不会漏掉更新
+
+用法:
+    python lcoa/migrate_row_hash.py [--batch-size 5000] [--dry-run]
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy import bindparam, func, select, text, update
+
+# 添加项目根目录和lcoa目录到Python路径（app.py 按 from models import ... 导入）
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (project_root, os.path.join(project_root, 'lcoa')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# 每批回填的记录数（每批提交一次）
+BACKFILL_BATCH_SIZE = 5000
+
+
+def add_row_hash_column(db, table_name):
+    """表上没有 row_hash 列时增加该列，返回是否新增了列"""
+    columns = {column['name'] for column in db.inspect(db.engine).get_columns(table_name)}
+    if 'row_hash' in columns:
+        return False
+    # 先结束当前会话的事务，否则MySQL执行DDL时会一直等待该事务持有的元数据锁
+    db.session.commit()
+    with db.engine.begin() as connection:
+        connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN row_hash VARCHAR(32) NULL'))
+    return True
+
+
+def backfill_row_hash(db, Model, table_name, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    分批计算并写入 row_hash 为空的记录的内容哈希
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类
+        table_name (str): 表名（TABLE_ROW_COLUMNS 的键）
+        batch_size (int): 每批读取和提交的记录数
+
+    Returns:
+        int: 回填的记录数
+    """
+    from services.data_service import TABLE_ROW_COLUMNS, content_hash
+
+    table = Model.__table__
+    columns = [table.c[column] for column in TABLE_ROW_COLUMNS[table_name]['columns']]
+    statement = update(table).where(table.c.id == bindparam('b_id')).values(row_hash=bindparam('b_hash'))
+
+    last_id = 0
+    filled = 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, *columns)
+            .where(table.c.id > last_id, table.c.row_hash.is_(None))
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        db.session.execute(statement, [{'b_id': row[0], 'b_hash': content_hash(tuple(row[1:]))} for row in rows])
+        db.session.commit()
+        last_id = rows[-1][0]
+        filled += len(rows)
+        print(f"  {table_name}: 已回填 {filled} 条")
+    return filled
+
+
+def migrate_row_hash(batch_size=BACKFILL_BATCH_SIZE, dry_run=False):
+    """增加 row_hash 列并回填已有记录的内容哈希"""
+    from lcoa.app import app, db, Lcoa, SysNodeal, SysXiangxi, SysClub
+
+    with app.app_context():
+        for Model in (Lcoa, SysNodeal, SysXiangxi, SysClub):
+            table_name = Model.__tablename__
+            try:
+                if dry_run:
+                    columns = {column['name'] for column in db.inspect(db.engine).get_columns(table_name)}
+                    query = select(func.count()).select_from(Model.__table__)
+                    if 'row_hash' in columns:
+                        query = query.where(Model.__table__.c.row_hash.is_(None))
+                    else:
+                        print(f"{table_name} 表将增加 row_hash 列")
+                    print(f"{table_name} 表将回填 {db.session.execute(query).scalar()} 条记录")
+                    continue
+
+                if add_row_hash_column(db, table_name):
+                    print(f"{table_name} 表已增加 row_hash 列")
+                filled = backfill_row_hash(db, Model, table_name, batch_size)
+                print(f"{table_name} 表回填完成，共 {filled} 条记录")
+            except Exception as e:
+                db.session.rollback()
+                print(f"迁移 {table_name} 表时出错: {e}")
+                raise
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='为导入表增加内容哈希列并回填已有记录')
+    parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='每批回填并提交的记录数')
+    parser.add_argument('--dry-run', action='store_true', help='只统计需要回填的记录，不修改数据库')
+    args = parser.parse_args()
+    migrate_row_hash(args.batch_size, args.dry_run)
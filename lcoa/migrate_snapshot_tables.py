@@ -0,0 +1,253 @@
+"""
+快照表迁移和维护脚本
+sys_xiangxi、sys_club、sys_personal 表每天一份快照（按 extracted_date 区分），
+按日期查询（三个表）和按日期替换快照（sys_xiangxi、sys_club，见 LCOA_SNAPSHOT_TABLES）都依赖 extracted_date 上的索引
+
+- 默认：为三个表建立 extracted_date 索引（已有则跳过）
+- --partition：MySQL 上把三个表改为按 extracted_date 的 RANGE COLUMNS 按月分区，
+  最早的月份之前的记录（包括日期为空的记录）放在 p000000 分区，当前月份之后的记录放在 pmax 分区
+  （分区列必须包含在主键中，主键改为 (id, extracted_date)，extracted_date 改为 NOT NULL，空值改为空字符串）
+- --add-months N：把 pmax 分区拆出从当前月份起 N 个月的分区，定时执行以便新数据落在按月分区中
+- --drop-before YYYY-MM：删除该月份之前的快照；分区表直接删除整个分区，其他表按id分批删除
+
+用法:
+    python lcoa/migrate_snapshot_tables.py [--partition] [--add-months 3] [--drop-before 2025-01] [--dry-run]
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+from sqlalchemy import delete, func, select, text
+
+# 添加项目根目录和lcoa目录到Python路径（app.py 按 from models import ... 导入）
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (project_root, os.path.join(project_root, 'lcoa')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# 分区表默认预留的月份数
+DEFAULT_MONTHS_AHEAD = 3
+# 非分区表删除旧快照时每批删除的记录数
+DELETE_BATCH_SIZE = 5000
+
+
+def month_start(month):
+    """'2025-10' 或 date -> date(2025, 10, 1)"""
+    if isinstance(month, date):
+        return date(month.year, month.month, 1)
+    year, month_number = month[:7].split('-')
+    return date(int(year), int(month_number), 1)
+
+
+def next_month(month):
+    """某个月第一天的下一个月第一天"""
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    """按月分区的名称：p202510"""
+    return f'p{month.year:04d}{month.month:02d}'
+
+
+def partition_definition(month):
+    """按月分区的定义：该月及之前的日期（extracted_date 为 'YYYY-MM-DD' 字符串，按字符串比较）"""
+    upper = next_month(month)
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{upper.year:04d}-{upper.month:02d}')"
+
+
+def extracted_date_index_exists(db, table_name):
+    """表上是否已有 extracted_date 单列索引"""
+    return any(index['column_names'] == ['extracted_date'] for index in db.inspect(db.engine).get_indexes(table_name))
+
+
+def create_extracted_date_index(db, Model, dry_run=False):
+    """建立模型中定义的 extracted_date 索引，返回是否新建了索引"""
+    table_name = Model.__tablename__
+    if extracted_date_index_exists(db, table_name):
+        print(f"{table_name} 表已有 extracted_date 索引，跳过")
+        return False
+    index = next(index for index in Model.__table__.indexes if list(index.columns.keys()) == ['extracted_date'])
+    if dry_run:
+        print(f"{table_name} 表将建立索引 {index.name} (extracted_date)")
+        return False
+    # 先结束当前会话的事务，否则MySQL建索引时会一直等待该事务持有的元数据锁
+    db.session.commit()
+    index.create(db.engine)
+    print(f"{table_name} 表已建立索引 {index.name} (extracted_date)")
+    return True
+
+
+def existing_partitions(db, table_name):
+    """MySQL 表的分区名称（按分区顺序），未分区时返回空列表"""
+    rows = db.session.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {'table_name': table_name}).all()
+    return [row[0] for row in rows]
+
+
+def partition_table(db, Model, months_ahead=DEFAULT_MONTHS_AHEAD, dry_run=False):
+    """
+    把表改为按 extracted_date 的 RANGE COLUMNS 按月分区（只支持MySQL，已分区的表跳过）
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类
+        months_ahead (int): 当前月份之后预留的月份数
+        dry_run (bool): 为True时只输出将要执行的语句
+    """
+    table_name = Model.__tablename__
+    if existing_partitions(db, table_name):
+        print(f"{table_name} 表已经分区，跳过")
+        return
+
+    table = Model.__table__
+    first_date = db.session.execute(
+        select(func.min(table.c.extracted_date)).where(table.c.extracted_date > '')
+    ).scalar()
+    first = month_start(first_date) if first_date else month_start(date.today())
+    last = month_start(date.today())
+    for _ in range(months_ahead):
+        last = next_month(last)
+
+    definitions = [f"PARTITION p000000 VALUES LESS THAN ('{first.year:04d}-{first.month:02d}')"]
+    month = first
+    while month <= last:
+        definitions.append(partition_definition(month))
+        month = next_month(month)
+    definitions.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+
+    statements = [
+        f"UPDATE {table_name} SET extracted_date = '' WHERE extracted_date IS NULL",
+        f"ALTER TABLE {table_name} MODIFY extracted_date VARCHAR(20) NOT NULL DEFAULT '', "
+        f"DROP PRIMARY KEY, ADD PRIMARY KEY (id, extracted_date)",
+        f"ALTER TABLE {table_name} PARTITION BY RANGE COLUMNS(extracted_date) (\n    "
+        + ",\n    ".join(definitions) + "\n)",
+    ]
+    if dry_run:
+        print(f"{table_name} 表将执行:")
+        for statement in statements:
+            print(f"  {statement};")
+        return
+
+    db.session.commit()
+    with db.engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+    print(f"{table_name} 表已按月分区，共 {len(definitions)} 个分区（{partition_name(first)} - {partition_name(last)}）")
+
+
+def add_month_partitions(db, Model, months_ahead=DEFAULT_MONTHS_AHEAD, dry_run=False):
+    """把 pmax 分区拆出从当前月份起 months_ahead 个月中还没有的按月分区"""
+    table_name = Model.__tablename__
+    partitions = existing_partitions(db, table_name)
+    if 'pmax' not in partitions:
+        print(f"{table_name} 表没有按本脚本分区，跳过")
+        return
+
+    month = month_start(date.today())
+    months = []
+    for _ in range(months_ahead + 1):
+        months.append(month)
+        month = next_month(month)
+    # 只能从 pmax 中拆出比已有分区更晚的月份
+    latest = max((name for name in partitions if name not in ('p000000', 'pmax')), default='p000000')
+    months = [month for month in months if partition_name(month) > latest]
+    if not months:
+        print(f"{table_name} 表已有到 {latest} 的分区，不需要新增")
+        return
+
+    statement = (f"ALTER TABLE {table_name} REORGANIZE PARTITION pmax INTO (\n    "
+                 + ",\n    ".join([partition_definition(month) for month in months]
+                                  + ["PARTITION pmax VALUES LESS THAN (MAXVALUE)"]) + "\n)")
+    if dry_run:
+        print(f"{table_name} 表将执行:\n  {statement};")
+        return
+    db.session.commit()
+    with db.engine.begin() as connection:
+        connection.execute(text(statement))
+    print(f"{table_name} 表已新增分区 {', '.join(partition_name(month) for month in months)}")
+
+
+def drop_snapshots_before(db, Model, month, dry_run=False):
+    """
+    删除 month 之前的快照：按本脚本分区的表删除整个按月分区（不逐行删除），其他表按id分批删除
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类
+        month (str): 'YYYY-MM'，该月份之前的快照会被删除
+        dry_run (bool): 为True时只输出将要删除的分区或记录数
+    """
+    table_name = Model.__tablename__
+    table = Model.__table__
+    boundary = month_start(month)
+    cutoff = f'{boundary.year:04d}-{boundary.month:02d}'
+
+    partitions = existing_partitions(db, table_name) if db.engine.dialect.name == 'mysql' else []
+    if 'pmax' in partitions:
+        expired = [name for name in partitions if name not in ('p000000', 'pmax') and name < partition_name(boundary)]
+        if not expired:
+            print(f"{table_name} 表没有 {cutoff} 之前的分区")
+            return
+        statement = f"ALTER TABLE {table_name} DROP PARTITION {', '.join(expired)}"
+        if dry_run:
+            print(f"{table_name} 表将执行: {statement};")
+            return
+        db.session.commit()
+        with db.engine.begin() as connection:
+            connection.execute(text(statement))
+        print(f"{table_name} 表已删除分区 {', '.join(expired)}")
+        return
+
+    condition = (table.c.extracted_date > '') & (table.c.extracted_date < cutoff)
+    if dry_run:
+        count = db.session.execute(select(func.count()).select_from(table).where(condition)).scalar()
+        print(f"{table_name} 表将删除 {count} 条 {cutoff} 之前的记录")
+        return
+    removed = 0
+    while True:
+        ids = db.session.execute(select(table.c.id).where(condition).limit(DELETE_BATCH_SIZE)).scalars().all()
+        if not ids:
+            break
+        db.session.execute(delete(table).where(table.c.id.in_(ids)))
+        db.session.commit()
+        removed += len(ids)
+    print(f"{table_name} 表已删除 {removed} 条 {cutoff} 之前的记录")
+
+
+def migrate_snapshot_tables(partition=False, add_months=None, drop_before=None, dry_run=False):
+    """建立 extracted_date 索引，并按参数分区、新增分区或删除旧快照"""
+    from lcoa.app import app, db, SysXiangxi, SysClub, SysPersonal
+
+    with app.app_context():
+        is_mysql = db.engine.dialect.name == 'mysql'
+        if (partition or add_months) and not is_mysql:
+            print(f"{db.engine.dialect.name} 数据库不支持按日期分区，只建立索引")
+
+        for Model in (SysXiangxi, SysClub, SysPersonal):
+            try:
+                create_extracted_date_index(db, Model, dry_run)
+                if partition and is_mysql:
+                    partition_table(db, Model, add_months or DEFAULT_MONTHS_AHEAD, dry_run)
+                elif add_months and is_mysql:
+                    add_month_partitions(db, Model, add_months, dry_run)
+                if drop_before:
+                    drop_snapshots_before(db, Model, drop_before, dry_run)
+            except Exception as e:
+                db.session.rollback()
+                print(f"迁移 {Model.__tablename__} 表时出错: {e}")
+                raise
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='快照表的日期索引、按月分区和旧快照删除')
+    parser.add_argument('--partition', action='store_true', help='MySQL 上把快照表改为按月分区')
+    parser.add_argument('--add-months', type=int, default=None,
+                        help=f'分区时（或为已分区的表）预留当前月份之后的月份数，默认 {DEFAULT_MONTHS_AHEAD}')
+    parser.add_argument('--drop-before', default=None, help='删除该月份（YYYY-MM）之前的快照')
+    parser.add_argument('--dry-run', action='store_true', help='只输出将要执行的操作，不修改数据库')
+    args = parser.parse_args()
+    migrate_snapshot_tables(args.partition, args.add_months, args.drop_before, args.dry_run)
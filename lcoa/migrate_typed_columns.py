@@ -0,0 +1,149 @@
+"""
+类型化影子列迁移脚本
+为 lcoa、sys_nodeal、sys_xiangxi、sys_club、sys_project_milestone 表增加日期、时间、耗时和数量的类型化影子列
+（见 services/typed_columns.py），为 sys_xiangxi、sys_club 表的 extracted_on 建立索引，并回填已有记录
+
+回填按id分批读取原字段、解析并提交，只写入影子列值有变化的记录，可以重复运行
+（例如调整了解析规则后重新运行）。迁移完成前新导入的记录在写入时已经带有影子列
+
+用法:
+    python lcoa/migrate_typed_columns.py [--batch-size 5000] [--dry-run]
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy import bindparam, func, select, text, update
+
+# 添加项目根目录和lcoa目录到Python路径（app.py 按 from models import ... 导入）
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (project_root, os.path.join(project_root, 'lcoa')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# 每批回填的记录数（每批提交一次）
+BACKFILL_BATCH_SIZE = 5000
+
+
+def add_typed_columns(db, Model, table_name, dry_run=False):
+    """
+    增加表上还没有的影子列，并建立模型中定义的影子列索引
+
+    Returns:
+        list: 新增（或将要新增）的列名
+    """
+    from services.typed_columns import TYPED_COLUMNS
+
+    inspector = db.inspect(db.engine)
+    existing = {column['name'] for column in inspector.get_columns(table_name)}
+    missing = [column for column in TYPED_COLUMNS[table_name] if column not in existing]
+    indexed = {tuple(index['column_names']) for index in inspector.get_indexes(table_name)}
+    indexes = [index for index in Model.__table__.indexes
+               if set(index.columns.keys()) & set(TYPED_COLUMNS[table_name])
+               and tuple(index.columns.keys()) not in indexed]
+
+    if dry_run:
+        for column in missing:
+            print(f"{table_name} 表将增加 {column} 列")
+        for index in indexes:
+            print(f"{table_name} 表将建立索引 {index.name} ({', '.join(index.columns.keys())})")
+        return missing
+
+    # 先结束当前会话的事务，否则MySQL执行DDL时会一直等待该事务持有的元数据锁
+    db.session.commit()
+    with db.engine.begin() as connection:
+        for column in missing:
+            column_type = Model.__table__.c[column].type.compile(dialect=db.engine.dialect)
+            connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column} {column_type} NULL'))
+            print(f"{table_name} 表已增加 {column} 列")
+    for index in indexes:
+        index.create(db.engine)
+        print(f"{table_name} 表已建立索引 {index.name} ({', '.join(index.columns.keys())})")
+    return missing
+
+
+def backfill_typed_columns(db, Model, table_name, batch_size=BACKFILL_BATCH_SIZE, dry_run=False):
+    """
+    分批解析原字段并写入影子列值有变化的记录
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类
+        table_name (str): 表名（TYPED_COLUMNS 的键）
+        batch_size (int): 每批读取和提交的记录数
+        dry_run (bool): 为True时只统计需要回填的记录
+
+    Returns:
+        int: 回填（或将要回填）的记录数
+    """
+    from services.typed_columns import TYPED_COLUMNS, typed_values
+
+    table = Model.__table__
+    typed_columns = list(TYPED_COLUMNS[table_name])
+    source_columns = [source_column for source_column, _ in TYPED_COLUMNS[table_name].values()]
+    statement = update(table).where(table.c.id == bindparam('b_id')).values(
+        **{column: bindparam(f'b_{column}') for column in typed_columns}
+    )
+
+    last_id = 0
+    filled = 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, *[table.c[column] for column in source_columns + typed_columns])
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        params = []
+        for row in rows:
+            source = dict(zip(source_columns, row[1:1 + len(source_columns)]))
+            current = dict(zip(typed_columns, row[1 + len(source_columns):]))
+            values = typed_values(table_name, source)
+            if values != current:
+                params.append({'b_id': row[0], **{f'b_{column}': value for column, value in values.items()}})
+        if not params:
+            continue
+        filled += len(params)
+        if dry_run:
+            continue
+        db.session.execute(statement, params)
+        db.session.commit()
+        print(f"  {table_name}: 已回填 {filled} 条")
+    return filled
+
+
+def migrate_typed_columns(batch_size=BACKFILL_BATCH_SIZE, dry_run=False):
+    """增加影子列和索引并回填已有记录"""
+    from lcoa.app import app, db, Lcoa, SysNodeal, SysXiangxi, SysClub, SysProjectMilestone
+
+    with app.app_context():
+        for Model in (Lcoa, SysNodeal, SysXiangxi, SysClub, SysProjectMilestone):
+            table_name = Model.__tablename__
+            try:
+                missing = add_typed_columns(db, Model, table_name, dry_run)
+                if dry_run:
+                    if missing:
+                        count = db.session.execute(select(func.count()).select_from(Model.__table__)).scalar()
+                    else:
+                        count = backfill_typed_columns(db, Model, table_name, batch_size, dry_run=True)
+                    print(f"{table_name} 表将回填 {count} 条记录")
+                    continue
+
+                filled = backfill_typed_columns(db, Model, table_name, batch_size)
+                print(f"{table_name} 表回填完成，共 {filled} 条记录")
+            except Exception as e:
+                db.session.rollback()
+                print(f"迁移 {table_name} 表时出错: {e}")
+                raise
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='为导入表和项目里程碑表增加类型化影子列并回填已有记录')
+    parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='每批回填并提交的记录数')
+    parser.add_argument('--dry-run', action='store_true', help='只统计需要回填的记录，不修改数据库')
+    args = parser.parse_args()
+    migrate_typed_columns(args.batch_size, args.dry_run)
@@ -0,0 +1,105 @@
+"""
+导入键唯一索引迁移脚本
+为 lcoa 表的 (process_id, process_node_id) 和 sys_nodeal 表的 (process_node_id, process_id) 建立联合唯一索引，
+导入时依赖它按键批量写入（INSERT ... ON DUPLICATE KEY UPDATE）
+
+旧版本的导入在同一批数据中出现重复键时会插入多条记录，建立索引前先去重：
+同一个键只保留id最大的一条（旧版本更新已有记录时命中的也是id最大的一条），键为NULL的记录不处理
+
+用法:
+    python lcoa/migrate_upsert_keys.py [--dry-run]
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy import Index, delete, func, select, tuple_
+
+# 添加项目根目录和lcoa目录到Python路径（app.py 按 from models import ... 导入）
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (project_root, os.path.join(project_root, 'lcoa')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# 每次删除重复记录时处理的键个数
+DELETE_CHUNK_SIZE = 1000
+
+
+def remove_duplicate_keys(db, Model, key_columns, dry_run=False):
+    """
+    删除重复键的记录，每个键只保留id最大的一条
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类
+        key_columns (list): 键字段名
+        dry_run (bool): 为True时只统计不删除
+
+    Returns:
+        tuple: (重复的键个数, 删除（或将要删除）的记录数)
+    """
+    table = Model.__table__
+    columns = [table.c[column] for column in key_columns]
+    duplicates = db.session.execute(
+        select(*columns, func.max(table.c.id), func.count())
+        .where(*[column.isnot(None) for column in columns])
+        .group_by(*columns)
+        .having(func.count() > 1)
+    ).all()
+
+    removed = sum(row[-1] - 1 for row in duplicates)
+    if dry_run or not duplicates:
+        return len(duplicates), removed
+
+    for start in range(0, len(duplicates), DELETE_CHUNK_SIZE):
+        chunk = duplicates[start:start + DELETE_CHUNK_SIZE]
+        db.session.execute(
+            delete(table)
+            .where(tuple_(*columns).in_([tuple(row[:len(columns)]) for row in chunk]))
+            .where(table.c.id.notin_([row[len(columns)] for row in chunk]))
+        )
+        db.session.commit()
+    return len(duplicates), removed
+
+
+def migrate_upsert_keys(dry_run=False):
+    """去重并建立 lcoa、sys_nodeal 表的联合唯一索引"""
+    from lcoa.app import app, db, Lcoa, SysNodeal
+    from services.data_service import unique_key_exists
+
+    with app.app_context():
+        for Model in (Lcoa, SysNodeal):
+            table_name = Model.__tablename__
+            constraint = next(
+                constraint for constraint in Model.__table__.constraints
+                if constraint.name and constraint.name.startswith('uq_')
+            )
+            key_columns = [column.name for column in constraint.columns]
+
+            if unique_key_exists(db, table_name, key_columns):
+                print(f"{table_name} 表已有 ({', '.join(key_columns)}) 唯一索引，跳过")
+                continue
+
+            try:
+                duplicate_keys, removed = remove_duplicate_keys(db, Model, key_columns, dry_run)
+                action = '将删除' if dry_run else '已删除'
+                print(f"{table_name} 表有 {duplicate_keys} 个重复的键，{action} {removed} 条重复记录")
+                if dry_run:
+                    continue
+
+                # 先结束查询重复键的事务，否则MySQL建索引时会一直等待该事务持有的元数据锁
+                db.session.commit()
+                Index(constraint.name, *[Model.__table__.c[column] for column in key_columns], unique=True) \
+                    .create(db.engine)
+                print(f"{table_name} 表已建立唯一索引 {constraint.name} ({', '.join(key_columns)})")
+            except Exception as e:
+                db.session.rollback()
+                print(f"迁移 {table_name} 表时出错: {e}")
+                raise
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='为 lcoa、sys_nodeal 表建立导入键的联合唯一索引')
+    parser.add_argument('--dry-run', action='store_true', help='只统计重复记录，不删除也不建立索引')
+    args = parser.parse_args()
+    migrate_upsert_keys(args.dry_run)
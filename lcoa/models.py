@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import event
 from werkzeug.security import generate_password_hash, check_password_hash
 
 # 在这里我们初始化db
@@ -43,6 +44,10 @@ class User(db.Model):
 # 定义Lcoa模型（第一个表）
 class Lcoa(db.Model):
     __tablename__ = 'lcoa'
+    __table_args__ = (
+        # 导入按该键写入（INSERT ... ON DUPLICATE KEY UPDATE），已有数据库见 migrate_upsert_keys.py
+        db.UniqueConstraint('process_id', 'process_node_id', name='uq_lcoa_process_key'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     # 根据第一个表中读取的列名称定义字段
@@ -61,6 +66,13 @@ class Lcoa(db.Model):
     last_process_time = db.Column(db.String(50), nullable=True)  # 最后处理时间
     total_duration = db.Column(db.String(50), nullable=True)  # 总计耗时
     total_timeout = db.Column(db.String(50), nullable=True)  # 总计超时
+    row_hash = db.Column(db.String(32), nullable=True)  # 内容哈希，导入时内容未变化的行不再写入（已有数据库见 migrate_row_hash.py）
+    # 类型化影子列：导入时由上面的字符串字段计算（见 services/typed_columns.py，已有数据库见 migrate_typed_columns.py）
+    extracted_on = db.Column(db.Date, nullable=True)  # 提取日期
+    first_receive_at = db.Column(db.DateTime, nullable=True)  # 最初接收时间
+    last_process_at = db.Column(db.DateTime, nullable=True)  # 最后处理时间
+    total_duration_seconds = db.Column(db.Integer, nullable=True)  # 总计耗时（秒）
+    total_timeout_seconds = db.Column(db.Integer, nullable=True)  # 总计超时（秒）
 
     def __repr__(self):
         return f'<Lcoa {self.id}>'
@@ -68,6 +80,10 @@ class Lcoa(db.Model):
 # 定义SysNodeal模型（第二个表）
 class SysNodeal(db.Model):
     __tablename__ = 'sys_nodeal'
+    __table_args__ = (
+        # 导入按该键写入（INSERT ... ON DUPLICATE KEY UPDATE），已有数据库见 migrate_upsert_keys.py
+        db.UniqueConstraint('process_node_id', 'process_id', name='uq_sys_nodeal_process_key'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     # 根据第二个表中读取的列名称定义字段
@@ -86,10 +102,95 @@ class SysNodeal(db.Model):
     last_process_time = db.Column(db.String(50), nullable=True)  # 最后处理时间
     total_duration = db.Column(db.String(50), nullable=True)  # 总计耗时
     total_timeout = db.Column(db.String(50), nullable=True)  # 总计超时
+    row_hash = db.Column(db.String(32), nullable=True)  # 内容哈希，导入时内容未变化的行不再写入（已有数据库见 migrate_row_hash.py）
+    # 类型化影子列：导入时由上面的字符串字段计算（见 services/typed_columns.py，已有数据库见 migrate_typed_columns.py）
+    extracted_on = db.Column(db.Date, nullable=True)  # 提取日期
+    first_receive_at = db.Column(db.DateTime, nullable=True)  # 最初接收时间
+    last_process_at = db.Column(db.DateTime, nullable=True)  # 最后处理时间
+    total_duration_seconds = db.Column(db.Integer, nullable=True)  # 总计耗时（秒）
+    total_timeout_seconds = db.Column(db.Integer, nullable=True)  # 总计超时（秒）
 
     def __repr__(self):
         return f'<SysNodeal {self.id}>'
 
+# 定义LcoaArchive模型（lcoa 表的归档表，存放超过保留期限的记录，见 archive_aged_rows.py）
+class LcoaArchive(db.Model):
+    __tablename__ = 'lcoa_archive'
+    __table_args__ = (
+        # 同一个键再次归档时替换之前归档的记录
+        db.UniqueConstraint('process_id', 'process_node_id', name='uq_lcoa_archive_process_key'),
+    )
+    
+    # 归档表自己的主键（原表的id可能被数据库重新分配，不作为主键）
+    archive_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # 原表中的记录id
+    id = db.Column(db.Integer, nullable=False, index=True)
+    extracted_date = db.Column(db.String(20), nullable=True)  # 从文件名提取的日期
+    process_node_id = db.Column(db.String(100), nullable=True)  # 流程节点id
+    process_id = db.Column(db.String(100), nullable=True)  # 流程id
+    process_title = db.Column(db.String(200), nullable=True)  # 流程标题
+    process_name = db.Column(db.String(200), nullable=True)  # 流程名称
+    process_type = db.Column(db.String(100), nullable=True)  # 流程类型
+    branch = db.Column(db.String(100), nullable=True)  # 所属分部
+    department = db.Column(db.String(100), nullable=True)  # 所属部门
+    node_operator = db.Column(db.String(100), nullable=True)  # 节点操作者
+    node_operation_type = db.Column(db.String(100), nullable=True)  # 节点操作类型
+    node_name = db.Column(db.String(100), nullable=True)  # 节点名称
+    first_receive_time = db.Column(db.String(50), nullable=True)  # 最初接收时间
+    last_process_time = db.Column(db.String(50), nullable=True)  # 最后处理时间
+    total_duration = db.Column(db.String(50), nullable=True)  # 总计耗时
+    total_timeout = db.Column(db.String(50), nullable=True)  # 总计超时
+    row_hash = db.Column(db.String(32), nullable=True)  # 内容哈希
+    extracted_on = db.Column(db.Date, nullable=True)  # 提取日期
+    first_receive_at = db.Column(db.DateTime, nullable=True)  # 最初接收时间
+    last_process_at = db.Column(db.DateTime, nullable=True)  # 最后处理时间
+    total_duration_seconds = db.Column(db.Integer, nullable=True)  # 总计耗时（秒）
+    total_timeout_seconds = db.Column(db.Integer, nullable=True)  # 总计超时（秒）
+    # 归档时间
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<LcoaArchive {self.id}>'
+
+# 定义SysNodealArchive模型（sys_nodeal 表的归档表，存放超过保留期限的记录，见 archive_aged_rows.py）
+class SysNodealArchive(db.Model):
+    __tablename__ = 'sys_nodeal_archive'
+    __table_args__ = (
+        # 同一个键再次归档时替换之前归档的记录
+        db.UniqueConstraint('process_node_id', 'process_id', name='uq_sys_nodeal_archive_process_key'),
+    )
+    
+    # 归档表自己的主键（原表的id可能被数据库重新分配，不作为主键）
+    archive_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # 原表中的记录id
+    id = db.Column(db.Integer, nullable=False, index=True)
+    extracted_date = db.Column(db.String(20), nullable=True)  # 从文件名提取的日期
+    process_node_id = db.Column(db.String(100), nullable=True)  # 流程节点id
+    process_id = db.Column(db.String(100), nullable=True)  # 流程id
+    process_title = db.Column(db.String(200), nullable=True)  # 流程标题
+    process_name = db.Column(db.String(200), nullable=True)  # 流程名称
+    process_type = db.Column(db.String(100), nullable=True)  # 流程类型
+    branch = db.Column(db.String(100), nullable=True)  # 所属分部
+    department = db.Column(db.String(100), nullable=True)  # 所属部门
+    node_operator = db.Column(db.String(100), nullable=True)  # 节点操作者
+    node_operation_type = db.Column(db.String(100), nullable=True)  # 节点操作类型
+    node_name = db.Column(db.String(100), nullable=True)  # 节点名称
+    first_receive_time = db.Column(db.String(50), nullable=True)  # 最初接收时间
+    last_process_time = db.Column(db.String(50), nullable=True)  # 最后处理时间
+    total_duration = db.Column(db.String(50), nullable=True)  # 总计耗时
+    total_timeout = db.Column(db.String(50), nullable=True)  # 总计超时
+    row_hash = db.Column(db.String(32), nullable=True)  # 内容哈希
+    extracted_on = db.Column(db.Date, nullable=True)  # 提取日期
+    first_receive_at = db.Column(db.DateTime, nullable=True)  # 最初接收时间
+    last_process_at = db.Column(db.DateTime, nullable=True)  # 最后处理时间
+    total_duration_seconds = db.Column(db.Integer, nullable=True)  # 总计耗时（秒）
+    total_timeout_seconds = db.Column(db.Integer, nullable=True)  # 总计超时（秒）
+    # 归档时间
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SysNodealArchive {self.id}>'
+
 # 定义SysDeal模型（第二个表的另一种形式）
 class SysDeal(db.Model):
     __tablename__ = 'sys_deal'
@@ -130,7 +231,8 @@ class SysPersonal(db.Model):
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     # 根据第三个表中读取的列名称定义字段
-    extracted_date = db.Column(db.String(20), nullable=True)  # 从文件名提取的日期
+    # 按日期查询快照时使用该索引，已有数据库见 migrate_snapshot_tables.py
+    extracted_date = db.Column(db.String(20), nullable=True, index=True)  # 从文件名提取的日期
     name = db.Column(db.String(100), nullable=True)  # 姓名
     department = db.Column(db.String(100), nullable=True)  # 所属部门
     quantity = db.Column(db.String(50), nullable=True)  # 数量
@@ -141,14 +243,23 @@ class SysPersonal(db.Model):
 # 定义SysXiangxi模型（第四个表）
 class SysXiangxi(db.Model):
     __tablename__ = 'sys_xiangxi'
+    __table_args__ = (
+        # 导入时按键查询已有记录（键不唯一，不建唯一索引），已有数据库见 migrate_indexes.py
+        db.Index('ix_sys_xiangxi_key', 'node_operator', 'department'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     # 根据第四个表中读取的列名称定义字段
-    extracted_date = db.Column(db.String(20), nullable=True)  # 从文件名提取的日期
+    # 按日期查询和替换快照时使用该索引，已有数据库见 migrate_snapshot_tables.py
+    extracted_date = db.Column(db.String(20), nullable=True, index=True)  # 从文件名提取的日期
     node_operator = db.Column(db.String(100), nullable=True)  # 节点操作者
     department = db.Column(db.String(100), nullable=True)  # 所属部门
     node_operation_type = db.Column(db.String(100), nullable=True)  # 节点操作类型
     quantity = db.Column(db.String(50), nullable=True)  # 数量
+    row_hash = db.Column(db.String(32), nullable=True)  # 内容哈希，导入时内容未变化的行不再写入（已有数据库见 migrate_row_hash.py）
+    # 类型化影子列：导入时由上面的字符串字段计算（见 services/typed_columns.py，已有数据库见 migrate_typed_columns.py）
+    extracted_on = db.Column(db.Date, nullable=True, index=True)  # 提取日期
+    quantity_num = db.Column(db.Integer, nullable=True)  # 数量
 
     def __repr__(self):
         return f'<SysXiangxi {self.id}>'
@@ -156,13 +267,23 @@ class SysXiangxi(db.Model):
 # 定义SysClub模型（第五个表）
 class SysClub(db.Model):
     __tablename__ = 'sys_club'
+    __table_args__ = (
+        # 导入时按键查询已有记录（键不唯一，不建唯一索引），已有数据库见 migrate_indexes.py
+        db.Index('ix_sys_club_key', 'department', 'personnel_count'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     # 根据第五个表中读取的列名称定义字段
-    extracted_date = db.Column(db.String(20), nullable=True)  # 从文件名提取的日期
+    # 按日期查询和替换快照时使用该索引，已有数据库见 migrate_snapshot_tables.py
+    extracted_date = db.Column(db.String(20), nullable=True, index=True)  # 从文件名提取的日期
     department = db.Column(db.String(100), nullable=True)  # 部门（第一列）
     personnel_count = db.Column(db.String(50), nullable=True)  # 人员数量（第二列）
     timeout_count = db.Column(db.String(50), nullable=True)  # 超时记录总数（第三列）
+    row_hash = db.Column(db.String(32), nullable=True)  # 内容哈希，导入时内容未变化的行不再写入（已有数据库见 migrate_row_hash.py）
+    # 类型化影子列：导入时由上面的字符串字段计算（见 services/typed_columns.py，已有数据库见 migrate_typed_columns.py）
+    extracted_on = db.Column(db.Date, nullable=True, index=True)  # 提取日期
+    personnel_count_num = db.Column(db.Integer, nullable=True)  # 人员数量
+    timeout_count_num = db.Column(db.Integer, nullable=True)  # 超时记录总数
 
     def __repr__(self):
         return f'<SysClub {self.id}>'
@@ -197,8 +318,8 @@ class SysProjectMilestone(db.Model):
     __tablename__ = 'sys_project_milestone'
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    # 外键关联到项目主表
-    project_id = db.Column(db.Integer, db.ForeignKey('sys_project.id'), nullable=False)
+    # 外键关联到项目主表（加载项目的里程碑时按该列查询，已有数据库见 migrate_indexes.py）
+    project_id = db.Column(db.Integer, db.ForeignKey('sys_project.id'), nullable=False, index=True)
     # 关键节点
     milestone = db.Column(db.String(200), nullable=False)
     # 负责部门
@@ -219,6 +340,11 @@ class SysProjectMilestone(db.Model):
     response_measures = db.Column(db.Text, nullable=True)
     # 修改日志
     modification_log = db.Column(db.Text, nullable=True)
+    # 类型化影子列：写入时由上面的字符串字段计算（见文件末尾的事件监听，已有数据库见 migrate_typed_columns.py）
+    planned_start_on = db.Column(db.Date, nullable=True)  # 计划开始日期
+    planned_end_on = db.Column(db.Date, nullable=True)  # 计划结束日期
+    actual_completion_on = db.Column(db.Date, nullable=True)  # 实际完成日期
+    impact_cycle_days = db.Column(db.Integer, nullable=True)  # 影响周期（天）
     # 创建和更新时间戳
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -231,10 +357,10 @@ class SysProjectMilestoneImpactHistory(db.Model):
     __tablename__ = 'sys_project_milestone_impact_history'
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    # 外键关联到项目里程碑表
-    milestone_id = db.Column(db.Integer, db.ForeignKey('sys_project_milestone.id'), nullable=False)
+    # 外键关联到项目里程碑表（加载和级联删除里程碑的历史时按该列查询，已有数据库见 migrate_indexes.py）
+    milestone_id = db.Column(db.Integer, db.ForeignKey('sys_project_milestone.id'), nullable=False, index=True)
     # 项目ID（冗余字段，方便查询）
-    project_id = db.Column(db.Integer, db.ForeignKey('sys_project.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('sys_project.id'), nullable=False, index=True)
     # 修改前的影响周期
     old_impact_cycle = db.Column(db.Integer, nullable=False, default=0)
     # 修改后的影响周期
@@ -255,6 +381,10 @@ class SysProjectMilestoneImpactHistory(db.Model):
 # 定义ModificationLog模型（修改日志表）
 class ModificationLog(db.Model):
     __tablename__ = 'modification_log'
+    __table_args__ = (
+        # 按表名和记录ID查询修改日志并按操作时间倒序，已有数据库见 migrate_indexes.py
+        db.Index('ix_modification_log_record', 'table_name', 'record_id', 'operation_time'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     # 表名
@@ -276,3 +406,60 @@ class ModificationLog(db.Model):
     
     def __repr__(self):
         return f'<ModificationLog {self.table_name}:{self.record_id}:{self.operation_type}>'
+
+
+# 定义IngestManifest模型（导入清单表，记录已导入的导出文件）
+class IngestManifest(db.Model):
+    __tablename__ = 'ingest_manifest'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # 文件名
+    filename = db.Column(db.String(255), unique=True, nullable=False)
+    # 文件大小（字节）
+    file_size = db.Column(db.BigInteger, nullable=False)
+    # 文件修改时间（时间戳）
+    file_mtime = db.Column(db.Float, nullable=False)
+    # 文件内容哈希（SHA-256）
+    content_hash = db.Column(db.String(64), nullable=False)
+    # 导入时间
+    ingested_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<IngestManifest {self.filename}>'
+
+
+# 定义IngestCheckpoint模型（导入检查点表，记录每个文件、工作表、目标表已提交的数据块）
+class IngestCheckpoint(db.Model):
+    __tablename__ = 'ingest_checkpoint'
+    __table_args__ = (
+        db.UniqueConstraint('filename', 'sheet_index', 'table_name', name='uq_ingest_checkpoint'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # 文件名
+    filename = db.Column(db.String(255), nullable=False)
+    # 文件内容哈希（文件内容变化后检查点失效）
+    content_hash = db.Column(db.String(64), nullable=False)
+    # 工作表索引
+    sheet_index = db.Column(db.Integer, nullable=False)
+    # 目标表名
+    table_name = db.Column(db.String(50), nullable=False)
+    # 分块行数（分块大小变化后检查点失效）
+    chunk_size = db.Column(db.Integer, nullable=False)
+    # 已提交的数据块个数
+    chunks_done = db.Column(db.Integer, nullable=False, default=0)
+    # 已提交的行数
+    rows_done = db.Column(db.Integer, nullable=False, default=0)
+    # 更新时间
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<IngestCheckpoint {self.filename}:{self.table_name}:{self.chunks_done}>'
+
+
+# 项目里程碑通过ORM在多处新增和修改，统一在写入前按字符串字段设置类型化影子列
+@event.listens_for(SysProjectMilestone, 'before_insert')
+@event.listens_for(SysProjectMilestone, 'before_update')
+def fill_milestone_typed_columns(mapper, connection, target):
+    from services.typed_columns import fill_typed_attributes
+    fill_typed_attributes('sys_project_milestone', target)
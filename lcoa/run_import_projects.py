@@ -50,4 +50,6 @@ def import_projects_from_excel_cli():
         traceback.print_exc()
 
 if __name__ == "__main__":
+    # 以项目导入进程的连接池配置运行（见 services/db_pool.py）
+    os.environ.setdefault('LCOA_PROCESS_ROLE', 'import')
     import_projects_from_excel_cli()
\ No newline at end of file
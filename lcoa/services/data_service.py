@@ -2,409 +2,898 @@
 数据服务模块
 提供各种数据保存和处理功能
 """
-from sqlalchemy import func
+import hashlib
+import logging
+import os
+import time
 
-def save_to_lcoa_table(db, Lcoa, data):
+from sqlalchemy import UniqueConstraint, and_, bindparam, delete, insert, select, tuple_, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from services.typed_columns import TYPED_COLUMNS, typed_values
+
+# 与 lcoa.datedeal.ingest_logging 的记录器同属 "lcoa"，级别和输出方式由其统一配置
+logger = logging.getLogger('lcoa.data_service')
+
+# 导入数据行各位置对应的字段（第一列是提取日期），以及 save_*_with_comparison 判断同一条记录的键
+# 注意 lcoa 表和 sys_nodeal 表的第二、三列对应的字段相反，与各自的保存函数保持一致
+_PROCESS_CONTENT_COLUMNS = [
+    'process_title', 'process_name', 'process_type', 'branch', 'department', 'node_operator',
+    'node_operation_type', 'node_name', 'first_receive_time', 'last_process_time', 'total_duration', 'total_timeout'
+]
+TABLE_ROW_COLUMNS = {
+    'lcoa': {
+        'columns': ['extracted_date', 'process_id', 'process_node_id'] + _PROCESS_CONTENT_COLUMNS,
+        'key': ['process_id', 'process_node_id'],
+    },
+    'sys_nodeal': {
+        'columns': ['extracted_date', 'process_node_id', 'process_id'] + _PROCESS_CONTENT_COLUMNS,
+        'key': ['process_node_id', 'process_id'],
+    },
+    'sys_xiangxi': {
+        'columns': ['extracted_date', 'node_operator', 'department', 'node_operation_type', 'quantity'],
+        'key': ['node_operator', 'department'],
+    },
+    'sys_club': {
+        'columns': ['extracted_date', 'department', 'personnel_count', 'timeout_count'],
+        'key': ['department', 'personnel_count'],
+    },
+}
+
+# 按键写入时每条 executemany 语句的行数
+UPSERT_BATCH_SIZE = int(os.environ.get('LCOA_UPSERT_BATCH_SIZE', '1000'))
+# 查询已存在的键时每个 IN 列表中的键个数
+KEY_LOOKUP_CHUNK_SIZE = 1000
+# 支持按键批量写入（INSERT ... ON DUPLICATE KEY UPDATE / ON CONFLICT DO UPDATE）的数据库
+UPSERT_DIALECTS = ('mysql', 'sqlite')
+
+# 分块提交：每个事务写入的行数，每块单独提交，出错时只回滚当前块
+COMMIT_CHUNK_SIZE = int(os.environ.get('LCOA_COMMIT_CHUNK_SIZE', '5000'))
+# 数据块遇到临时错误时的最大重试次数，以及第一次重试前等待的秒数（之后每次加倍）
+CHUNK_RETRY_LIMIT = int(os.environ.get('LCOA_CHUNK_RETRIES', '3'))
+CHUNK_RETRY_BACKOFF = float(os.environ.get('LCOA_CHUNK_RETRY_BACKOFF', '0.5'))
+# 重试后可能成功的MySQL错误码：锁等待超时、死锁、连接已断开、查询过程中连接丢失
+TRANSIENT_ERROR_CODES = {1205, 1213, 2006, 2013}
+
+
+def row_to_values(table_name, row):
     """
-    保存数据到lcoa表，使用更高效的批量处理方式
-    
+    把导入数据行转换为与 TABLE_ROW_COLUMNS 字段一一对应的值（缺少的列为空字符串）
+
+    Args:
+        table_name (str): 目标表名
+        row (list): 导入数据行
+
+    Returns:
+        tuple: 各字段的值
+    """
+    width = len(TABLE_ROW_COLUMNS[table_name]['columns'])
+    return tuple(row[i] if len(row) > i else '' for i in range(width))
+
+
+def content_hash(values):
+    """
+    计算一行数据的内容哈希（row_hash 列），导入时与数据库中的哈希相同的行不再写入
+
+    Args:
+        values (tuple): 与 TABLE_ROW_COLUMNS 的字段一一对应的值（数据库中读出的值或 row_to_values 的结果）
+
+    Returns:
+        str: 32位十六进制字符串
+    """
+    # 各字段按字符串比较（数据库中的字段都是字符串），NULL 与空字符串区分开
+    text = '\x1f'.join('\x00' if value is None else str(value) for value in values)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def row_params(table_name, values, row_hash=None):
+    """
+    把字段值转换为写入参数：原字段、内容哈希，以及由原字段计算的类型化影子列（见 services/typed_columns.py）
+
+    Args:
+        table_name (str): 目标表名（TABLE_ROW_COLUMNS 的键）
+        values (tuple): 与 TABLE_ROW_COLUMNS 的字段一一对应的值
+        row_hash (str): 已经算好的内容哈希，默认按 values 计算
+
+    Returns:
+        dict: 字段名 -> 值
+    """
+    params = dict(zip(TABLE_ROW_COLUMNS[table_name]['columns'], values))
+    params['row_hash'] = row_hash or content_hash(values)
+    params.update(typed_values(table_name, params))
+    return params
+
+
+def written_columns(table_name):
+    """按键更新已有记录时需要写入的字段：除键以外的原字段、内容哈希和类型化影子列"""
+    spec = TABLE_ROW_COLUMNS[table_name]
+    return [column for column in spec['columns'] if column not in spec['key']] \
+        + ['row_hash'] + list(TYPED_COLUMNS.get(table_name, {}))
+
+
+def compute_changeset(db, Model, table_name, data, sample_size=5, max_id=None):
+    """
+    计算 save_* 写入 data 时会新增、更新或保持不变的行数，不修改数据库
+
+    只按本批数据涉及的键查询已有记录的内容哈希（不读取整张表和内容字段），计数规则与保存函数一致：
+    - 键列上有联合唯一索引的表（lcoa、sys_nodeal，见 save_with_upsert）：同一个键只计最后一行，
+      键不存在的计为新增，哈希不同的计为更新（提取日期早于已有记录的计为过期），相同的计为未变化
+    - 其他表（sys_xiangxi、sys_club，见 save_with_comparison）：键已存在的只计最后一行，键不存在的每一行都计为新增
+    更新的示例差异只为前 sample_size 个更新的键查询原字段
+
     Args:
         db: SQLAlchemy数据库实例
-        Lcoa: Lcoa模型类
+        Model: 模型类
+        table_name (str): 目标表名（TABLE_ROW_COLUMNS 的键）
         data (list): 要保存的数据列表
+        sample_size (int): 新增和更新各保留的示例条数
+        max_id (int): 只与id不大于该值的记录比较（见 save_with_comparison），默认与所有记录比较
+
+    Returns:
+        dict: {'table', 'rows', 'inserted', 'updated', 'unchanged', 'outdated',
+               'sample_inserts': [字段->值], 'sample_updates': [{'key', 'changes': 字段->[旧值, 新值]}]}
     """
-    try:
-        # 先获取所有现有的记录，构建一个字典用于快速查找
-        existing_records = {}
-        for record in Lcoa.query.all():
-            key = (record.process_id, record.process_node_id)
-            existing_records[key] = record
+    spec = TABLE_ROW_COLUMNS[table_name]
+    columns = spec['columns']
+    key_positions = [columns.index(column) for column in spec['key']]
 
-        print(f"数据库中已存在 {len(existing_records)} 条记录")
+    keep_newer = has_unique_key(Model, spec['key'])
+    if keep_newer:
+        items = list(_values_by_key(table_name, data).items())
+        existing = find_existing_values(db, Model, spec['key'], [key for key, _ in items],
+                                        ['row_hash', 'extracted_date'])
+    else:
+        keyed = []
+        for row in data:
+            values = row_to_values(table_name, row)
+            keyed.append((tuple(values[i] for i in key_positions), values))
+        records = find_existing_records(db, Model, spec['key'], (key for key, _ in keyed), max_id=max_id)
+        existing = {key: (row_hash, extracted_date) for key, (_, row_hash, extracted_date) in records.items()}
+        # 键已存在的行只保留最后一行（与 save_with_comparison 一致）
+        last_index = {key: index for index, (key, _) in enumerate(keyed) if key in existing}
+        items = [(key, values) for index, (key, values) in enumerate(keyed)
+                 if key not in existing or last_index[key] == index]
 
-        records_to_add = []
-        updated_count = 0
+    changeset = {'table': table_name, 'rows': len(data), 'inserted': 0, 'updated': 0, 'unchanged': 0, 'outdated': 0,
+                 'sample_inserts': [], 'sample_updates': []}
+    sample_updates = []
+    for key, values in items:
+        if key not in existing:
+            changeset['inserted'] += 1
+            if len(changeset['sample_inserts']) < sample_size:
+                changeset['sample_inserts'].append(dict(zip(columns, values)))
+        elif existing[key][0] == content_hash(values):
+            changeset['unchanged'] += 1
+        elif keep_newer and is_older(values[0], existing[key][1]):
+            changeset['outdated'] += 1
+        else:
+            changeset['updated'] += 1
+            if len(sample_updates) < sample_size:
+                sample_updates.append((key, values))
 
-        for row in data:
-            # 提取用于判断是否为同一条记录的字段
-            extracted_date = row[0] if len(row) > 0 else ''
-            process_id = row[1] if len(row) > 1 else ''
-            process_node_id = row[2] if len(row) > 2 else ''  # 修正索引，根据实际数据结构
-
-            # 构造查找键
-            key = (process_id, process_node_id)
-
-            if key in existing_records:
-                # 更新现有记录
-                existing_record = existing_records[key]
-                existing_record.extracted_date = extracted_date
-                existing_record.process_title = row[3] if len(row) > 3 else ''
-                existing_record.process_name = row[4] if len(row) > 4 else ''
-                existing_record.process_type = row[5] if len(row) > 5 else ''
-                existing_record.branch = row[6] if len(row) > 6 else ''
-                existing_record.department = row[7] if len(row) > 7 else ''
-                existing_record.node_operator = row[8] if len(row) > 8 else ''
-                existing_record.node_operation_type = row[9] if len(row) > 9 else ''
-                existing_record.node_name = row[10] if len(row) > 10 else ''
-                existing_record.first_receive_time = row[11] if len(row) > 11 else ''
-                existing_record.last_process_time = row[12] if len(row) > 12 else ''
-                existing_record.total_duration = row[13] if len(row) > 13 else ''
-                existing_record.total_timeout = row[14] if len(row) > 14 else ''
-                updated_count += 1
+    if sample_updates:
+        # 只为示例查询原字段（同一个键有多条记录时以id最大的为准）
+        key_columns = [Model.__table__.c[column] for column in spec['key']]
+        query = select(*[Model.__table__.c[column] for column in columns]) \
+            .where(key_in(key_columns, [key for key, _ in sample_updates])).order_by(Model.__table__.c.id)
+        if max_id is not None:
+            query = query.where(Model.__table__.c.id <= max_id)
+        current = {}
+        for db_row in db.session.execute(query):
+            values = tuple(db_row)
+            current[tuple(values[i] for i in key_positions)] = values
+        for key, values in sample_updates:
+            old_values = current.get(key, ('',) * len(columns))
+            changeset['sample_updates'].append({
+                'key': list(key),
+                'changes': {column: [old, new] for column, old, new in zip(columns, old_values, values) if old != new},
+            })
+    return changeset
+
+
+def is_transient_error(error):
+    """
+    判断数据库错误是否是临时的（锁等待超时、死锁、连接断开等），回滚后重试当前数据块可能成功
+
+    Args:
+        error (DBAPIError): SQLAlchemy包装的数据库驱动异常
+
+    Returns:
+        bool: 是否可以重试
+    """
+    if error.connection_invalidated:
+        return True
+    args = getattr(error.orig, 'args', None)
+    if args and args[0] in TRANSIENT_ERROR_CODES:
+        return True
+    # SQLite（测试和基准使用）在其他连接持有写锁时报 database is locked
+    return 'database is locked' in str(error.orig)
+
+
+def write_in_chunks(db, table_name, items, write_chunk, chunk_size=None):
+    """
+    分块写入：每 chunk_size 条调用一次 write_chunk 并提交一个事务，避免一次导入产生一个很大的事务长时间锁住记录；
+    数据块遇到临时错误时回滚并在等待后重试该块，其他错误或重试次数用尽时抛出异常（之前的数据块已经提交）
+
+    Args:
+        db: SQLAlchemy数据库实例
+        table_name (str): 目标表名（用于日志）
+        items (list): 要写入的数据
+        write_chunk (callable): write_chunk(块) 写入一块数据（不提交），
+            返回 {'inserted', 'updated', 'preload_seconds', 'write_seconds'}（可以有 'unchanged'、'outdated'）；
+            重试时会用同一块数据再次调用
+        chunk_size (int): 每块的条数，默认 LCOA_COMMIT_CHUNK_SIZE，0 表示不分块
+
+    Returns:
+        dict: 各块结果的合计（write_seconds 包含提交耗时），以及 'chunks': 提交的块数, 'retries': 重试次数
+    """
+    chunk_size = chunk_size if chunk_size is not None else COMMIT_CHUNK_SIZE
+    chunk_size = chunk_size if chunk_size > 0 else max(len(items), 1)
+    chunk_count = (len(items) + chunk_size - 1) // chunk_size
+    result = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'outdated': 0, 'preload_seconds': 0.0,
+              'write_seconds': 0.0, 'chunks': 0, 'retries': 0}
+
+    for index, start in enumerate(range(0, len(items), chunk_size), 1):
+        chunk = items[start:start + chunk_size]
+        attempt = 0
+        while True:
+            try:
+                chunk_result = write_chunk(chunk)
+                commit_start = time.perf_counter()
+                db.session.commit()
+                chunk_result['write_seconds'] += time.perf_counter() - commit_start
+                break
+            except DBAPIError as e:
+                db.session.rollback()
+                if attempt >= CHUNK_RETRY_LIMIT or not is_transient_error(e):
+                    logger.error("写入%s表第 %d/%d 块时出错（已提交 %d 块）: %s",
+                                 table_name, index, chunk_count, result['chunks'], e)
+                    raise
+                delay = CHUNK_RETRY_BACKOFF * 2 ** attempt
+                attempt += 1
+                result['retries'] += 1
+                logger.warning("写入%s表第 %d/%d 块时遇到临时错误，%.1f 秒后第 %d 次重试: %s",
+                               table_name, index, chunk_count, delay, attempt, e)
+                time.sleep(delay)
+
+        for key in ('inserted', 'updated', 'unchanged', 'outdated', 'preload_seconds', 'write_seconds'):
+            result[key] += chunk_result.get(key, 0)
+        result['chunks'] += 1
+    return result
+
+
+def _values_by_key(table_name, data):
+    """
+    把数据行转换为字段值并按键去重（同一个键保留最后一行，与逐行更新的结果一致）
+
+    Returns:
+        dict: 键 -> 字段值（与 TABLE_ROW_COLUMNS 的字段一一对应），按键第一次出现的顺序
+    """
+    spec = TABLE_ROW_COLUMNS[table_name]
+    key_positions = [spec['columns'].index(column) for column in spec['key']]
+    latest = {}
+    for row in data:
+        values = row_to_values(table_name, row)
+        latest[tuple(values[i] for i in key_positions)] = values
+    return latest
+
+
+def has_unique_key(Model, key_columns):
+    """模型中是否为这些键列定义了联合唯一约束（lcoa、sys_nodeal 表有，按键批量写入；sys_xiangxi、sys_club 表没有）"""
+    return any(isinstance(constraint, UniqueConstraint) and set(constraint.columns.keys()) == set(key_columns)
+               for constraint in Model.__table__.constraints)
+
+
+def key_in(columns, keys):
+    """
+    键在 keys 中的查询条件：(键列, ...) IN ((...), ...)，另加第一个键列的 IN 条件
+    （MySQL 按行值 IN 就能走键列上的联合索引，SQLite 只有第一个键列上的 IN 条件才会走索引，否则扫描整个索引）
+
+    Args:
+        columns (list): 键列（Column）
+        keys (list): 键（与 columns 一一对应的元组）
+    """
+    return and_(columns[0].in_(list(dict.fromkeys(key[0] for key in keys))), tuple_(*columns).in_(keys))
+
+
+def find_existing_values(db, Model, key_columns, keys, value_columns, chunk_size=KEY_LOOKUP_CHUNK_SIZE):
+    """
+    查询 keys 中哪些已经存在于表中，以及它们的 value_columns 字段（分批 IN 查询，走键列的联合唯一索引，不读取整张表）
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类
+        key_columns (list): 键字段名
+        keys (iterable): 要查询的键（与 key_columns 一一对应的元组）
+        value_columns (list): 要读取的字段名
+        chunk_size (int): 每个 IN 列表中的键个数
+
+    Returns:
+        dict: 已存在的键 -> value_columns 的值（元组）
+    """
+    columns = [getattr(Model, column) for column in key_columns]
+    values = [getattr(Model, column) for column in value_columns]
+    keys = list(keys)
+    existing = {}
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        query = select(*columns, *values).where(key_in(columns, chunk))
+        existing.update((tuple(row[:len(columns)]), tuple(row[len(columns):])) for row in db.session.execute(query))
+    return existing
+
+
+def find_existing_hashes(db, Model, key_columns, keys, chunk_size=KEY_LOOKUP_CHUNK_SIZE):
+    """
+    查询 keys 中哪些已经存在于表中，以及它们的内容哈希（见 find_existing_values）
+
+    Returns:
+        dict: 已存在的键 -> row_hash（尚未回填哈希的记录为None）
+    """
+    existing = find_existing_values(db, Model, key_columns, keys, ['row_hash'], chunk_size)
+    return {key: values[0] for key, values in existing.items()}
+
+
+def is_older(extracted_date, existing_date):
+    """
+    新数据行的提取日期是否早于已有记录（两者都有日期时按字符串比较，与去重时比较提取日期的方式一致）
+
+    重新导入较早的导出文件时，这些行不能覆盖之后的导出文件写入的较新记录
+    """
+    return bool(extracted_date) and bool(existing_date) and str(extracted_date) < str(existing_date)
+
+
+def find_existing_records(db, Model, key_columns, keys, chunk_size=KEY_LOOKUP_CHUNK_SIZE, max_id=None):
+    """
+    查询 keys 中已经存在的键对应的记录id、内容哈希和提取日期：按键分批 IN 查询 (id, 键列, row_hash, extracted_date)，
+    走键列上的索引（见 models.py，已有数据库见 migrate_indexes.py），不读取整张表、不加载ORM对象，
+    耗时和内存只与本批的键个数有关
+
+    这些表的键列上没有唯一索引（同一个键可能有多条记录），同一个键以id最大的记录为准
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类
+        key_columns (list): 键字段名
+        keys (iterable): 要查询的键（与 key_columns 一一对应的元组）
+        chunk_size (int): 每个 IN 列表中的键个数
+        max_id (int): 只匹配id不大于该值的记录（本次导入开始前已有的记录），默认匹配所有记录
+
+    Returns:
+        dict: 已存在的键 -> (id, row_hash, extracted_date)
+    """
+    table = Model.__table__
+    columns = [table.c[column] for column in key_columns]
+    keys = list(dict.fromkeys(keys))
+    existing = {}
+    for start in range(0, len(keys), chunk_size):
+        query = select(table.c.id, *columns, table.c.row_hash, table.c.extracted_date).where(
+            key_in(columns, keys[start:start + chunk_size])
+        )
+        if max_id is not None:
+            query = query.where(table.c.id <= max_id)
+        for row in db.session.execute(query):
+            key = tuple(row[1:-2])
+            if key not in existing or row[0] > existing[key][0]:
+                existing[key] = (row[0], row[-2], row[-1])
+    return existing
+
+
+def unique_key_exists(db, table_name, key_columns):
+    """表上是否已有这些列的联合唯一索引（或唯一约束）"""
+    inspector = db.inspect(db.engine)
+    unique_sets = [set(constraint['column_names']) for constraint in inspector.get_unique_constraints(table_name)]
+    unique_sets += [set(index['column_names']) for index in inspector.get_indexes(table_name) if index['unique']]
+    return set(key_columns) in unique_sets
+
+
+# 已检查过的表是否可以按键批量写入：(数据库连接串, 表名) -> bool（每个进程每个表只检查一次）
+_upsert_support = {}
+
+
+def upsert_supported(db, table_name):
+    """
+    目标表是否可以按键批量写入：数据库类型支持，并且键列上有联合唯一索引
+
+    已有数据库没有运行 migrate_upsert_keys.py 时键列上没有唯一索引，ON DUPLICATE KEY UPDATE 不会命中任何记录，
+    每次导入都会追加重复记录；这种情况记录错误日志，由调用方改用按键比对写入
+
+    Args:
+        db: SQLAlchemy数据库实例
+        table_name (str): 目标表名（TABLE_ROW_COLUMNS 的键）
+
+    Returns:
+        bool: 是否可以使用 upsert_statement
+    """
+    cache_key = (str(db.engine.url), table_name)
+    if cache_key not in _upsert_support:
+        dialect = db.engine.dialect.name
+        key_columns = TABLE_ROW_COLUMNS[table_name]['key']
+        if dialect not in UPSERT_DIALECTS:
+            logger.error("%s 数据库不支持按键批量写入，%s 表改用按键比对写入", dialect, table_name)
+            supported = False
+        elif not unique_key_exists(db, table_name, key_columns):
+            logger.error("%s 表的 (%s) 上没有联合唯一索引，改用按键比对写入（较慢），"
+                         "请运行 lcoa/migrate_upsert_keys.py 建立唯一索引", table_name, ', '.join(key_columns))
+            supported = False
+        else:
+            supported = True
+        _upsert_support[cache_key] = supported
+    return _upsert_support[cache_key]
+
+
+def upsert_statement(db, Model, table_name):
+    """
+    按数据库类型生成按键写入的语句：MySQL 使用 INSERT ... ON DUPLICATE KEY UPDATE，
+    SQLite（测试和基准使用）使用 INSERT ... ON CONFLICT DO UPDATE；两者都依赖键列上的联合唯一索引
+    （写入前用 upsert_supported 检查）
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类
+        table_name (str): 目标表名（TABLE_ROW_COLUMNS 的键）
+
+    Returns:
+        Insert: 可以按 executemany 方式执行的语句
+    """
+    spec = TABLE_ROW_COLUMNS[table_name]
+    update_columns = written_columns(table_name)
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'mysql':
+        statement = mysql_insert(Model.__table__)
+        return statement.on_duplicate_key_update({column: statement.inserted[column] for column in update_columns})
+    if dialect == 'sqlite':
+        statement = sqlite_insert(Model.__table__)
+        return statement.on_conflict_do_update(
+            index_elements=spec['key'],
+            set_={column: statement.excluded[column] for column in update_columns}
+        )
+    raise ValueError(f"{dialect} 数据库不支持按键批量写入（支持 {', '.join(UPSERT_DIALECTS)}），"
+                     f"{table_name} 表请使用 save_with_comparison")
+
+
+def upsert_values(db, Model, table_name, values_list, batch_size=None):
+    """
+    按键批量写入已经去重的字段值（不提交事务）：键已存在的记录更新其余字段，不存在的新增；
+    不加载ORM对象，每 batch_size 行执行一次 executemany，不再逐行发出UPDATE
+
+    写入前按这些键查询已有记录的内容哈希和提取日期：哈希相同（内容没有变化）的行不写入，不产生UPDATE和binlog；
+    提取日期早于已有记录的行（重新导入了较早的导出文件）也不写入，同一个键始终保留提取日期最新的记录
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类（键列上需要有联合唯一索引）
+        table_name (str): 目标表名（TABLE_ROW_COLUMNS 的键）
+        values_list (list): 字段值元组（与 TABLE_ROW_COLUMNS 的字段一一对应，键不重复，见 _values_by_key）
+        batch_size (int): 每条 executemany 语句的行数，默认 LCOA_UPSERT_BATCH_SIZE
+
+    Returns:
+        dict: {'inserted': 新增条数, 'updated': 更新条数, 'unchanged': 内容未变化而跳过的条数,
+              'outdated': 提取日期早于已有记录而跳过的条数,
+              'preload_seconds': 查询已存在的键的耗时, 'write_seconds': 写入耗时（不含提交）}
+    """
+    batch_size = batch_size or UPSERT_BATCH_SIZE
+    spec = TABLE_ROW_COLUMNS[table_name]
+    columns = spec['columns']
+    key_positions = [columns.index(column) for column in spec['key']]
+
+    preload_start = time.perf_counter()
+    keys = [tuple(values[i] for i in key_positions) for values in values_list]
+    existing = find_existing_values(db, Model, spec['key'], keys, ['row_hash', 'extracted_date'])
+    preload_seconds = time.perf_counter() - preload_start
+
+    write_start = time.perf_counter()
+    params = []
+    updated = 0
+    outdated = 0
+    for key, values in zip(keys, values_list):
+        row_hash = content_hash(values)
+        if key in existing:
+            existing_hash, existing_date = existing[key]
+            if existing_hash == row_hash:
+                continue
+            if is_older(values[0], existing_date):
+                outdated += 1
+                continue
+            updated += 1
+        params.append(row_params(table_name, values, row_hash))
+
+    statement = upsert_statement(db, Model, table_name)
+    for start in range(0, len(params), batch_size):
+        db.session.execute(statement, params[start:start + batch_size])
+    write_seconds = time.perf_counter() - write_start
+
+    return {'inserted': len(values_list) - len(existing), 'updated': updated,
+            'unchanged': len(existing) - updated - outdated, 'outdated': outdated,
+            'preload_seconds': preload_seconds, 'write_seconds': write_seconds}
+
+
+def bulk_upsert(db, Model, table_name, data, batch_size=None):
+    """
+    按键批量写入数据行（不提交事务），同一批中同一个键只写入最后一行、只计一次（见 upsert_values）
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类（键列上需要有联合唯一索引）
+        table_name (str): 目标表名（TABLE_ROW_COLUMNS 的键）
+        data (list): 要保存的数据列表
+        batch_size (int): 每条 executemany 语句的行数，默认 LCOA_UPSERT_BATCH_SIZE
+
+    Returns:
+        dict: 同 upsert_values
+    """
+    return upsert_values(db, Model, table_name, list(_values_by_key(table_name, data).values()), batch_size)
+
+
+def save_with_upsert(db, Model, table_name, data, chunk_size=None):
+    """
+    按键分块写入并逐块提交：先对整批数据按键去重（同一个键以最后一行为准），再每块执行一次 upsert_values；
+    不能按键批量写入时（见 upsert_supported）改用 save_with_comparison 写入去重后的数据，结果和计数相同
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类（键列上需要有联合唯一索引）
+        table_name (str): 目标表名（TABLE_ROW_COLUMNS 的键）
+        data (list): 要保存的数据列表
+        chunk_size (int): 每个事务写入的行数，默认 LCOA_COMMIT_CHUNK_SIZE
+
+    Returns:
+        dict: 见 write_in_chunks
+    """
+    values_list = list(_values_by_key(table_name, data).values())
+    if not upsert_supported(db, table_name):
+        return save_with_comparison(db, Model, table_name, values_list, chunk_size, keep_newer=True)
+    return write_in_chunks(
+        db, table_name, values_list,
+        lambda chunk: upsert_values(db, Model, table_name, chunk),
+        chunk_size
+    )
+
+
+def save_with_comparison(db, Model, table_name, data, chunk_size=None, max_id=None, keep_newer=False):
+    """
+    按键匹配已有记录并分块写入、逐块提交（用于键列上没有唯一索引的 sys_xiangxi、sys_club 表）：
+    键已存在的记录按id更新其余字段，键不存在的每一行新增一条记录
+
+    - 匹配只读取本批数据涉及的键的 (id, row_hash)（见 find_existing_records），不加载ORM对象
+    - 同一个已有记录只按最后一行更新一次（逐行更新时最终的内容就是最后一行），内容哈希与数据库相同的不更新
+    - 更新以 UPDATE ... WHERE id=? 、新增以 INSERT 按 executemany 方式每 LCOA_UPSERT_BATCH_SIZE 行发出一次
+    - 一次导入分成多批写入时（流式、流水线模式）传入导入开始前的最大id，只与导入前已有的记录匹配，
+      本次导入中前面的批新增的记录不会被后面的批当作已有记录更新，结果与整批写入一次相同
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类
+        table_name (str): 目标表名（TABLE_ROW_COLUMNS 的键）
+        data (list): 要保存的数据列表
+        chunk_size (int): 每个事务写入的行数，默认 LCOA_COMMIT_CHUNK_SIZE
+        max_id (int): 只匹配id不大于该值的已有记录，默认匹配所有记录
+        keep_newer (bool): 为True时提取日期早于已有记录的行不更新该记录（与 upsert_values 一致，
+            用于没有唯一索引时代替按键批量写入）
+
+    Returns:
+        dict: 见 write_in_chunks（preload_seconds 为匹配已有记录的耗时）
+    """
+    spec = TABLE_ROW_COLUMNS[table_name]
+    columns = spec['columns']
+    key_positions = [columns.index(column) for column in spec['key']]
+    update_columns = written_columns(table_name)
+    table = Model.__table__
+    update_statement = update(table).where(table.c.id == bindparam('b_id')).values(
+        {column: bindparam(f'b_{column}') for column in update_columns}
+    )
+    insert_statement = insert(table)
+
+    keyed = []
+    for row in data:
+        values = row_to_values(table_name, row)
+        keyed.append((tuple(values[i] for i in key_positions), values))
+
+    preload_start = time.perf_counter()
+    existing = find_existing_records(db, Model, spec['key'], (key for key, _ in keyed), max_id=max_id)
+    preload_seconds = time.perf_counter() - preload_start
+
+    # 键已存在的行只保留最后一行，键不存在的行全部保留，保持原来的顺序
+    last_index = {key: index for index, (key, _) in enumerate(keyed) if key in existing}
+    items = [
+        (key, values) for index, (key, values) in enumerate(keyed)
+        if key not in existing or last_index[key] == index
+    ]
+
+    def write_chunk(chunk):
+        inserts = []
+        updates = []
+        unchanged = 0
+        outdated = 0
+        for key, values in chunk:
+            row_hash = content_hash(values)
+            if key in existing:
+                record_id, existing_hash, existing_date = existing[key]
+                if existing_hash == row_hash:
+                    unchanged += 1
+                    continue
+                if keep_newer and is_older(values[0], existing_date):
+                    outdated += 1
+                    continue
+                params = row_params(table_name, values, row_hash)
+                updates.append(dict({f'b_{column}': params[column] for column in update_columns}, b_id=record_id))
             else:
-                # 创建新记录
-                record = Lcoa(
-                    extracted_date=extracted_date,
-                    process_node_id=process_node_id,
-                    process_id=process_id,
-                    process_title=row[3] if len(row) > 3 else '',
-                    process_name=row[4] if len(row) > 4 else '',
-                    process_type=row[5] if len(row) > 5 else '',
-                    branch=row[6] if len(row) > 6 else '',
-                    department=row[7] if len(row) > 7 else '',
-                    node_operator=row[8] if len(row) > 8 else '',
-                    node_operation_type=row[9] if len(row) > 9 else '',
-                    node_name=row[10] if len(row) > 10 else '',
-                    first_receive_time=row[11] if len(row) > 11 else '',
-                    last_process_time=row[12] if len(row) > 12 else '',
-                    total_duration=row[13] if len(row) > 13 else '',
-                    total_timeout=row[14] if len(row) > 14 else ''
-                )
-                records_to_add.append(record)
-
-        # 批量添加新记录
-        if records_to_add:
-            db.session.bulk_save_objects(records_to_add)
+                inserts.append(row_params(table_name, values, row_hash))
 
-        # 提交事务
-        db.session.commit()
-        print(f"成功保存到lcoa表: 新增 {len(records_to_add)} 条记录, 更新 {updated_count} 条记录")
+        write_start = time.perf_counter()
+        for statement, params in ((update_statement, updates), (insert_statement, inserts)):
+            for start in range(0, len(params), UPSERT_BATCH_SIZE):
+                db.session.execute(statement, params[start:start + UPSERT_BATCH_SIZE])
+        return {'inserted': len(inserts), 'updated': len(updates), 'unchanged': unchanged, 'outdated': outdated,
+                'preload_seconds': 0.0, 'write_seconds': time.perf_counter() - write_start}
 
-    except Exception as e:  # 将异常处理移到 with 块内部
-        db.session.rollback()
-        print(f"保存数据到lcoa表时出错: {e}")
-        import traceback
-        traceback.print_exc()
+    result = write_in_chunks(db, table_name, items, write_chunk, chunk_size)
+    result['preload_seconds'] += preload_seconds
+    return result
 
 
-def save_to_sys_nodeal_table_with_comparison(db, SysNodeal, data):
+def replace_snapshot(db, Model, table_name, data, replaced_dates=None):
     """
-    保存数据到sys_nodeal表，如果第二列和第三列数据相同则更新现有记录
+    按提取日期整体替换快照（用于每天一份快照的 sys_xiangxi、sys_club 表）：
+    每个日期在一个事务中先按 extracted_date 删除该日期的记录（走 extracted_date 索引，分区表只涉及一个分区），
+    再按 executemany 批量插入这一天的行；不与其他日期的记录比对，耗时只与这一天的行数有关
+
+    流式导入时同一个日期的数据会分成多个数据块，replaced_dates 记录本次导入已经替换过的日期，
+    之后的数据块只追加不再删除
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类
+        table_name (str): 目标表名（TABLE_ROW_COLUMNS 的键）
+        data (list): 要保存的数据列表
+        replaced_dates (set): 本次导入已经替换过的日期，原地加入本次替换的日期；None表示每个日期都替换
+
+    Returns:
+        dict: {'inserted': 插入条数, 'updated': 0, 'deleted': 删除的旧快照记录数, 'preload_seconds': 0.0,
+               'write_seconds': 写入和提交耗时, 'chunks': 提交的事务数（每个日期一个）, 'retries': 重试次数}
+    """
+    table = Model.__table__
+    insert_statement = insert(table)
+
+    rows_by_date = {}
+    for row in data:
+        values = row_to_values(table_name, row)
+        rows_by_date.setdefault(values[0], []).append(row_params(table_name, values))
+
+    result = {'inserted': 0, 'updated': 0, 'deleted': 0, 'preload_seconds': 0.0, 'write_seconds': 0.0,
+              'chunks': 0, 'retries': 0}
+    for extracted_date, params in rows_by_date.items():
+        replace = replaced_dates is None or extracted_date not in replaced_dates
+        deleted = {'count': 0}
+
+        def write_date(chunk):
+            write_start = time.perf_counter()
+            deleted['count'] = 0
+            if replace:
+                deleted['count'] = db.session.execute(
+                    delete(table).where(table.c.extracted_date == extracted_date)
+                ).rowcount
+            for start in range(0, len(params), UPSERT_BATCH_SIZE):
+                db.session.execute(insert_statement, params[start:start + UPSERT_BATCH_SIZE])
+            return {'inserted': len(params), 'updated': 0, 'preload_seconds': 0.0,
+                    'write_seconds': time.perf_counter() - write_start}
+
+        # 一个日期的删除和插入在同一个事务中提交，读取方不会看到删了一半的快照
+        date_result = write_in_chunks(db, table_name, [extracted_date], write_date, 1)
+        for key in ('inserted', 'write_seconds', 'chunks', 'retries'):
+            result[key] += date_result[key]
+        result['deleted'] += deleted['count']
+        if replaced_dates is not None:
+            replaced_dates.add(extracted_date)
+    return result
+
+
+def save_snapshot_table(db, Model, table_name, data, replaced_dates=None):
+    """
+    按提取日期替换 sys_xiangxi、sys_club 表的快照（见 replace_snapshot）
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 模型类
+        table_name (str): 目标表名
+        data (list): 要保存的数据列表
+        replaced_dates (set): 本次导入已经替换过的日期
+
+    Returns:
+        dict: replace_snapshot 的结果，保存失败时返回None
     """
     try:
-        # 获取所有现有记录，建立索引以便快速查找
-        existing_records = {}
-        for record in SysNodeal.query.all():
-            key = (record.process_node_id, record.process_id)
-            existing_records[key] = record
+        result = replace_snapshot(db, Model, table_name, data, replaced_dates)
+        logger.info("成功替换%s表的快照: 删除 %d 条旧记录, 插入 %d 条记录（%d 个日期, 重试 %d 次）",
+                    table_name, result['deleted'], result['inserted'], result['chunks'], result['retries'])
+        return result
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("替换%s表的快照时出错: %s", table_name, e)
 
-        records_to_add = []
-        updated_count = 0
 
-        for row in data:
-            # 构造查找键（第二列和第三列）
-            key = (row[1] if len(row) > 1 else '', row[2] if len(row) > 2 else '')
-
-            if key in existing_records:
-                # 更新现有记录
-                existing_record = existing_records[key]
-                existing_record.extracted_date = row[0] if len(row) > 0 else ''
-                existing_record.process_title = row[3] if len(row) > 3 else ''
-                existing_record.process_name = row[4] if len(row) > 4 else ''
-                existing_record.process_type = row[5] if len(row) > 5 else ''
-                existing_record.branch = row[6] if len(row) > 6 else ''
-                existing_record.department = row[7] if len(row) > 7 else ''
-                existing_record.node_operator = row[8] if len(row) > 8 else ''
-                existing_record.node_operation_type = row[9] if len(row) > 9 else ''
-                existing_record.node_name = row[10] if len(row) > 10 else ''
-                existing_record.first_receive_time = row[11] if len(row) > 11 else ''
-                existing_record.last_process_time = row[12] if len(row) > 12 else ''
-                existing_record.total_duration = row[13] if len(row) > 13 else ''
-                existing_record.total_timeout = row[14] if len(row) > 14 else ''
-                updated_count += 1
-            else:
-                # 创建新记录
-                record = SysNodeal(
-                    extracted_date=row[0] if len(row) > 0 else '',
-                    process_node_id=row[1] if len(row) > 1 else '',
-                    process_id=row[2] if len(row) > 2 else '',
-                    process_title=row[3] if len(row) > 3 else '',
-                    process_name=row[4] if len(row) > 4 else '',
-                    process_type=row[5] if len(row) > 5 else '',
-                    branch=row[6] if len(row) > 6 else '',
-                    department=row[7] if len(row) > 7 else '',
-                    node_operator=row[8] if len(row) > 8 else '',
-                    node_operation_type=row[9] if len(row) > 9 else '',
-                    node_name=row[10] if len(row) > 10 else '',
-                    first_receive_time=row[11] if len(row) > 11 else '',
-                    last_process_time=row[12] if len(row) > 12 else '',
-                    total_duration=row[13] if len(row) > 13 else '',
-                    total_timeout=row[14] if len(row) > 14 else ''
-                )
-                records_to_add.append(record)
-
-        # 批量添加新记录
-        if records_to_add:
-            db.session.bulk_save_objects(records_to_add)
+def save_to_lcoa_table(db, Lcoa, data, chunk_size=None):
+    """
+    保存数据到lcoa表，按 (process_id, process_node_id) 分块批量写入，每块提交一次（见 save_with_upsert）
+    
+    Args:
+        db: SQLAlchemy数据库实例
+        Lcoa: Lcoa模型类
+        data (list): 要保存的数据列表
+        chunk_size (int): 每个事务写入的行数，默认 LCOA_COMMIT_CHUNK_SIZE
 
-        # 提交事务
-        db.session.commit()
-        print(f"成功保存到sys_nodeal表: 新增 {len(records_to_add)} 条记录, 更新 {updated_count} 条记录")
+    Returns:
+        dict: {'inserted': 新增条数, 'updated': 更新条数, 'unchanged': 内容未变化而跳过的条数,
+              'outdated': 提取日期早于已有记录而跳过的条数,
+              'preload_seconds': 查询已存在的键的耗时, 'write_seconds': 写入和提交耗时,
+              'chunks': 提交的块数, 'retries': 重试次数}，保存失败时返回None
+    """
+    try:
+        result = save_with_upsert(db, Lcoa, 'lcoa', data, chunk_size)
+        logger.info("成功保存到lcoa表: 新增 %d 条记录, 更新 %d 条记录, %d 条内容未变化, %d 条早于已有记录"
+                    "（%d 块, 重试 %d 次）", result['inserted'], result['updated'], result['unchanged'],
+                    result['outdated'], result['chunks'], result['retries'])
+        return result
 
-    except Exception as e:  # 异常处理在 with 块内部
+    except Exception as e:
         db.session.rollback()
-        print(f"保存数据到sys_nodeal表时出错: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("保存数据到lcoa表时出错: %s", e)
 
 
-def save_to_sys_xiangxi_table(db, SysXiangxi, data):
+def save_to_sys_xiangxi_table(db, SysXiangxi, data, chunk_size=None):
     """
-    保存数据到sys_xiangxi表，使用批量插入提高性能
+    保存数据到sys_xiangxi表，使用批量插入提高性能，每块提交一次
     
     Args:
         db: SQLAlchemy数据库实例
         SysXiangxi: SysXiangxi模型类
         data (list): 要保存的数据列表
+        chunk_size (int): 每个事务写入的行数，默认 LCOA_COMMIT_CHUNK_SIZE
+
+    Returns:
+        dict: {'inserted': 新增条数, 'updated': 更新条数, 'preload_seconds': 预加载现有记录耗时,
+              'write_seconds': 写入和提交耗时, 'chunks': 提交的块数, 'retries': 重试次数}，保存失败时返回None
     """
-    try:
+    def write_chunk(rows):
         records_to_add = []
-        for row in data:
-            # 创建SysXiangxi对象
-            record = SysXiangxi(
-                extracted_date=row[0] if len(row) > 0 else '',
-                node_operator=row[1] if len(row) > 1 else '',
-                department=row[2] if len(row) > 2 else '',
-                node_operation_type=row[3] if len(row) > 3 else '',
-                quantity=row[4] if len(row) > 4 else ''
-            )
+        for row in rows:
+            # 创建SysXiangxi对象（缺少的列为空字符串，同时写入内容哈希和类型化影子列）
+            record = SysXiangxi(**row_params('sys_xiangxi', row_to_values('sys_xiangxi', row)))
             records_to_add.append(record)
-        
+
+        write_start = time.perf_counter()
         # 批量添加记录
         if records_to_add:
             db.session.bulk_save_objects(records_to_add)
-        
-        # 提交事务
-        db.session.commit()
-        print(f"成功保存 {len(records_to_add)} 条记录到sys_xiangxi表")
+        return {'inserted': len(records_to_add), 'updated': 0, 'preload_seconds': 0.0,
+                'write_seconds': time.perf_counter() - write_start}
+
+    try:
+        result = write_in_chunks(db, 'sys_xiangxi', data, write_chunk, chunk_size)
+        logger.info("成功保存 %d 条记录到sys_xiangxi表（%d 块, 重试 %d 次）",
+                    result['inserted'], result['chunks'], result['retries'])
+        return result
     except Exception as e:
         db.session.rollback()
-        print(f"保存数据到sys_xiangxi表时出错: {e}")
+        logger.exception("保存数据到sys_xiangxi表时出错: %s", e)
 
 
-def save_to_sys_club_table(db, SysClub, data):
+def save_to_sys_club_table(db, SysClub, data, chunk_size=None):
     """
-    保存数据到sys_club表，使用批量插入提高性能
+    保存数据到sys_club表，使用批量插入提高性能，每块提交一次
     
     Args:
         db: SQLAlchemy数据库实例
         SysClub: SysClub模型类
         data (list): 要保存的数据列表
+        chunk_size (int): 每个事务写入的行数，默认 LCOA_COMMIT_CHUNK_SIZE
+
+    Returns:
+        dict: {'inserted': 新增条数, 'updated': 更新条数, 'preload_seconds': 预加载现有记录耗时,
+              'write_seconds': 写入和提交耗时, 'chunks': 提交的块数, 'retries': 重试次数}，保存失败时返回None
     """
-    try:
+    def write_chunk(rows):
         records_to_add = []
-        for row in data:
-            # 创建SysClub对象
-            record = SysClub(
-                extracted_date=row[0] if len(row) > 0 else '',
-                department=row[1] if len(row) > 1 else '',
-                personnel_count=row[2] if len(row) > 2 else '',
-                timeout_count=row[3] if len(row) > 3 else ''
-            )
+        for row in rows:
+            # 创建SysClub对象（缺少的列为空字符串，同时写入内容哈希和类型化影子列）
+            record = SysClub(**row_params('sys_club', row_to_values('sys_club', row)))
             records_to_add.append(record)
-        
+
+        write_start = time.perf_counter()
         # 批量添加记录
         if records_to_add:
             db.session.bulk_save_objects(records_to_add)
-        
-        # 提交事务
-        db.session.commit()
-        print(f"成功保存 {len(records_to_add)} 条记录到sys_club表")
+        return {'inserted': len(records_to_add), 'updated': 0, 'preload_seconds': 0.0,
+                'write_seconds': time.perf_counter() - write_start}
+
+    try:
+        result = write_in_chunks(db, 'sys_club', data, write_chunk, chunk_size)
+        logger.info("成功保存 %d 条记录到sys_club表（%d 块, 重试 %d 次）",
+                    result['inserted'], result['chunks'], result['retries'])
+        return result
     except Exception as e:
         db.session.rollback()
-        print(f"保存数据到sys_club表时出错: {e}")
+        logger.exception("保存数据到sys_club表时出错: %s", e)
 
 
-def save_to_sys_club_table_with_comparison(db, SysClub, data):
+def save_to_sys_club_table_with_comparison(db, SysClub, data, chunk_size=None, max_id=None):
     """
     保存数据到sys_club表，如果前两个数据相同则更新现有记录
+    （按键匹配后分块写入，每块提交一次，见 save_with_comparison）
     
     Args:
         db: SQLAlchemy数据库实例
         SysClub: SysClub模型类
         data (list): 要保存的数据列表
+        chunk_size (int): 每个事务写入的行数，默认 LCOA_COMMIT_CHUNK_SIZE
+        max_id (int): 只匹配id不大于该值的已有记录（见 save_with_comparison）
+
+    Returns:
+        dict: {'inserted': 新增条数, 'updated': 更新条数, 'unchanged': 内容未变化而跳过的条数,
+              'preload_seconds': 匹配已有记录耗时, 'write_seconds': 写入和提交耗时,
+              'chunks': 提交的块数, 'retries': 重试次数}，保存失败时返回None
     """
     try:
-        # 获取所有现有记录，建立索引以便快速查找
-        existing_records = {}
-        for record in SysClub.query.all():
-            key = (record.department, record.personnel_count)  # 前两列对应department和personnel_count
-            existing_records[key] = record
-        
-        records_to_add = []
-        updated_count = 0
-        
-        for row in data:
-            # 构造查找键（前两列）
-            key = (row[1] if len(row) > 1 else '', row[2] if len(row) > 2 else '')  # 第一列是日期
-            
-            if key in existing_records:
-                # 更新现有记录
-                existing_record = existing_records[key]
-                existing_record.extracted_date = row[0] if len(row) > 0 else ''
-                existing_record.timeout_count = row[3] if len(row) > 3 else ''
-                updated_count += 1
-            else:
-                # 创建新记录
-                record = SysClub(
-                    extracted_date=row[0] if len(row) > 0 else '',
-                    department=row[1] if len(row) > 1 else '',
-                    personnel_count=row[2] if len(row) > 2 else '',
-                    timeout_count=row[3] if len(row) > 3 else ''
-                )
-                records_to_add.append(record)
-        
-        # 批量添加新记录
-        if records_to_add:
-            db.session.bulk_save_objects(records_to_add)
-        
-        # 提交事务
-        db.session.commit()
-        print(f"成功保存到sys_club表: 新增 {len(records_to_add)} 条记录, 更新 {updated_count} 条记录")
+        result = save_with_comparison(db, SysClub, 'sys_club', data, chunk_size, max_id)
+        logger.info("成功保存到sys_club表: 新增 %d 条记录, 更新 %d 条记录, %d 条内容未变化（%d 块, 重试 %d 次）",
+                    result['inserted'], result['updated'], result['unchanged'], result['chunks'], result['retries'])
+        return result
     except Exception as e:
         db.session.rollback()
-        print(f"保存数据到sys_club表时出错: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("保存数据到sys_club表时出错: %s", e)
 
 
-def save_to_sys_nodeal_table_with_comparison(db, SysNodeal, data):
+def save_to_sys_nodeal_table_with_comparison(db, SysNodeal, data, chunk_size=None):
     """
     保存数据到sys_nodeal表，如果第二列和第三列数据相同则更新现有记录
+    （按 (process_node_id, process_id) 分块批量写入，每块提交一次，见 save_with_upsert）
     
     Args:
         db: SQLAlchemy数据库实例
         SysNodeal: SysNodeal模型类
         data (list): 要保存的数据列表
+        chunk_size (int): 每个事务写入的行数，默认 LCOA_COMMIT_CHUNK_SIZE
+
+    Returns:
+        dict: {'inserted': 新增条数, 'updated': 更新条数, 'unchanged': 内容未变化而跳过的条数,
+              'outdated': 提取日期早于已有记录而跳过的条数,
+              'preload_seconds': 查询已存在的键的耗时, 'write_seconds': 写入和提交耗时,
+              'chunks': 提交的块数, 'retries': 重试次数}，保存失败时返回None
     """
     try:
-        # 获取所有现有记录，建立索引以便快速查找
-        existing_records = {}
-        for record in SysNodeal.query.all():
-            key = (record.process_node_id, record.process_id)  # 第二列和第三列对应process_node_id和process_id
-            existing_records[key] = record
-        
-        records_to_add = []
-        updated_count = 0
-        
-        for row in data:
-            # 构造查找键（第二列和第三列）
-            key = (row[1] if len(row) > 1 else '', row[2] if len(row) > 2 else '')
-            
-            if key in existing_records:
-                # 更新现有记录
-                existing_record = existing_records[key]
-                existing_record.extracted_date = row[0] if len(row) > 0 else ''
-                existing_record.process_title = row[3] if len(row) > 3 else ''
-                existing_record.process_name = row[4] if len(row) > 4 else ''
-                existing_record.process_type = row[5] if len(row) > 5 else ''
-                existing_record.branch = row[6] if len(row) > 6 else ''
-                existing_record.department = row[7] if len(row) > 7 else ''
-                existing_record.node_operator = row[8] if len(row) > 8 else ''
-                existing_record.node_operation_type = row[9] if len(row) > 9 else ''
-                existing_record.node_name = row[10] if len(row) > 10 else ''
-                existing_record.first_receive_time = row[11] if len(row) > 11 else ''
-                existing_record.last_process_time = row[12] if len(row) > 12 else ''
-                existing_record.total_duration = row[13] if len(row) > 13 else ''
-                existing_record.total_timeout = row[14] if len(row) > 14 else ''
-                updated_count += 1
-            else:
-                # 创建新记录
-                record = SysNodeal(
-                    extracted_date=row[0] if len(row) > 0 else '',
-                    process_node_id=row[1] if len(row) > 1 else '',
-                    process_id=row[2] if len(row) > 2 else '',
-                    process_title=row[3] if len(row) > 3 else '',
-                    process_name=row[4] if len(row) > 4 else '',
-                    process_type=row[5] if len(row) > 5 else '',
-                    branch=row[6] if len(row) > 6 else '',
-                    department=row[7] if len(row) > 7 else '',
-                    node_operator=row[8] if len(row) > 8 else '',
-                    node_operation_type=row[9] if len(row) > 9 else '',
-                    node_name=row[10] if len(row) > 10 else '',
-                    first_receive_time=row[11] if len(row) > 11 else '',
-                    last_process_time=row[12] if len(row) > 12 else '',
-                    total_duration=row[13] if len(row) > 13 else '',
-                    total_timeout=row[14] if len(row) > 14 else ''
-                )
-                records_to_add.append(record)
-        
-        # 批量添加新记录
-        if records_to_add:
-            db.session.bulk_save_objects(records_to_add)
-        
-        # 提交事务
-        db.session.commit()
-        print(f"成功保存到sys_nodeal表: 新增 {len(records_to_add)} 条记录, 更新 {updated_count} 条记录")
+        result = save_with_upsert(db, SysNodeal, 'sys_nodeal', data, chunk_size)
+        logger.info("成功保存到sys_nodeal表: 新增 %d 条记录, 更新 %d 条记录, %d 条内容未变化, %d 条早于已有记录"
+                    "（%d 块, 重试 %d 次）", result['inserted'], result['updated'], result['unchanged'],
+                    result['outdated'], result['chunks'], result['retries'])
+        return result
     except Exception as e:
         db.session.rollback()
-        print(f"保存数据到sys_nodeal表时出错: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("保存数据到sys_nodeal表时出错: %s", e)
 
 
-def save_to_sys_xiangxi_table_with_comparison(db, SysXiangxi, data):
+def save_to_sys_xiangxi_table_with_comparison(db, SysXiangxi, data, chunk_size=None, max_id=None):
     """
     保存数据到sys_xiangxi表，如果前两个数据相同则更新现有记录
+    （按键匹配后分块写入，每块提交一次，见 save_with_comparison）
     
     Args:
         db: SQLAlchemy数据库实例
         SysXiangxi: SysXiangxi模型类
         data (list): 要保存的数据列表
+        chunk_size (int): 每个事务写入的行数，默认 LCOA_COMMIT_CHUNK_SIZE
+        max_id (int): 只匹配id不大于该值的已有记录（见 save_with_comparison）
+
+    Returns:
+        dict: {'inserted': 新增条数, 'updated': 更新条数, 'unchanged': 内容未变化而跳过的条数,
+              'preload_seconds': 匹配已有记录耗时, 'write_seconds': 写入和提交耗时,
+              'chunks': 提交的块数, 'retries': 重试次数}，保存失败时返回None
     """
     try:
-        # 获取所有现有记录，建立索引以便快速查找
-        existing_records = {}
-        for record in SysXiangxi.query.all():
-            key = (record.node_operator, record.department)  # 前两列对应node_operator和department
-            existing_records[key] = record
-        
-        records_to_add = []
-        updated_count = 0
-        
-        for row in data:
-            # 构造查找键（前两列）
-            key = (row[1] if len(row) > 1 else '', row[2] if len(row) > 2 else '')  # 第一列是日期
-            
-            if key in existing_records:
-                # 更新现有记录
-                existing_record = existing_records[key]
-                existing_record.extracted_date = row[0] if len(row) > 0 else ''
-                existing_record.node_operation_type = row[3] if len(row) > 3 else ''
-                existing_record.quantity = row[4] if len(row) > 4 else ''
-                updated_count += 1
-            else:
-                # 创建新记录
-                record = SysXiangxi(
-                    extracted_date=row[0] if len(row) > 0 else '',
-                    node_operator=row[1] if len(row) > 1 else '',
-                    department=row[2] if len(row) > 2 else '',
-                    node_operation_type=row[3] if len(row) > 3 else '',
-                    quantity=row[4] if len(row) > 4 else ''
-                )
-                records_to_add.append(record)
-        
-        # 批量添加新记录
-        if records_to_add:
-            db.session.bulk_save_objects(records_to_add)
-        
-        # 提交事务
-        db.session.commit()
-        print(f"成功保存到sys_xiangxi表: 新增 {len(records_to_add)} 条记录, 更新 {updated_count} 条记录")
+        result = save_with_comparison(db, SysXiangxi, 'sys_xiangxi', data, chunk_size, max_id)
+        logger.info("成功保存到sys_xiangxi表: 新增 %d 条记录, 更新 %d 条记录, %d 条内容未变化（%d 块, 重试 %d 次）",
+                    result['inserted'], result['updated'], result['unchanged'], result['chunks'], result['retries'])
+        return result
     except Exception as e:
         db.session.rollback()
-        print(f"保存数据到sys_xiangxi表时出错: {e}")
-        import traceback
-        traceback.print_exc()
-    finally:
-        pass
\ No newline at end of file
+        logger.exception("保存数据到sys_xiangxi表时出错: %s", e)
@@ -0,0 +1,223 @@
+"""
+数据库连接池配置和统计
+Web服务、数据导入（datedeal）和项目导入是不同的进程，连接的使用方式不同：
+Web服务并发请求多、每次持有时间短，导入进程连接少、每次持有时间长，所以连接池按进程角色分别配置
+
+环境变量:
+    LCOA_PROCESS_ROLE                进程角色：web（默认）、ingest、import，导入脚本的入口会设置为对应的角色
+    LCOA_<ROLE>_POOL_SIZE            连接池保持的连接数，例如 LCOA_WEB_POOL_SIZE
+    LCOA_<ROLE>_MAX_OVERFLOW         连接池满时最多额外创建的连接数
+    LCOA_<ROLE>_POOL_TIMEOUT         连接全部被占用时获取连接最多等待的秒数
+    LCOA_<ROLE>_POOL_PRE_PING        获取连接时是否先检查连接可用（1/0）
+    LCOA_POOL_RECYCLE                连接的最长使用秒数，默认3600（小于MySQL的 wait_timeout）
+    LCOA_POOL_SLOW_CHECKOUT_MS       获取连接超过该毫秒数时计为等待，默认100
+
+连接池的统计（获取连接的耗时、连接池占满的次数、新建和关闭的连接数）见 PoolMetrics，
+Web服务通过 /api/admin/metrics 查看，导入进程写入导入统计（见 datedeal/ingest_telemetry.py）
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+PROCESS_ROLES = ('web', 'ingest', 'import')
+PROCESS_ROLE = os.environ.get('LCOA_PROCESS_ROLE', 'web')
+
+# 各角色的默认配置（可以用环境变量覆盖）
+ROLE_POOL_DEFAULTS = {
+    # 并发请求多，保持较多连接；连接可能空闲很久，获取时检查可用
+    'web': {'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 30, 'pool_pre_ping': True},
+    # 单个写入线程加少量辅助连接（检查点、清单），一次导入持有连接较长，等待时间放宽
+    'ingest': {'pool_size': 3, 'max_overflow': 2, 'pool_timeout': 60, 'pool_pre_ping': True},
+    # 项目导入一次性执行，连接少
+    'import': {'pool_size': 2, 'max_overflow': 2, 'pool_timeout': 30, 'pool_pre_ping': True},
+}
+POOL_RECYCLE = int(os.environ.get('LCOA_POOL_RECYCLE', '3600'))
+SLOW_CHECKOUT_MS = float(os.environ.get('LCOA_POOL_SLOW_CHECKOUT_MS', '100'))
+# 计算获取连接耗时分位数时保留的最近样本数
+CHECKOUT_SAMPLE_SIZE = 1000
+
+
+def pool_settings(role=None):
+    """
+    读取进程角色的连接池配置（默认值见 ROLE_POOL_DEFAULTS，环境变量 LCOA_<ROLE>_* 覆盖）
+
+    Args:
+        role (str): 进程角色，默认 LCOA_PROCESS_ROLE
+
+    Returns:
+        dict: {'pool_size', 'max_overflow', 'pool_timeout', 'pool_pre_ping', 'pool_recycle'}
+    """
+    role = role or PROCESS_ROLE
+    if role not in ROLE_POOL_DEFAULTS:
+        raise ValueError(f"未知的进程角色 {role}，可选: {', '.join(PROCESS_ROLES)}")
+
+    prefix = f'LCOA_{role.upper()}_'
+    defaults = ROLE_POOL_DEFAULTS[role]
+    settings = {
+        'pool_size': int(os.environ.get(prefix + 'POOL_SIZE', defaults['pool_size'])),
+        'max_overflow': int(os.environ.get(prefix + 'MAX_OVERFLOW', defaults['max_overflow'])),
+        'pool_timeout': float(os.environ.get(prefix + 'POOL_TIMEOUT', defaults['pool_timeout'])),
+        'pool_pre_ping': defaults['pool_pre_ping'],
+        'pool_recycle': POOL_RECYCLE,
+    }
+    pre_ping = os.environ.get(prefix + 'POOL_PRE_PING')
+    if pre_ping is not None:
+        settings['pool_pre_ping'] = pre_ping.lower() in ('1', 'true', 'yes')
+    return settings
+
+
+def engine_options(database_uri, role=None):
+    """
+    生成 SQLALCHEMY_ENGINE_OPTIONS：按进程角色设置连接池，并使用带统计的连接池
+
+    Args:
+        database_uri (str): 数据库连接串
+        role (str): 进程角色，默认 LCOA_PROCESS_ROLE
+
+    Returns:
+        dict: create_engine 的参数
+    """
+    settings = pool_settings(role)
+    # SQLite 内存数据库每个线程一个连接，不能使用连接池参数
+    if database_uri.startswith('sqlite') and (':memory:' in database_uri or database_uri.rstrip('/') == 'sqlite:'):
+        return {'pool_pre_ping': settings['pool_pre_ping']}
+    return dict(settings, poolclass=InstrumentedQueuePool)
+
+
+class PoolMetrics:
+    """本进程的连接池统计（多个请求线程同时更新，用锁保护）"""
+
+    def __init__(self, sample_size=CHECKOUT_SAMPLE_SIZE):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=sample_size)
+        self.reset()
+
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self._waits.clear()
+            self.started_at = time.time()
+            self.checkouts = 0
+            self.checkins = 0
+            self.slow_checkouts = 0
+            self.saturated_checkouts = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            self.peak_checked_out = 0
+            self.connects = 0
+            self.closes = 0
+            self.invalidations = 0
+
+    def record_checkout(self, wait_seconds, checked_out, capacity):
+        """
+        记录一次获取连接
+
+        Args:
+            wait_seconds (float): 从连接池获取连接的耗时（包括连接池满时的等待和新建连接）
+            checked_out (int): 获取后被占用的连接数
+            capacity (int): 连接池最多的连接数（pool_size + max_overflow）
+        """
+        with self._lock:
+            self.checkouts += 1
+            self._waits.append(wait_seconds)
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+            if wait_seconds * 1000 >= SLOW_CHECKOUT_MS:
+                self.slow_checkouts += 1
+            if checked_out >= capacity:
+                self.saturated_checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def increment(self, name):
+        """计数加一（checkins、timeouts、connects、closes、invalidations）"""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self, engine=None):
+        """
+        生成统计快照
+
+        Args:
+            engine: 传入时附带连接池当前的状态
+
+        Returns:
+            dict: 计数、获取连接耗时（毫秒：平均、p50、p95、最大）和连接池当前的占用情况
+        """
+        with self._lock:
+            waits = sorted(self._waits)
+            record = {
+                'role': PROCESS_ROLE,
+                'since_seconds': round(time.time() - self.started_at, 1),
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'slow_checkouts': self.slow_checkouts,
+                'saturated_checkouts': self.saturated_checkouts,
+                'timeouts': self.timeouts,
+                'peak_checked_out': self.peak_checked_out,
+                'connects': self.connects,
+                'closes': self.closes,
+                'invalidations': self.invalidations,
+                'checkout_ms': {
+                    'avg': round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                    'p50': round(waits[len(waits) // 2] * 1000, 3) if waits else 0.0,
+                    'p95': round(waits[min(int(len(waits) * 0.95), len(waits) - 1)] * 1000, 3) if waits else 0.0,
+                    'max': round(self.wait_seconds_max * 1000, 3),
+                },
+            }
+
+        pool = getattr(engine, 'pool', None)
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + pool._max_overflow
+            record['pool'] = {
+                'size': pool.size(),
+                'max_overflow': pool._max_overflow,
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': pool.overflow(),
+                'saturation': round(pool.checkedout() / capacity, 3) if capacity > 0 else None,
+            }
+        return record
+
+
+# 本进程的连接池统计
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """记录获取连接耗时、占用数和超时的 QueuePool"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.increment('timeouts')
+            raise
+        pool_metrics.record_checkout(time.perf_counter() - start, self.checkedout(), self.size() + self._max_overflow)
+        return connection
+
+
+# 连接的新建、关闭和失效（连接频繁重建说明 pool_recycle 过短、连接池过小或数据库主动断开了连接）
+@event.listens_for(InstrumentedQueuePool, 'checkin')
+def _count_checkin(dbapi_connection, connection_record):
+    pool_metrics.increment('checkins')
+
+
+@event.listens_for(InstrumentedQueuePool, 'connect')
+def _count_connect(dbapi_connection, connection_record):
+    pool_metrics.increment('connects')
+
+
+@event.listens_for(InstrumentedQueuePool, 'close')
+def _count_close(dbapi_connection, connection_record):
+    pool_metrics.increment('closes')
+
+
+@event.listens_for(InstrumentedQueuePool, 'invalidate')
+def _count_invalidate(dbapi_connection, connection_record, exception):
+    pool_metrics.increment('invalidations')
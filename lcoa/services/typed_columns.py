@@ -0,0 +1,248 @@
+"""
+类型化影子列
+导入数据和项目里程碑中的日期、时间、耗时和数量以字符串保存（原有字段和接口返回值不变），
+同时写入对应类型的影子列：日期为 DATE、时间为 DATETIME、耗时为秒数、数量为整数，
+接口可以在数据库中按日期取最大值、按范围走索引查询、对数量和耗时求和
+
+解析失败或原值为空时影子列为 NULL
+"""
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+from sqlalchemy import and_, func, or_
+
+# 日期字符串支持的格式（带时间的值只取日期部分）
+DATE_FORMATS = ['%Y-%m-%d', '%Y/%m/%d', '%Y.%m.%d', '%Y年%m月%d日']
+# 时间字符串支持的格式
+DATETIME_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M']
+# 可以直接用 fromisoformat 解析的日期和时间
+ISO_DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}$')
+ISO_DATETIME_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}(:\d{2})?$')
+
+# 耗时中的数字和单位，例如 "1天6小时19分"、"2小时30分钟"、"45秒"
+DURATION_PART_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(天|小时|时|分钟|分|秒)')
+DURATION_UNIT_SECONDS = {'天': 86400, '小时': 3600, '时': 3600, '分钟': 60, '分': 60, '秒': 1}
+# 同一批导入中日期、时间和耗时的取值大量重复，解析结果按原值缓存
+PARSE_CACHE_SIZE = 65536
+
+
+def _text(value):
+    """转换为去掉首尾空白的字符串，None和空字符串返回None"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_date(value):
+    """
+    解析日期字符串（例如 "2025-10-01"、"2025年10月01日"、"2025-10-01 00:00:00"）
+
+    Returns:
+        date: 解析失败时返回None
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _text(value)
+    if text is None:
+        return None
+    text = text.split()[0]
+    if ISO_DATE_PATTERN.match(text):
+        try:
+            return date.fromisoformat(text)
+        except ValueError:
+            pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_datetime(value):
+    """
+    解析时间字符串（例如 "2025-09-25 03:34:15"），只有日期时按当天0点
+
+    Returns:
+        datetime: 解析失败时返回None
+    """
+    if isinstance(value, datetime):
+        return value
+    text = _text(value)
+    if text is None:
+        return None
+    # 导出数据中的时间基本都是 "YYYY-MM-DD HH:MM:SS"，先用 fromisoformat 解析（比逐个尝试 strptime 快得多）
+    if ISO_DATETIME_PATTERN.match(text):
+        try:
+            return datetime.fromisoformat(text)
+        except ValueError:
+            pass
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    parsed = parse_date(text)
+    return datetime(parsed.year, parsed.month, parsed.day) if parsed else None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_duration_seconds(value):
+    """
+    解析耗时字符串为秒数，例如 "1天6小时19分" -> 109140，"0" -> 0
+
+    Returns:
+        int: 没有可识别的单位时返回None（单独的 "0" 除外）
+    """
+    text = _text(value)
+    if text is None:
+        return None
+    parts = DURATION_PART_PATTERN.findall(text)
+    if not parts:
+        return 0 if text in ('0', '0.0') else None
+    return int(round(sum(float(number) * DURATION_UNIT_SECONDS[unit] for number, unit in parts)))
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_count(value):
+    """
+    解析数量字符串为整数，例如 "136"、"12.0"
+
+    Returns:
+        int: 解析失败时返回None
+    """
+    text = _text(value)
+    if text is None:
+        return None
+    try:
+        return int(float(text))
+    except (ValueError, OverflowError):
+        return None
+
+
+# 各表的影子列 -> (原字段, 解析函数)
+TYPED_COLUMNS = {
+    'lcoa': {
+        'extracted_on': ('extracted_date', parse_date),
+        'first_receive_at': ('first_receive_time', parse_datetime),
+        'last_process_at': ('last_process_time', parse_datetime),
+        'total_duration_seconds': ('total_duration', parse_duration_seconds),
+        'total_timeout_seconds': ('total_timeout', parse_duration_seconds),
+    },
+    'sys_xiangxi': {
+        'extracted_on': ('extracted_date', parse_date),
+        'quantity_num': ('quantity', parse_count),
+    },
+    'sys_club': {
+        'extracted_on': ('extracted_date', parse_date),
+        'personnel_count_num': ('personnel_count', parse_count),
+        'timeout_count_num': ('timeout_count', parse_count),
+    },
+    'sys_project_milestone': {
+        'planned_start_on': ('planned_start_time', parse_date),
+        'planned_end_on': ('planned_end_time', parse_date),
+        'actual_completion_on': ('actual_completion_time', parse_date),
+        'impact_cycle_days': ('impact_cycle', parse_count),
+    },
+}
+# sys_nodeal 表与 lcoa 表的字段相同
+TYPED_COLUMNS['sys_nodeal'] = TYPED_COLUMNS['lcoa']
+
+
+def typed_values(table_name, source):
+    """
+    根据原字段的值计算影子列的值
+
+    Args:
+        table_name (str): 表名（TYPED_COLUMNS 的键，其他表返回空字典）
+        source (dict): 原字段名 -> 值
+
+    Returns:
+        dict: 影子列名 -> 值
+    """
+    return {
+        column: parse(source.get(source_column))
+        for column, (source_column, parse) in TYPED_COLUMNS.get(table_name, {}).items()
+    }
+
+
+def fill_typed_attributes(table_name, record):
+    """按ORM对象当前的原字段值设置它的影子列（用于通过ORM写入的项目里程碑）"""
+    source = {source_column: getattr(record, source_column)
+              for source_column, _ in TYPED_COLUMNS[table_name].values()}
+    for column, value in typed_values(table_name, source).items():
+        setattr(record, column, value)
+
+
+def pending_extracted_dates(db, Model):
+    """
+    extracted_on 为空的记录的提取日期（未运行 migrate_typed_columns.py 回填，或 extracted_date 无法解析）
+
+    按不同的 extracted_date 原值查询（extracted_on IS NULL 走 extracted_on 索引，回填后通常没有这样的记录）；
+    能解析的原值按日期分组，无法解析的原值按原字符串分组（与按字符串排序日期的原有接口相同）
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 有 extracted_date 和 extracted_on 字段的模型类
+
+    Returns:
+        dict: 日期字符串（YYYY-MM-DD，无法解析时为原值）-> extracted_date 原值列表
+    """
+    groups = {}
+    for (text,) in db.session.query(Model.extracted_date).filter(Model.extracted_on.is_(None)).distinct():
+        if _text(text) is None:
+            continue
+        parsed = parse_date(text)
+        groups.setdefault(parsed.isoformat() if parsed else text, []).append(text)
+    return groups
+
+
+def extracted_date_condition(Model, day, pending):
+    """
+    某一天的记录的查询条件：extracted_on 等于该日期，或者 extracted_on 为空且 extracted_date 是该日期的原值
+
+    Args:
+        Model: 模型类
+        day (str): 日期字符串（pending_extracted_dates 的键或 extracted_on 的 YYYY-MM-DD）
+        pending (dict): pending_extracted_dates 的结果
+    """
+    conditions = []
+    parsed = parse_date(day)
+    if parsed is not None and parsed.isoformat() == day:
+        conditions.append(Model.extracted_on == parsed)
+    if day in pending:
+        conditions.append(and_(Model.extracted_on.is_(None), Model.extracted_date.in_(pending[day])))
+    return or_(*conditions)
+
+
+def latest_extracted_date(db, Model):
+    """
+    最新的提取日期：extracted_on 的最大值（走索引）与 extracted_on 为空的记录的日期中较新的一个，
+    未回填影子列的记录不会被漏掉
+
+    Args:
+        db: SQLAlchemy数据库实例
+        Model: 有 extracted_date 和 extracted_on 字段的模型类
+
+    Returns:
+        tuple: (日期字符串 YYYY-MM-DD（无法解析时为原值）, 该日期的记录的查询条件)，表中没有日期时返回 (None, None)
+    """
+    latest_on = db.session.query(func.max(Model.extracted_on)).scalar()
+    pending = pending_extracted_dates(db, Model)
+    days = list(pending) + ([latest_on.isoformat()] if latest_on else [])
+    if not days:
+        return None, None
+    latest = max(days)
+    return latest, extracted_date_condition(Model, latest, pending)
+
+
+def format_month_day(day):
+    """日期字符串 -> 月日格式（例如 "10月05日"），无法解析时返回原值"""
+    parsed = parse_date(day)
+    return parsed.strftime('%m月%d日') if parsed else day
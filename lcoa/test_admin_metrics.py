@@ -0,0 +1,87 @@
+"""
+检查 /api/admin/metrics 接口：管理员可以查看本进程的连接池统计，以及导入统计文件中最近一次导入的连接池统计，
+非管理员没有权限。使用临时SQLite数据库和导入统计文件（见 datedeal/bench_ingest.py）
+
+接口通过应用的测试客户端调用，在子进程中按Web服务的启动方式（在 lcoa 目录中 python app.py）导入应用，
+Python路径中只有 lcoa 目录，接口不能依赖项目根目录下的 lcoa 包
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# 添加项目根目录和lcoa目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (project_root, os.path.join(project_root, 'lcoa')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from lcoa.datedeal.bench_ingest import configure_environment
+
+LCOA_DIR = os.path.join(project_root, 'lcoa')
+
+# 子进程中执行：以指定角色的用户调用接口，输出状态码和返回内容
+CLIENT_SCRIPT = """
+import json
+import sys
+from app import app
+from utils import generate_token
+token = generate_token(app.config['SECRET_KEY'], 1, sys.argv[1], sys.argv[1])
+response = app.test_client().get('/api/admin/metrics', headers={'Authorization': 'Bearer ' + token})
+print(json.dumps({'status': response.status_code, 'body': response.get_json()}))
+"""
+
+# 写入导入统计文件的导入记录（只包含接口返回的字段）
+INGEST_RECORD = {
+    'started_at': '2025-10-01T02:00:00',
+    'mode': 'full',
+    'pool': {'role': 'ingest', 'checkouts': 12, 'timeouts': 0},
+}
+
+
+def get_metrics_as(role):
+    """
+    在子进程中按Web服务的启动方式导入应用并调用接口
+
+    Args:
+        role (str): 用户角色（admin、user）
+
+    Returns:
+        tuple: (状态码, 返回的JSON)
+    """
+    env = dict(os.environ)
+    env.pop('PYTHONPATH', None)
+    completed = subprocess.run([sys.executable, '-c', CLIENT_SCRIPT, role], cwd=LCOA_DIR, env=env,
+                               capture_output=True, text=True, encoding='utf-8')
+    assert completed.returncode == 0, f"调用接口的子进程出错:\n{completed.stderr}"
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    return result['status'], result['body']
+
+
+def test_admin_metrics(work_dir):
+    """
+    Args:
+        work_dir (str): 已经用 configure_environment 配置的临时目录（pytest 中由 conftest.py 提供）
+    """
+    # 导入统计文件的最后一条记录没有连接池统计时，接口返回之前最近一条带连接池统计的记录
+    with open(os.environ['LCOA_METRICS_FILE'], 'a', encoding='utf-8') as f:
+        f.write(json.dumps(INGEST_RECORD) + '\n')
+        f.write('无法解析的行\n')
+        f.write(json.dumps({'started_at': '2025-10-01T03:00:00', 'mode': 'stream'}) + '\n')
+
+    status, body = get_metrics_as('admin')
+    print(f"管理员: {status} {body['message']}")
+    assert status == 200, f"接口返回 {status}: {body['message']}"
+    assert body['data']['ingest_pool'] == INGEST_RECORD, f"最近一次导入的连接池统计不正确: {body['data']['ingest_pool']}"
+    assert 'checkout_ms' in body['data']['pool'] and 'settings' in body['data']['pool']
+
+    status, body = get_metrics_as('user')
+    assert status == 403, f"非管理员应该没有权限，接口返回 {status}"
+    print("连接池统计接口返回正确")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(work_dir)
+        test_admin_metrics(work_dir)
@@ -0,0 +1,69 @@
+"""
+检查三种导入模式（普通、流式、流水线）写入的表内容相同
+
+在临时目录中生成合成导出文件，使用临时SQLite数据库（见 datedeal/bench_ingest.py），不影响配置的数据库。
+每种模式分两次导入：先导入前两个文件，再导入第三个文件（与导入前已有的记录匹配），
+分块较小，sys_xiangxi、sys_club 表中同一个键的行会落在不同的数据块中
+"""
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from lcoa.datedeal.bench_ingest import INGEST_MODES, configure_environment, prepare_database
+from lcoa.datedeal.bench_workbook_generator import generate_export_directory
+
+# 比较的表（模型名）
+COMPARED_TABLES = ['Lcoa', 'SysNodeal', 'SysXiangxi', 'SysClub']
+# 流式、流水线模式的分块行数
+TEST_CHUNK_SIZE = 50
+
+
+def table_contents(db, Model):
+    """表中的所有记录（除id以外的字段，排序后比较，与写入顺序和id无关）"""
+    table = Model.__table__
+    columns = [column for column in table.columns if column.name != 'id']
+    return sorted(repr(tuple(row)) for row in db.session.execute(db.select(*columns)))
+
+
+def ingest_in_mode(directory_path, filenames, mode):
+    """清空数据库，按指定模式分两次导入，返回各表的内容"""
+    import lcoa.app as app_module
+    from lcoa.datedeal.main import main_silent
+
+    prepare_database(truncate=True)
+    for batch in (filenames[:2], filenames[2:]):
+        main_silent(directory_path=directory_path, filenames=batch, chunk_size=TEST_CHUNK_SIZE, **INGEST_MODES[mode])
+
+    with app_module.app.app_context():
+        return {name: table_contents(app_module.db, getattr(app_module, name)) for name in COMPARED_TABLES}
+
+
+def test_ingest_modes(work_dir):
+    """
+    Args:
+        work_dir (str): 已经用 configure_environment 配置的临时目录（pytest 中由 conftest.py 提供）
+    """
+    directory_path = os.path.join(work_dir, 'exports')
+    filenames = generate_export_directory(directory_path, file_count=3, row_count=300)
+
+    contents = {mode: ingest_in_mode(directory_path, filenames, mode) for mode in INGEST_MODES}
+    for name in COMPARED_TABLES:
+        print(f"{name}: " + ", ".join(f"{mode} {len(contents[mode][name])} 条" for mode in INGEST_MODES))
+
+    for mode in INGEST_MODES:
+        for name in COMPARED_TABLES:
+            assert contents[mode][name], f"{mode} 模式没有写入 {name} 表"
+            assert contents[mode][name] == contents['full'][name], \
+                f"{mode} 模式写入 {name} 表的内容与普通模式不同"
+    print("三种导入模式写入的表内容相同")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(work_dir)
+        test_ingest_modes(work_dir)
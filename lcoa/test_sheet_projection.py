@@ -0,0 +1,101 @@
+"""
+检查按结构解析工作表（datedeal/workbook_reader.py 的 parse_sheet_projected）得到的数据行与完整解析相同
+文本列中的数字单元格、缺失值、保留的列全部是数字列的工作表转换为字符串的结果都不能改变，
+否则 row_hash 和键值与已经写入数据库的记录不同，下次导入时全部计为更新
+"""
+import os
+import sys
+import tempfile
+
+import openpyxl
+
+# 添加项目根目录和lcoa目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (project_root, os.path.join(project_root, 'lcoa')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from lcoa.datedeal.bench_ingest import configure_environment
+from lcoa.datedeal.workbook_reader import PROCESS_COLUMN_NAMES, XIANGXI_COLUMN_NAMES, read_workbook_once
+
+FILE_DATE = '2025-10-01'
+
+
+def process_sheet_rows():
+    """
+    第一个表和第二个表：节点操作者中有数字、文本和缺失值，所属部门全部是数字，
+    节点操作类型是有缺失值的数字（推断为浮点），流程id是有缺失值的整数列
+    """
+    rows = []
+    for i, operator in enumerate([1, 2.5, None, '张三', 4]):
+        row = {col_name: f'{col_name}{i}' for col_name in PROCESS_COLUMN_NAMES}
+        row.update({'流程节点id': 100 + i, '流程id': 10 + i, '节点操作者': operator, '所属部门': 7,
+                    '节点操作类型': i + 1, '最初接收时间': '2025-10-01 10:00:00', '总计超时': 0})
+        rows.append(row)
+    rows[1]['流程id'] = None
+    rows[2]['节点操作类型'] = None
+    return [PROCESS_COLUMN_NAMES + ['备注']] + [[row[c] for c in PROCESS_COLUMN_NAMES] + ['备注'] for row in rows]
+
+
+def build_workbook(file_path):
+    """写入包含各种数字单元格的导出文件（第三个工作表不导入）"""
+    workbook = openpyxl.Workbook()
+    sheets = [workbook.active] + [workbook.create_sheet() for _ in range(4)]
+
+    for sheet in sheets[:2]:
+        for row in process_sheet_rows():
+            sheet.append(row)
+
+    # 第四个表：需要的列全部是数字（有缺失值），另有不导入的文本列
+    sheets[3].append(XIANGXI_COLUMN_NAMES + ['备注'])
+    for values in ([1, 10, 2, 3], [2, None, 1, 4], [3, 12, None, 5]):
+        sheets[3].append(values + ['备注'])
+
+    # 第五个表：前3列中的人数和超时数有缺失值
+    sheets[4].append(['部门', '人数', '超时数', '备注'])
+    for values in (['一部', 10, 1], ['二部', None, 2], [3, 12, None]):
+        sheets[4].append(values + ['备注'])
+
+    workbook.save(file_path)
+
+
+def test_sheet_projection(work_dir):
+    """
+    Args:
+        work_dir (str): 已经用 configure_environment 配置的临时目录（pytest 中由 conftest.py 提供）
+    """
+    file_path = os.path.join(work_dir, f'sheet_projection_{FILE_DATE}.xlsx')
+    build_workbook(file_path)
+
+    projected = read_workbook_once(file_path, FILE_DATE, projected=True)
+    full = read_workbook_once(file_path, FILE_DATE, projected=False)
+
+    for table_name, rows in full.items():
+        assert rows, f"{table_name} 没有数据行"
+        assert projected[table_name] == rows, \
+            f"{table_name} 按结构解析与完整解析不同:\n{projected[table_name]}\n{rows}"
+
+    # 与完整解析（原来的导入方式）保存的值相同
+    operator_index = 1 + PROCESS_COLUMN_NAMES.index('节点操作者')
+    assert [row[operator_index] for row in projected['lcoa']] == ['1', '2.5', '', '张三', '4']
+    assert [row[1 + PROCESS_COLUMN_NAMES.index('节点操作类型')] for row in projected['lcoa']] == \
+        ['1.0', '2.0', '', '4.0', '5.0']
+    assert [row[1 + PROCESS_COLUMN_NAMES.index('流程id')] for row in projected['lcoa']] == \
+        ['10.0', '', '12.0', '13.0', '14.0']
+    assert projected['sys_xiangxi'] == [
+        [FILE_DATE, '1', '10.0', '2.0', '3'],
+        [FILE_DATE, '2', '', '1.0', '4'],
+        [FILE_DATE, '3', '12.0', '', '5'],
+    ], projected['sys_xiangxi']
+    assert projected['sys_club'] == [
+        [FILE_DATE, '一部', '10.0', '1.0'],
+        [FILE_DATE, '二部', '', '2.0'],
+        [FILE_DATE, '3', '12.0', ''],
+    ], projected['sys_club']
+    print("按结构解析的数据行与完整解析相同")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(work_dir)
+        test_sheet_projection(work_dir)
@@ -0,0 +1,100 @@
+"""
+检查按日期查询的接口在影子列没有回填时的结果
+sys_xiangxi、sys_club 表中一部分记录已经写入 extracted_on，另一部分只有 extracted_date
+（未运行 migrate_typed_columns.py 的已有数据库），最新日期、最新记录和每日统计都应该包括后者。
+通过应用的测试客户端调用，使用临时SQLite数据库（见 datedeal/bench_ingest.py）
+"""
+import os
+import sys
+import tempfile
+from datetime import date
+
+# 添加项目根目录和lcoa目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (project_root, os.path.join(project_root, 'lcoa')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from lcoa.datedeal.bench_ingest import configure_environment
+
+# (extracted_date, extracted_on, 姓名, 数量)：10月01日已回填，10月02日、10月03日没有回填（10月02日的原值不是ISO格式）
+XIANGXI_ROWS = [
+    ('2025-10-01', date(2025, 10, 1), '张三', '5'),
+    ('2025-10-01', date(2025, 10, 1), '李四', '7'),
+    ('2025/10/02', None, '张三', '2'),
+    ('2025-10-03', None, '张三', '3'),
+    ('2025-10-03', None, '李四', '4'),
+]
+# (extracted_date, extracted_on, 部门)
+CLUB_ROWS = [
+    ('2025-10-01', date(2025, 10, 1), '一部'),
+    ('2025-10-02', None, '一部'),
+    ('2025-10-02', None, '二部'),
+]
+
+
+def insert_rows(db, SysXiangxi, SysClub):
+    """清空两个表，写入部分回填的记录"""
+    SysXiangxi.query.delete()
+    SysClub.query.delete()
+    for extracted_date, extracted_on, name, quantity in XIANGXI_ROWS:
+        db.session.add(SysXiangxi(extracted_date=extracted_date, extracted_on=extracted_on, node_operator=name,
+                                  department='一部', quantity=quantity,
+                                  quantity_num=int(quantity) if extracted_on else None))
+    for extracted_date, extracted_on, department in CLUB_ROWS:
+        db.session.add(SysClub(extracted_date=extracted_date, extracted_on=extracted_on, department=department,
+                               personnel_count='10', timeout_count='1'))
+    db.session.commit()
+
+
+def get_data(client, url):
+    response = client.get(url)
+    body = response.get_json()
+    assert response.status_code == 200 and body['code'] == 200, f"{url} 返回 {response.status_code}: {body['message']}"
+    return body['data']
+
+
+def test_typed_date_fallback(work_dir):
+    """
+    Args:
+        work_dir (str): 已经用 configure_environment 配置的临时目录（pytest 中由 conftest.py 提供）
+    """
+    from lcoa.app import app, db, SysXiangxi, SysClub
+
+    with app.app_context():
+        db.create_all()
+        insert_rows(db, SysXiangxi, SysClub)
+
+    client = app.test_client()
+
+    assert get_data(client, '/api/sys_xiangxi/latest_date')['latest_date'] == '10月03日'
+    latest = get_data(client, '/api/sys_xiangxi/latest')
+    assert sorted((row['姓名'], row['数量']) for row in latest) == [('张三', '3'), ('李四', '4')], latest
+
+    stats = get_data(client, '/api/sys_xiangxi/daily_stats')
+    print(f"sys_xiangxi 每日统计: {stats}")
+    assert stats == [
+        {'date': '2025-10-03', 'count': 2, 'total_quantity': 7},
+        {'date': '2025-10-02', 'count': 1, 'total_quantity': 2},
+        {'date': '2025-10-01', 'count': 2, 'total_quantity': 12},
+    ], stats
+
+    assert get_data(client, '/api/sys_club/latest_date')['latest_date'] == '10月02日'
+    latest = get_data(client, '/api/sys_club/latest')
+    assert sorted(row['department'] for row in latest) == ['一部', '二部'], latest
+
+    # 回填以后结果相同，只按 extracted_on 查询
+    with app.app_context():
+        for Model in (SysXiangxi, SysClub):
+            for record in Model.query.filter(Model.extracted_on.is_(None)):
+                record.extracted_on = date.fromisoformat(record.extracted_date.replace('/', '-'))
+        db.session.commit()
+    assert get_data(client, '/api/sys_xiangxi/latest_date')['latest_date'] == '10月03日'
+    assert len(get_data(client, '/api/sys_club/latest')) == 2
+    print("影子列没有回填时最新日期、最新记录和每日统计正确")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(work_dir)
+        test_typed_date_fallback(work_dir)
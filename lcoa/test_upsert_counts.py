@@ -0,0 +1,110 @@
+"""
+检查 lcoa、sys_nodeal 表按键写入时返回的新增、更新、未变化、早于已有记录的条数，
+以及重新导入较早的导出文件时不会覆盖较新的记录
+
+分别在键列上有联合唯一索引（按键批量写入）和没有唯一索引（未运行 migrate_upsert_keys.py 的已有数据库，
+改用按键比对写入）的表上执行相同的写入，计数和写入后的记录都应该相同，并且不产生重复记录。
+使用临时SQLite数据库（见 datedeal/bench_ingest.py），不影响配置的数据库
+"""
+import os
+import sys
+import tempfile
+
+# 添加项目根目录和lcoa目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (project_root, os.path.join(project_root, 'lcoa')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from sqlalchemy import MetaData, UniqueConstraint, func, select
+
+from lcoa.datedeal.bench_ingest import configure_environment
+
+
+def process_row(extracted_date, process_id, process_node_id, title):
+    """lcoa 表的数据行（提取日期、流程id、流程节点id、流程标题，其余字段为空）"""
+    return [extracted_date, process_id, process_node_id, title]
+
+
+# (写入的数据, 期望的 新增, 更新, 未变化, 早于已有记录 条数)
+BATCHES = [
+    # 同一批中重复的键只写入最后一行、只计一次
+    ([process_row('2025-10-01', 'p1', 'n1', '标题1'), process_row('2025-10-01', 'p2', 'n2', '标题2'),
+      process_row('2025-10-01', 'p1', 'n1', '标题1改')], (2, 0, 0, 0)),
+    # 一个键内容变化、一个键内容相同、一个新键
+    ([process_row('2025-10-02', 'p1', 'n1', '标题1再改'), process_row('2025-10-01', 'p2', 'n2', '标题2'),
+      process_row('2025-10-02', 'p3', 'n3', '标题3')], (1, 1, 1, 0)),
+    # 重新导入较早的导出文件：内容不同但提取日期早于已有记录的行不写入
+    ([process_row('2025-10-01', 'p1', 'n1', '标题1改'), process_row('2025-10-03', 'p3', 'n3', '标题3改')],
+     (0, 1, 0, 1)),
+]
+# 写入所有批次后的记录
+EXPECTED_CONTENTS = [('p1', 'n1', '标题1再改'), ('p2', 'n2', '标题2'), ('p3', 'n3', '标题3改')]
+
+
+def write_batches(db, Lcoa):
+    """依次写入 BATCHES，返回每批的计数和最后的表内容"""
+    from services.data_service import save_to_lcoa_table
+
+    counts = []
+    for rows, _ in BATCHES:
+        result = save_to_lcoa_table(db, Lcoa, rows, chunk_size=2)
+        assert result is not None, "写入lcoa表失败"
+        counts.append((result['inserted'], result['updated'], result['unchanged'], result['outdated']))
+    contents = [tuple(row) for row in db.session.execute(
+        select(Lcoa.process_id, Lcoa.process_node_id, Lcoa.process_title).order_by(Lcoa.process_id)
+    )]
+    return counts, contents
+
+
+def recreate_without_unique_key(db, Lcoa):
+    """按模型重建 lcoa 表，但不建立键列上的联合唯一索引"""
+    Lcoa.__table__.drop(db.engine)
+    table = Lcoa.__table__.to_metadata(MetaData())
+    table.constraints = {constraint for constraint in table.constraints
+                         if not isinstance(constraint, UniqueConstraint)}
+    table.create(db.engine)
+
+
+def test_upsert_counts(work_dir):
+    """
+    Args:
+        work_dir (str): 已经用 configure_environment 配置的临时目录（pytest 中由 conftest.py 提供）
+    """
+    from lcoa.app import app, db, Lcoa
+    import services.data_service as data_service
+
+    expected = [batch_counts for _, batch_counts in BATCHES]
+    with app.app_context():
+        db.create_all()
+        # 同一个测试会话中的其他测试可能已经写入了 lcoa 表
+        Lcoa.query.delete()
+        db.session.commit()
+        data_service._upsert_support.clear()
+        try:
+            counts, contents = write_batches(db, Lcoa)
+            print(f"有唯一索引: {counts}")
+            assert counts == expected, f"按键批量写入的计数不正确: {counts}，应为 {expected}"
+            assert contents == EXPECTED_CONTENTS, f"按键批量写入后的记录不正确: {contents}"
+
+            recreate_without_unique_key(db, Lcoa)
+            data_service._upsert_support.clear()
+            assert not data_service.upsert_supported(db, 'lcoa')
+            fallback_counts, fallback_contents = write_batches(db, Lcoa)
+            print(f"没有唯一索引: {fallback_counts}")
+            assert fallback_counts == expected, f"按键比对写入的计数不正确: {fallback_counts}，应为 {expected}"
+            assert fallback_contents == EXPECTED_CONTENTS, f"没有唯一索引时写入的记录不正确: {fallback_contents}"
+            assert db.session.execute(select(func.count()).select_from(Lcoa.__table__)).scalar() == 3
+        finally:
+            # 按模型重建 lcoa 表（恢复唯一索引），不影响之后的测试
+            db.session.rollback()
+            Lcoa.__table__.drop(db.engine, checkfirst=True)
+            Lcoa.__table__.create(db.engine)
+            data_service._upsert_support.clear()
+    print("新增、更新、未变化、早于已有记录的条数和写入的记录正确")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(work_dir)
+        test_upsert_counts(work_dir)
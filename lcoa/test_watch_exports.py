@@ -0,0 +1,78 @@
+"""
+检查目录监听服务（datedeal/watch_exports.py）在导入失败后重试
+导入失败的文件不能记录为已入队，按退避时间重新入队；文件变化后按新文件处理。
+使用真实的导入流程和临时SQLite数据库（见 datedeal/bench_ingest.py），时间由测试指定
+"""
+import os
+import sys
+import tempfile
+from datetime import date
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from lcoa.datedeal.bench_ingest import configure_environment, prepare_database
+from lcoa.datedeal.bench_workbook_generator import generate_export_directory
+
+RETRY_SECONDS = 60
+
+
+def ingest_queued(watcher, now):
+    """依次导入队列中的文件（代替工作线程），返回 文件名 -> 是否导入成功"""
+    results = {}
+    while not watcher.work_queue.empty():
+        filename = watcher.work_queue.get_nowait()
+        results[filename] = watcher.ingest_file(filename, now)
+        watcher.work_queue.task_done()
+    return results
+
+
+def test_watch_exports_retry(work_dir):
+    """
+    Args:
+        work_dir (str): 已经用 configure_environment 配置的临时目录（pytest 中由 conftest.py 提供）
+    """
+    from lcoa.datedeal.watch_exports import ExportWatcher
+
+    prepare_database(truncate=True)
+    directory_path = os.path.join(work_dir, 'watched_exports')
+    good, broken = generate_export_directory(directory_path, file_count=2, row_count=50,
+                                             start_date=date(2025, 11, 1))
+
+    # 第二个文件损坏（例如复制到一半），导入时读取出错
+    broken_path = os.path.join(directory_path, broken)
+    with open(broken_path, 'rb') as f:
+        content = f.read()
+    with open(broken_path, 'wb') as f:
+        f.write(content[:len(content) // 2])
+
+    watcher = ExportWatcher(directory_path, stable_seconds=0, retry_seconds=RETRY_SECONDS)
+    assert watcher.poll_once(now=0) == []
+    assert sorted(watcher.poll_once(now=1)) == sorted([good, broken])
+    assert ingest_queued(watcher, now=2) == {good: True, broken: False}
+
+    # 退避时间内不重新入队，到时间后只重试失败的文件；再次失败时等待时间加倍
+    assert watcher.poll_once(now=3) == []
+    assert watcher.poll_once(now=2 + RETRY_SECONDS) == [broken]
+    assert ingest_queued(watcher, now=70) == {broken: False}
+    assert watcher.poll_once(now=70 + RETRY_SECONDS) == []
+    assert watcher.poll_once(now=70 + 2 * RETRY_SECONDS) == [broken]
+    ingest_queued(watcher, now=200)
+
+    # 文件重新写入完整后不再等待退避时间
+    with open(broken_path, 'wb') as f:
+        f.write(content)
+    assert watcher.poll_once(now=201) == []
+    assert watcher.poll_once(now=202) == [broken]
+    assert ingest_queued(watcher, now=203) == {broken: True}
+    assert watcher.failed == {}
+    assert watcher.poll_once(now=300 + 10 * RETRY_SECONDS) == []
+    print("导入失败的文件按退避时间重试，文件变化后重新导入成功")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(work_dir)
+        test_watch_exports_retry(work_dir)